@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+What a GUI restart costs: logging in to every session again (what
+restarting without a broker means) versus attaching to the sessions a
+connection broker kept, replaying what they printed meanwhile.
+
+The sessions sit behind a delay proxy so each login costs realistic round
+trips. The broker runs in this process on its own socket, the "GUI" side
+is BrokerConnectWorker, the same as a terminal tab uses.
+
+    python benchmarks/bench_broker_reattach.py --sessions 30 --rtt-ms 80 --output-kb 256
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from PyQt6.QtCore import QCoreApplication, Qt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from pyretroterm.ssh.broker import Broker  # noqa: E402
+from pyretroterm.ssh.broker_client import BrokerConnectWorker  # noqa: E402
+from pyretroterm.ssh.connect_pipeline import ConnectWorker  # noqa: E402
+from pyretroterm.ssh.transport_registry import TransportRegistry  # noqa: E402
+from bench_transport_profiles import DelayProxy  # noqa: E402
+from ssh_test_server import spawn_server  # noqa: E402
+
+
+def run_worker(worker):
+    result = []
+    worker.signals.connected.connect(lambda client, channel: result.extend([channel, client]),
+                                     type=Qt.ConnectionType.DirectConnection)
+    worker.signals.failed.connect(lambda title, message: result.append(RuntimeError(message)),
+                                  type=Qt.ConnectionType.DirectConnection)
+    worker.run()
+    if result and isinstance(result[-1], Exception):
+        raise result[-1]
+    return result
+
+
+def read_until(channel, offset, timeout=30):
+    """Take output off a channel until it has delivered up to ``offset``."""
+    received = 0
+    deadline = time.monotonic() + timeout
+    while channel.offset < offset and time.monotonic() < deadline:
+        if channel.recv_ready():
+            received += len(channel.recv(65536))
+        else:
+            time.sleep(0.001)
+    return received
+
+
+@click.command()
+@click.option("--sessions", default=30, show_default=True, help="Sessions open when the GUI restarts")
+@click.option("--parallel", default=16, show_default=True, help="Sessions connecting at once")
+@click.option("--rtt-ms", default=80.0, show_default=True, help="Round trip to the devices")
+@click.option("--output-kb", default=256, show_default=True, help="Output each session prints while detached")
+def main(sessions, parallel, rtt_ms, output_kb):
+    QCoreApplication([])
+    server, server_port = spawn_server()
+    proxy = DelayProxy(("127.0.0.1", server_port), rtt_ms / 2000)
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="pyretroterm-bench-"), "broker.sock")
+    broker = Broker(socket_path)
+    threading.Thread(target=broker.serve_forever, daemon=True).start()
+    time.sleep(0.5)
+    try:
+        def login(_):
+            return run_worker(ConnectWorker("127.0.0.1", proxy.port, "bench", "bench", reuse_transport=False))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(parallel) as pool:
+            opened = list(pool.map(login, range(sessions)))
+        relogin = time.perf_counter() - started
+        for handles in opened:
+            for handle in handles:
+                handle.close()
+        print(f"{'log in again':16s} {sessions} sessions in {relogin:6.2f}s  "
+              f"{relogin * 1000 / sessions:7.1f} ms/session")
+
+        def open_brokered(_):
+            worker = BrokerConnectWorker("127.0.0.1", proxy.port, "bench", "bench", reuse_transport=False,
+                                         socket_path=socket_path)
+            return run_worker(worker)[0]
+
+        with ThreadPoolExecutor(parallel) as pool:
+            channels = list(pool.map(open_brokered, range(sessions)))
+        # The GUI exits: every tab detaches, the devices keep printing
+        offsets = {channel.session_id: channel.offset for channel in channels}
+        for channel in channels:
+            channel.detach()
+        time.sleep(0.2)
+        for session in list(broker.sessions.values()):
+            session.send(f"flood {output_kb * 1024}\r".encode())
+        deadline = time.monotonic() + 60
+        while (any(session.buffer.end - offsets[session.id] < output_kb * 1024 for session in broker.sessions.values())
+               and time.monotonic() < deadline):
+            time.sleep(0.05)
+        ends = {session.id: session.buffer.end for session in broker.sessions.values()}
+
+        def attach(session_id):
+            worker = BrokerConnectWorker("127.0.0.1", proxy.port, "bench", "bench", session_id=session_id,
+                                         offset=offsets[session_id], socket_path=socket_path)
+            channel = run_worker(worker)[0]
+            return channel, read_until(channel, ends[session_id])
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(parallel) as pool:
+            attached = list(pool.map(attach, list(ends)))
+        reattach = time.perf_counter() - started
+        replayed = sum(received for _, received in attached)
+        print(f"{'broker reattach':16s} {sessions} sessions in {reattach:6.2f}s  "
+              f"{reattach * 1000 / sessions:7.1f} ms/session  replayed {replayed / (1024 * 1024):.1f} MB")
+        for channel, _ in attached:
+            channel.close()
+    finally:
+        broker.shutdown()
+        TransportRegistry.instance().close_all()
+        proxy.close()
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
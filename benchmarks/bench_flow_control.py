@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Backlog growth with a slow renderer, with and without output flow control.
+
+Floods the local test server through SSHClientManager into a fake browser
+that "renders" at a fixed rate and acknowledges what it has drawn. Without
+flow control the backlog of sent-but-unrendered output grows with the flood;
+with it the backlog stays around the high watermark and the remote end is
+held back by the SSH window instead.
+
+    python benchmarks/bench_flow_control.py --flood-mb 40 --render-mb-s 10
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from pyretroterm.ssh.ssh_manager import SSHClientManager  # noqa: E402
+from ssh_test_server import SSHTestServer  # noqa: E402
+
+
+class SlowRenderer:
+    """Binary-framed websocket whose consumer draws at render_rate bytes/s."""
+
+    def __init__(self, manager, tab_id, render_rate):
+        self.manager = manager
+        self.tab_id = tab_id
+        self.render_rate = render_rate
+        self.queue = asyncio.Queue()
+        self.backlog = 0
+        self.peak_backlog = 0
+        self.rendered = 0
+        self.tail = b""
+        self.changed = asyncio.Event()
+        self.task = asyncio.create_task(self._render())
+
+    async def send_json(self, message):
+        pass
+
+    async def send_bytes(self, data):
+        payload = data[18:]
+        self.backlog += len(payload)
+        self.peak_backlog = max(self.peak_backlog, self.backlog)
+        self.queue.put_nowait(payload)
+
+    async def _render(self):
+        while True:
+            payload = await self.queue.get()
+            await asyncio.sleep(len(payload) / self.render_rate)
+            self.backlog -= len(payload)
+            self.rendered += len(payload)
+            self.tail = (self.tail + payload)[-64:]
+            await self.manager.ack_output(self.tab_id, len(payload))
+            self.changed.set()
+
+    async def wait_for(self, predicate, timeout=300):
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            self.changed.clear()
+            await asyncio.wait_for(self.changed.wait(), deadline - time.perf_counter())
+
+
+async def run_mode(flow_control, port, flood_bytes, render_rate):
+    manager = SSHClientManager()
+    tab_id = str(uuid.uuid4())
+    await manager.create_client(tab_id)
+    renderer = SlowRenderer(manager, tab_id, render_rate)
+    await manager.connect(tab_id, "127.0.0.1", port, "bench", "bench", renderer,
+                          framing="binary", flow_control=flow_control)
+    pump = asyncio.create_task(manager.listen_to_ssh_output(tab_id, renderer))
+    await renderer.wait_for(lambda: renderer.tail.endswith(b"$ "))
+
+    start = renderer.rendered
+    renderer.peak_backlog = 0
+    started = time.perf_counter()
+    await manager.send_input(tab_id, f"flood {flood_bytes}\r")
+    await renderer.wait_for(lambda: renderer.rendered - start > flood_bytes and renderer.tail.endswith(b"$ "))
+    elapsed = time.perf_counter() - started
+
+    flow = manager.clients[tab_id]['flow']
+    pauses = flow.pauses if flow is not None else 0
+    pump.cancel()
+    renderer.task.cancel()
+    await manager.disconnect(tab_id)
+
+    label = "flow" if flow_control else "no flow"
+    print(f"{label:8s} {flood_bytes / 2 ** 20:5.1f} MB rendered in {elapsed:6.2f}s  "
+          f"peak backlog {renderer.peak_backlog / 2 ** 20:6.2f} MB  pauses {pauses}")
+
+
+@click.command()
+@click.option("--flood-mb", default=40.0, show_default=True, help="Megabytes of output to stream")
+@click.option("--render-mb-s", default=10.0, show_default=True, help="Simulated renderer speed")
+def main(flood_mb, render_mb_s):
+    server = SSHTestServer()
+    port = server.start()
+    try:
+        for flow_control in (False, True):
+            asyncio.run(run_mode(flow_control, port, int(flood_mb * 2 ** 20), render_mb_s * 2 ** 20))
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Opening many sessions behind one jump host: a bastion login per session
+(what hopping by hand, or a client without a shared bastion transport,
+costs) versus ConnectWorker with a JumpHost, where every session is a
+direct-tcpip channel on one pooled bastion transport.
+
+The bastion sits behind a delay proxy so its logins cost a realistic round
+trip. It counts its logins, the targets are one local test server.
+
+    python benchmarks/bench_jump_fanout.py --sessions 50 --rtt-ms 40
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import paramiko
+from PyQt6.QtCore import QCoreApplication, Qt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from pyretroterm.ssh.connect_pipeline import ConnectWorker  # noqa: E402
+from pyretroterm.ssh.jump import JumpHost  # noqa: E402
+from pyretroterm.ssh.transport_registry import TransportRegistry  # noqa: E402
+from bench_transport_profiles import DelayProxy  # noqa: E402
+from ssh_test_server import SSHTestServer, spawn_server  # noqa: E402
+
+
+def login_per_session(bastion_port, target_port):
+    """One session the unshared way: bastion login, tunnel, target login."""
+    bastion = paramiko.SSHClient()
+    bastion.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    bastion.connect("127.0.0.1", bastion_port, "bench", "bench", look_for_keys=False, allow_agent=False)
+    tunnel = bastion.get_transport().open_channel("direct-tcpip", ("127.0.0.1", target_port), ("127.0.0.1", 0))
+    target = paramiko.SSHClient()
+    target.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    target.connect("127.0.0.1", target_port, "bench", "bench", sock=tunnel, look_for_keys=False, allow_agent=False)
+    channel = target.invoke_shell()
+    return [channel, target, bastion]
+
+
+def shared_bastion(bastion_port, target_port):
+    """One session through ConnectWorker and the pooled bastion transport."""
+    jump = JumpHost("127.0.0.1", bastion_port, "bench", "bench")
+    worker = ConnectWorker("127.0.0.1", target_port, "bench", "bench", reuse_transport=False, jump=jump)
+    result = []
+    worker.signals.connected.connect(lambda client, channel: result.extend([channel, client]),
+                                     type=Qt.ConnectionType.DirectConnection)
+    worker.signals.failed.connect(lambda title, message: result.append(RuntimeError(message)),
+                                  type=Qt.ConnectionType.DirectConnection)
+    worker.run()
+    if result and isinstance(result[-1], Exception):
+        raise result[-1]
+    return result
+
+
+def run_mode(name, open_session, bastion, bastion_port, target_port, sessions, parallel):
+    logins_before = bastion.logins
+    started = time.perf_counter()
+    with ThreadPoolExecutor(parallel) as pool:
+        opened = list(pool.map(lambda _: open_session(bastion_port, target_port), range(sessions)))
+    elapsed = time.perf_counter() - started
+    logins = bastion.logins - logins_before
+    for handles in opened:
+        for handle in handles:
+            handle.close()
+    print(f"{name:22s} {sessions} sessions in {elapsed:6.2f}s  {elapsed * 1000 / sessions:6.1f} ms/session  "
+          f"bastion logins {logins}")
+
+
+@click.command()
+@click.option("--sessions", default=50, show_default=True, help="Sessions to open behind the bastion")
+@click.option("--parallel", default=16, show_default=True, help="Sessions connecting at once")
+@click.option("--rtt-ms", default=40.0, show_default=True, help="Round trip to the bastion")
+def main(sessions, parallel, rtt_ms):
+    QCoreApplication([])
+    target, target_port = spawn_server()
+    bastion = SSHTestServer()
+    bastion.start()
+    proxy = DelayProxy(("127.0.0.1", bastion.port), rtt_ms / 2000)
+    try:
+        run_mode("login per session", login_per_session, bastion, proxy.port, target_port, sessions, parallel)
+        run_mode("shared bastion", shared_bastion, bastion, proxy.port, target_port, sessions, parallel)
+    finally:
+        TransportRegistry.instance().close_all()
+        proxy.close()
+        bastion.stop()
+        target.terminate()
+
+
+if __name__ == "__main__":
+    main()
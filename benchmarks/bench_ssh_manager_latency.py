@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Echo latency and bulk throughput of SSHClientManager's output pump against a
+local paramiko test server: the old 100 ms ``sleep`` / ``recv(1024)`` poll
+loop versus the event-driven pump.
+
+    python benchmarks/bench_ssh_manager_latency.py --echoes 50 --flood-mb 5
+"""
+import asyncio
+import base64
+import os
+import statistics
+import sys
+import time
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from pyretroterm.ssh.ssh_manager import SSHClientManager  # noqa: E402
+from ssh_test_server import SSHTestServer  # noqa: E402
+
+
+class FakeWebSocket:
+    """Collects what the manager would have sent to the browser."""
+
+    def __init__(self):
+        self.received = bytearray()
+        self.messages = 0
+        self.changed = asyncio.Event()
+
+    async def send_json(self, message):
+        self.received += base64.b64decode(message['data'])
+        self.messages += 1
+        self.changed.set()
+
+    async def wait_for(self, predicate, timeout=30):
+        deadline = time.perf_counter() + timeout
+        while not predicate(self.received):
+            self.changed.clear()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise TimeoutError("no output")
+            await asyncio.wait_for(self.changed.wait(), remaining)
+
+
+async def legacy_listen(manager, tab_id, websocket):
+    """The pump as it was: poll every 100 ms, read at most 1 KB."""
+    while True:
+        await asyncio.sleep(0.1)
+        channel = manager.clients[tab_id]['channel']
+        if channel and channel.recv_ready():
+            data = channel.recv(1024)
+            text = manager.clients[tab_id]['decoder'].decode(data)
+            if not text:
+                continue
+            encoded_data = base64.b64encode(text.encode('utf-8')).decode('utf-8')
+            await websocket.send_json({'type': 'ssh_output', 'data': encoded_data, 'tabId': tab_id})
+
+
+async def run_mode(mode, port, echoes, flood_bytes):
+    manager = SSHClientManager()
+    websocket = FakeWebSocket()
+    tab_id = f"bench-{mode}"
+    await manager.create_client(tab_id)
+    await manager.connect(tab_id, "127.0.0.1", port, "bench", "bench", websocket)
+    if mode == "legacy":
+        pump = asyncio.create_task(legacy_listen(manager, tab_id, websocket))
+    else:
+        pump = asyncio.create_task(manager.listen_to_ssh_output(tab_id, websocket))
+
+    await websocket.wait_for(lambda buf: buf.endswith(b"$ "))
+
+    latencies = []
+    for i in range(echoes):
+        marker = f"{i % 10}".encode()
+        expected = len(websocket.received) + 1
+        started = time.perf_counter()
+        await manager.send_input(tab_id, marker.decode())
+        await websocket.wait_for(lambda buf: len(buf) >= expected)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    # Clear the line, then time a flood through to the next prompt
+    await manager.send_input(tab_id, "\r")
+    await websocket.wait_for(lambda buf: buf.endswith(b"$ "))
+    start_len = len(websocket.received)
+    messages_before = websocket.messages
+    started = time.perf_counter()
+    await manager.send_input(tab_id, f"flood {flood_bytes}\r")
+    timeout = 30 if mode != "legacy" else max(30, flood_bytes / 1024 * 0.1 + 10)
+    try:
+        await websocket.wait_for(lambda buf: len(buf) - start_len > flood_bytes and buf.endswith(b"$ "),
+                                 timeout=timeout)
+        elapsed = time.perf_counter() - started
+    except TimeoutError:
+        elapsed = None
+
+    pump.cancel()
+    await manager.disconnect(tab_id)
+
+    lat = sorted(latencies)
+    print(f"{mode:8s} echo p50 {statistics.median(lat):7.2f} ms  p99 {lat[int(len(lat) * 0.99) - 1]:7.2f} ms  "
+          f"max {lat[-1]:7.2f} ms", end="")
+    if elapsed:
+        mb = flood_bytes / (1024 * 1024)
+        print(f"  | flood {mb:.1f} MB {elapsed:6.2f}s {mb / elapsed:7.2f} MB/s "
+              f"in {websocket.messages - messages_before} messages")
+    else:
+        print(f"  | flood timed out after {timeout:.0f}s")
+
+
+@click.command()
+@click.option("--echoes", default=50, show_default=True, help="Keystrokes to time")
+@click.option("--flood-mb", default=5.0, show_default=True, help="Megabytes of output to stream")
+@click.option("--legacy-flood-kb", default=64, show_default=True,
+              help="Flood size for the legacy pump, which only manages ~10 KB/s")
+def main(echoes, flood_mb, legacy_flood_kb):
+    server = SSHTestServer()
+    port = server.start()
+    try:
+        asyncio.run(run_mode("legacy", port, echoes, legacy_flood_kb * 1024))
+        asyncio.run(run_mode("event", port, echoes, int(flood_mb * 1024 * 1024)))
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
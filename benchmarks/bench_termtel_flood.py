@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Flood test for termtel's SSHSession output path: the old
+``asyncio.to_thread(channel.recv, 1024)`` loop with one ``data`` message per
+read, versus the dedicated channel pump with per-frame coalescing.
+
+Connects to the local test server, floods it and reports throughput, the
+number of JSON messages emitted towards the frontend and the echo latency
+of single keystrokes.
+
+    python benchmarks/bench_termtel_flood.py --flood-mb 20
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import click
+import paramiko
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from termtel.backend.sessions import SSHSession  # noqa: E402
+from ssh_test_server import spawn_server  # noqa: E402
+
+
+class LegacySSHSession(SSHSession):
+    """SSHSession with the reader as it was before the channel pump."""
+
+    async def _read_output(self) -> None:
+        self.decoder.reset()
+        while self._active and self.channel:
+            try:
+                data = await asyncio.to_thread(self.channel.recv, 1024)
+                if not data:
+                    tail = self.decoder.flush()
+                    if tail:
+                        self.send_message("data", {"text": tail})
+                    break
+                text = self.decoder.decode(data)
+                if text:
+                    self.send_message("data", {"text": text})
+            except Exception:
+                break
+        if self._active:
+            await self.disconnect()
+
+
+class Frontend:
+    """Stands in for the JS side: parses every message like sessions.js does."""
+
+    def __init__(self):
+        self.messages = 0
+        self.chars = 0
+        self.tail = ""
+        self.changed = asyncio.Event()
+
+    def on_message(self, raw):
+        message = json.loads(raw)
+        if message["action"] == "data":
+            text = message["payload"]["text"]
+            self.messages += 1
+            self.chars += len(text)
+            self.tail = (self.tail + text)[-64:]
+            self.changed.set()
+
+    async def wait_for(self, predicate, timeout=60):
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            self.changed.clear()
+            await asyncio.wait_for(self.changed.wait(), deadline - time.perf_counter())
+
+
+async def run_mode(name, session_cls, port, flood_bytes, echoes):
+    session = session_cls(f"bench-{name}")
+    frontend = Frontend()
+    session.message_ready.connect(frontend.on_message)
+
+    # Same setup SSHSession.connect does, on the test server's port
+    session.client = paramiko.SSHClient()
+    session.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    session.client.connect("127.0.0.1", port=port, username="bench", password="bench",
+                           look_for_keys=False, allow_agent=False)
+    session.channel = session.client.invoke_shell(term="xterm")
+    session._active = True
+    reader = asyncio.create_task(session._read_output())
+    await frontend.wait_for(lambda: frontend.tail.endswith("$ "))
+
+    latencies = []
+    for i in range(echoes):
+        expected = frontend.chars + 1
+        started = time.perf_counter()
+        await session.handle_data({"text": str(i % 10)})
+        await frontend.wait_for(lambda: frontend.chars >= expected)
+        latencies.append((time.perf_counter() - started) * 1000)
+    await session.handle_data({"text": "\r"})
+    await frontend.wait_for(lambda: frontend.tail.endswith("$ "))
+
+    start_chars, start_messages = frontend.chars, frontend.messages
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    await session.handle_data({"text": f"flood {flood_bytes}\r"})
+    await frontend.wait_for(lambda: frontend.chars - start_chars > flood_bytes and frontend.tail.endswith("$ "))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    await session.disconnect()
+    await reader
+
+    mb = flood_bytes / (1024 * 1024)
+    print(f"{name:7s} {mb:5.1f} MB in {elapsed:6.2f}s {mb / elapsed:7.1f} MB/s  "
+          f"{frontend.messages - start_messages:6d} data messages  cpu {cpu * 1000 / mb:6.1f} ms/MB  "
+          f"echo p50 {statistics.median(latencies):5.2f} ms max {max(latencies):5.2f} ms")
+
+
+@click.command()
+@click.option("--flood-mb", default=20.0, show_default=True, help="Megabytes of output to stream")
+@click.option("--echoes", default=30, show_default=True, help="Keystrokes to time")
+def main(flood_mb, echoes):
+    # Server in its own process so its crypto doesn't compete for this one's GIL
+    server, port = spawn_server()
+    flood_bytes = int(flood_mb * 1024 * 1024)
+    try:
+        asyncio.run(run_mode("legacy", LegacySSHSession, port, flood_bytes, echoes))
+        asyncio.run(run_mode("pump", SSHSession, port, flood_bytes, echoes))
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
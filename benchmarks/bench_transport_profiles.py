@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Bulk output throughput of each transport profile preset over a simulated
+long link: a local TCP proxy between the client and the test server adds
+one-way delay (and optionally a bandwidth cap) to every segment, the way a
+real WAN does, so the SSH channel window becomes the limit it is in the
+field.
+
+    python benchmarks/bench_transport_profiles.py --rtt-ms 150 --flood-mb 20
+    python benchmarks/bench_transport_profiles.py --rtt-ms 300 --bandwidth-mb 2 --profile default --profile low-bandwidth
+"""
+import heapq
+import os
+import socket
+import sys
+import threading
+import time
+
+import click
+import paramiko
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from pyretroterm.ssh.connect_pipeline import open_shell_channel  # noqa: E402
+from pyretroterm.ssh.transport_profile import PRESETS, TransportProfile  # noqa: E402
+from ssh_test_server import spawn_server  # noqa: E402
+
+
+class DelayProxy:
+    """
+    Forwards one TCP connection at a time to ``target``, holding every
+    segment for ``delay`` seconds in each direction. Segments are queued
+    rather than slept on, so the link stays full: bandwidth is unchanged,
+    only the round trip grows.
+    """
+
+    def __init__(self, target, delay, bandwidth=0):
+        """
+        :param delay: one-way delay in seconds.
+        :param bandwidth: bytes per second towards the client, 0 for no cap.
+        """
+        self.target = target
+        self.delay = delay
+        self.bandwidth = bandwidth
+        # Bytes delivered towards the client, compressed and encrypted
+        self.downstream = 0
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(8)
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(self.target)
+            for sock in (client, upstream):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._pipe(client, upstream, 0, False)
+            self._pipe(upstream, client, self.bandwidth, True)
+
+    def _pipe(self, src, dst, bandwidth, downstream):
+        queue = []
+        ready = threading.Condition()
+        seq = [0]
+
+        def reader():
+            while True:
+                try:
+                    data = src.recv(65536)
+                except OSError:
+                    data = b""
+                with ready:
+                    seq[0] += 1
+                    heapq.heappush(queue, (time.monotonic() + self.delay, seq[0], data))
+                    ready.notify()
+                if not data:
+                    return
+
+        def writer():
+            free_at = time.monotonic()
+            while True:
+                with ready:
+                    while not queue:
+                        ready.wait()
+                    due, _, data = queue[0]
+                    wait = due - time.monotonic()
+                    if wait > 0:
+                        ready.wait(wait)
+                        continue
+                    heapq.heappop(queue)
+                if not data:
+                    try:
+                        dst.shutdown(socket.SHUT_WR)
+                    except OSError:
+                        pass
+                    return
+                if bandwidth:
+                    free_at = max(free_at, time.monotonic()) + len(data) / bandwidth
+                    pause = free_at - time.monotonic()
+                    if pause > 0:
+                        time.sleep(pause)
+                try:
+                    dst.sendall(data)
+                except OSError:
+                    return
+                if downstream:
+                    self.downstream += len(data)
+
+        threading.Thread(target=reader, daemon=True).start()
+        threading.Thread(target=writer, daemon=True).start()
+
+    def close(self):
+        self.listener.close()
+
+
+def run_profile(profile, proxy, flood_bytes):
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    connect_started = time.perf_counter()
+    client.connect("127.0.0.1", port=proxy.port, username="bench", password="bench",
+                   look_for_keys=False, allow_agent=False, compress=profile.compression)
+    connect_time = time.perf_counter() - connect_started
+    profile.apply(client.get_transport())
+    channel = open_shell_channel(client, "xterm", profile)
+
+    def read_until_prompt(limit):
+        received = 0
+        tail = b""
+        while True:
+            data = channel.recv(65536)
+            if not data:
+                raise RuntimeError("channel closed")
+            received += len(data)
+            tail = (tail + data)[-16:]
+            if received >= limit and tail.endswith(b"$ "):
+                return received
+
+    channel.send(b"\r")
+    read_until_prompt(0)
+
+    wire_before = proxy.downstream
+    started = time.perf_counter()
+    channel.send(f"flood {flood_bytes}\r".encode())
+    received = read_until_prompt(flood_bytes)
+    elapsed = time.perf_counter() - started
+    wire = proxy.downstream - wire_before
+
+    channel.close()
+    client.close()
+    return received, elapsed, connect_time, wire
+
+
+@click.command()
+@click.option("--rtt-ms", default=150.0, show_default=True, help="Simulated round trip time")
+@click.option("--bandwidth-mb", default=0.0, show_default=True, help="Link speed towards the client in MB/s, 0 for none")
+@click.option("--flood-mb", default=20.0, show_default=True, help="Megabytes of output to stream per profile")
+@click.option("--profile", "profiles", multiple=True, type=click.Choice(list(PRESETS)),
+              help="Presets to run, all of them by default")
+def main(rtt_ms, bandwidth_mb, flood_mb, profiles):
+    server, server_port = spawn_server()
+    proxy = DelayProxy(("127.0.0.1", server_port), rtt_ms / 2000, int(bandwidth_mb * 1024 * 1024))
+    flood_bytes = int(flood_mb * 1024 * 1024)
+    link = f"{rtt_ms:.0f} ms RTT" + (f", {bandwidth_mb:g} MB/s" if bandwidth_mb else "")
+    print(f"{flood_mb:g} MB per profile over {link}")
+    try:
+        for name in profiles or PRESETS:
+            profile = TransportProfile.from_config({'transport_profile': name})
+            received, elapsed, connect_time, wire = run_profile(profile, proxy, flood_bytes)
+            mb = received / (1024 * 1024)
+            # A full window per round trip is the most the channel can carry
+            ceiling = profile.window_size / (rtt_ms / 1000) / (1024 * 1024) if rtt_ms else float("inf")
+            print(f"{name:14s} window {profile.window_size // 1024:6d} KB  {mb / elapsed:7.2f} MB/s "
+                  f"(window limit {ceiling:7.1f} MB/s)  on the wire {wire / (1024 * 1024):6.1f} MB  "
+                  f"connect {connect_time * 1000:6.0f} ms")
+    finally:
+        proxy.close()
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Output transport throughput into xterm.js: the legacy per-batch
+``runJavaScript(handle_output(json))`` path versus base64 batches pushed over
+the QWebChannel ``backend.output_b64`` signal.
+
+Loads the real qtsshcon.html / sshconfrontend.js with a stub backend object,
+streams the same payload through both transports and reports MB/s measured
+until xterm.js has parsed the final write.
+
+    python benchmarks/bench_webchannel_output.py --mb 100 --batch-kb 64
+
+No before/after figures have been recorded for this change yet. The
+benchmark needs QtWebEngine and its X11/ALSA runtime libraries, which the
+environment the change was made in could not install, so the 100 MB
+comparison is still outstanding.
+"""
+import base64
+import json
+import os
+import sys
+import time
+
+import click
+from PyQt6.QtCore import QObject, QTimer, QUrl, pyqtSignal, pyqtSlot
+from PyQt6.QtWebChannel import QWebChannel
+from PyQt6.QtWebEngineWidgets import QWebEngineView
+from PyQt6.QtWidgets import QApplication
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "..", "pyretroterm", "static")
+
+SAMPLE = (
+    "\x1b[1;32mrouter1#\x1b[0m show interfaces status\r\n"
+    "Port      Name               Status       Vlan       Duplex  Speed Type\r\n"
+    "Gi1/0/1   uplink-core-01     connected    trunk      a-full a-1000 10/100/1000BaseTX\r\n"
+    "Gi1/0/2   東京-access-02       notconnect   10           auto   auto 10/100/1000BaseTX\r\n"
+    "│ ├── %LINK-3-UPDOWN: Interface Gi1/0/3, changed state to down\r\n"
+)
+
+
+class BenchBackend(QObject):
+    """Stands in for sshshell.Backend on the page's web channel."""
+    send_output = pyqtSignal(str)
+    output_b64 = pyqtSignal(str)
+    bench_marker = pyqtSignal()
+    done = pyqtSignal()
+
+    @pyqtSlot(str)
+    def write_data(self, data):
+        pass
+
+    @pyqtSlot(str)
+    def set_pty_size(self, data):
+        pass
+
+    @pyqtSlot()
+    def bench_done(self):
+        self.done.emit()
+
+
+class Bench(QObject):
+    def __init__(self, view, backend, megabytes, batch_kb):
+        super().__init__()
+        self.view = view
+        self.backend = backend
+        block = SAMPLE.encode("utf-8")
+        self.batch = (block * ((batch_kb * 1024) // len(block) + 1))[:batch_kb * 1024]
+        # Don't cut a multibyte character for the text path
+        self.batch = self.batch.decode("utf-8", "ignore").encode("utf-8")
+        self.batches = max(1, (megabytes * 1024 * 1024) // len(self.batch))
+        self.total_mb = self.batches * len(self.batch) / (1024 * 1024)
+        self.results = {}
+        self.started = 0.0
+        self.mode = None
+        self.backend.done.connect(self.finish_mode)
+
+    def start(self):
+        # Completion marker for the web channel path arrives in-order with the data
+        self.view.page().runJavaScript(
+            "backend.bench_marker.connect(() => term.write('', () => backend.bench_done()));"
+        )
+        QTimer.singleShot(200, lambda: self.run_mode("javascript"))
+
+    def run_mode(self, mode):
+        self.mode = mode
+        self.view.page().runJavaScript("term.reset();")
+        page = self.view.page()
+        text = self.batch.decode("utf-8")
+        b64 = base64.b64encode(self.batch).decode("ascii")
+        self.started = time.perf_counter()
+        if mode == "javascript":
+            script = f"window.handle_output({json.dumps(text)})"
+            for _ in range(self.batches):
+                page.runJavaScript(script)
+            page.runJavaScript("term.write('', () => backend.bench_done());")
+        else:
+            for _ in range(self.batches):
+                self.backend.output_b64.emit(b64)
+            self.backend.bench_marker.emit()
+
+    def finish_mode(self):
+        elapsed = time.perf_counter() - self.started
+        self.results[self.mode] = elapsed
+        print(f"{self.mode:10s} {self.total_mb:7.1f} MB in {elapsed:7.2f}s  "
+              f"{self.total_mb / elapsed:7.1f} MB/s")
+        if self.mode == "javascript":
+            QTimer.singleShot(500, lambda: self.run_mode("webchannel"))
+        else:
+            before = self.results["javascript"]
+            print(f"speedup    {before / elapsed:.2f}x")
+            QApplication.instance().quit()
+
+
+@click.command()
+@click.option("--mb", default=100, show_default=True, help="Megabytes of output to stream")
+@click.option("--batch-kb", default=64, show_default=True, help="Batch size produced by OutputBatcher")
+def main(mb, batch_kb):
+    app = QApplication(sys.argv)
+    view = QWebEngineView()
+    channel = QWebChannel()
+    backend = BenchBackend()
+    channel.registerObject("backend", backend)
+    view.page().setWebChannel(channel)
+    view.resize(1000, 600)
+    view.show()
+
+    bench = Bench(view, backend, mb, batch_kb)
+    view.loadFinished.connect(lambda ok: QTimer.singleShot(1000, bench.start))
+    view.load(QUrl.fromLocalFile(os.path.abspath(os.path.join(STATIC_DIR, "qtsshcon.html"))))
+    sys.exit(app.exec())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Web terminal framing: JSON + base64 ``ssh_output`` messages versus binary
+frames (pyretroterm/ssh/ws_frames.py).
+
+Streams a flood from the local test server through SSHClientManager into a
+fake websocket in both modes and reports bytes on the wire, wall time and
+the CPU spent per MB encoding on the server and decoding on the client.
+
+    python benchmarks/bench_ws_framing.py --flood-mb 20
+"""
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+import uuid
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from pyretroterm.ssh.ssh_manager import SSHClientManager  # noqa: E402
+from pyretroterm.ssh.ws_frames import decode_frame  # noqa: E402
+from ssh_test_server import SSHTestServer  # noqa: E402
+
+
+class CountingWebSocket:
+    """Serialises like Starlette would and counts what goes on the wire."""
+
+    def __init__(self):
+        self.wire_bytes = 0
+        self.payload_bytes = 0
+        self.messages = []
+        self.tail = b""
+        self.changed = asyncio.Event()
+
+    async def send_json(self, message):
+        text = json.dumps(message, separators=(",", ":"))
+        self.wire_bytes += len(text.encode("utf-8"))
+        self.messages.append(text)
+        if message.get("type") == "ssh_output":
+            payload = base64.b64decode(message["data"])
+            self.payload_bytes += len(payload)
+            self.tail = (self.tail + payload)[-64:]
+        self.changed.set()
+
+    async def send_bytes(self, data):
+        self.wire_bytes += len(data)
+        self.messages.append(data)
+        payload = data[18:]
+        self.payload_bytes += len(payload)
+        self.tail = (self.tail + payload)[-64:]
+        self.changed.set()
+
+    async def wait_for_prompt(self, min_payload, timeout=60):
+        deadline = time.perf_counter() + timeout
+        while not (self.payload_bytes >= min_payload and self.tail.endswith(b"$ ")):
+            self.changed.clear()
+            await asyncio.wait_for(self.changed.wait(), deadline - time.perf_counter())
+
+
+def client_decode_cost(messages):
+    """CPU the browser side would spend turning messages back into bytes (Python stand-in)."""
+    started = time.process_time()
+    for message in messages:
+        if isinstance(message, bytes):
+            decode_frame(message)
+        else:
+            parsed = json.loads(message)
+            if parsed.get("type") == "ssh_output":
+                base64.b64decode(parsed["data"])
+    return time.process_time() - started
+
+
+async def run_mode(framing, port, flood_bytes):
+    manager = SSHClientManager()
+    websocket = CountingWebSocket()
+    tab_id = str(uuid.uuid4())
+    await manager.create_client(tab_id)
+    await manager.connect(tab_id, "127.0.0.1", port, "bench", "bench", websocket, framing=framing)
+    pump = asyncio.create_task(manager.listen_to_ssh_output(tab_id, websocket))
+    await websocket.wait_for_prompt(1)
+
+    websocket.wire_bytes = websocket.payload_bytes = 0
+    websocket.messages = []
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    await manager.send_input(tab_id, f"flood {flood_bytes}\r")
+    await websocket.wait_for_prompt(flood_bytes)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    pump.cancel()
+    await manager.disconnect(tab_id)
+
+    mb = websocket.payload_bytes / (1024 * 1024)
+    overhead = (websocket.wire_bytes / websocket.payload_bytes - 1) * 100
+    decode_cpu = client_decode_cost(websocket.messages)
+    print(f"{framing:7s} {mb:6.1f} MB payload  {websocket.wire_bytes / (1024 * 1024):6.1f} MB on wire "
+          f"(+{overhead:4.1f}%)  {len(websocket.messages):5d} msgs  {mb / elapsed:6.1f} MB/s  "
+          f"process cpu {cpu * 1000 / mb:6.1f} ms/MB  client decode {decode_cpu * 1000 / mb:5.2f} ms/MB")
+
+
+@click.command()
+@click.option("--flood-mb", default=20.0, show_default=True, help="Megabytes of output to stream")
+def main(flood_mb):
+    server = SSHTestServer()
+    port = server.start()
+    try:
+        for framing in ("json", "binary"):
+            asyncio.run(run_mode(framing, port, int(flood_mb * 1024 * 1024)))
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Minimal local SSH server for the benchmarks, built on paramiko.
+
+Accepts one username/password, gives every session a pty-less "shell" that
+echoes whatever it receives and understands a couple of commands:
+
+    flood <bytes>    send that many bytes of sample terminal output, then the prompt
+    exit             close the channel
+
+It also forwards direct-tcpip channels, so it can stand in for a jump host.
+
+Run it standalone to point the GUI at it:
+
+    python benchmarks/ssh_test_server.py --port 2222
+"""
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import click
+import paramiko
+
+# Teardown of benchmark sessions is abrupt, keep paramiko's socket errors quiet
+logging.getLogger("paramiko").setLevel(logging.CRITICAL)
+
+PROMPT = b"\r\nbench-host$ "
+
+SAMPLE = (
+    b"Gi1/0/1   uplink-core-01     connected    trunk      a-full a-1000 10/100/1000BaseTX\r\n"
+    b"Gi1/0/2   access-02          notconnect   10           auto   auto 10/100/1000BaseTX\r\n"
+    b"\x1b[32m%LINK-3-UPDOWN: Interface Gi1/0/3, changed state to up\x1b[0m\r\n"
+)
+
+_host_key = None
+
+
+def host_key():
+    global _host_key
+    if _host_key is None:
+        _host_key = paramiko.RSAKey.generate(2048)
+    return _host_key
+
+
+class _Server(paramiko.ServerInterface):
+    def __init__(self, username, password, on_login=None):
+        self.username = username
+        self.password = password
+        self.on_login = on_login
+        self.shell_requested = threading.Event()
+        self.forwards = {}
+
+    def check_auth_password(self, username, password):
+        if username == self.username and password == self.password:
+            if self.on_login is not None:
+                self.on_login()
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_direct_tcpip_request(self, chanid, origin, destination):
+        # Like sshd, only confirm the channel once the destination answered
+        try:
+            self.forwards[chanid] = socket.create_connection(destination, timeout=10)
+        except OSError:
+            return paramiko.OPEN_FAILED_CONNECT_FAILED
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_window_change_request(self, channel, width, height, pixelwidth, pixelheight):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell_requested.set()
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        return False
+
+
+class SSHTestServer:
+    """
+    Threaded test server. ``start()`` returns the port it is listening on.
+
+    :param latency: seconds added before every reply, to simulate a WAN link.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, username="bench", password="bench", latency=0.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self._sock = None
+        self._running = False
+        self._transports = []
+        # Successful password logins, e.g. to count bastion authentications
+        self.logins = 0
+
+    def start(self):
+        host_key()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.host, self.port))
+        self._sock.listen(100)
+        self.port = self._sock.getsockname()[1]
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self.port
+
+    def stop(self):
+        self._running = False
+        try:
+            self._sock.close()
+        except Exception:
+            pass
+        for transport in self._transports:
+            transport.close()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                client, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(client,), daemon=True).start()
+
+    def _handle(self, client):
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        transport = paramiko.Transport(client)
+        self._transports.append(transport)
+        transport.add_server_key(host_key())
+        # Offer zlib like OpenSSH does, clients that don't ask for it get none
+        transport.use_compression(True)
+        server = _Server(self.username, self.password, on_login=self._count_login)
+        try:
+            transport.start_server(server=server)
+        except paramiko.SSHException:
+            return
+        while self._running and transport.is_active():
+            channel = transport.accept(1)
+            if channel is None:
+                continue
+            sock = server.forwards.pop(channel.get_id(), None)
+            if sock is not None:
+                threading.Thread(target=self._forward, args=(channel, sock), daemon=True).start()
+                continue
+            threading.Thread(target=self._shell, args=(channel, server), daemon=True).start()
+
+    def _count_login(self):
+        self.logins += 1
+
+    def _forward(self, channel, sock):
+        """Relay a direct-tcpip channel to its destination."""
+        sock.settimeout(None)
+
+        def pump(read, write, done):
+            try:
+                while True:
+                    data = read(65536)
+                    if not data:
+                        break
+                    write(data)
+            except (OSError, EOFError, paramiko.SSHException):
+                pass
+            done()
+
+        threading.Thread(target=pump, args=(sock.recv, channel.sendall, channel.close), daemon=True).start()
+        pump(channel.recv, sock.sendall, sock.close)
+
+    def _shell(self, channel, server):
+        try:
+            self._run_shell(channel, server)
+        except (EOFError, OSError, paramiko.SSHException):
+            # Client went away mid-write
+            pass
+
+    def _run_shell(self, channel, server):
+        server.shell_requested.wait(5)
+        self._send(channel, b"Welcome to the benchmark server" + PROMPT)
+        line = b""
+        while True:
+            data = channel.recv(65536)
+            if not data:
+                break
+            if self.latency:
+                time.sleep(self.latency)
+            channel.sendall(data)
+            line += data
+            while b"\r" in line or b"\n" in line:
+                cut = min(i for i in (line.find(b"\r"), line.find(b"\n")) if i >= 0)
+                command, line = line[:cut].strip(), line[cut + 1:]
+                if not self._command(channel, command):
+                    channel.close()
+                    return
+        channel.close()
+
+    def _command(self, channel, command):
+        if command == b"exit":
+            return False
+        if command.startswith(b"flood"):
+            try:
+                remaining = int(command.split()[1])
+            except (IndexError, ValueError):
+                remaining = 1024 * 1024
+            block = SAMPLE * (32768 // len(SAMPLE))
+            channel.sendall(b"\r\n")
+            while remaining > 0:
+                chunk = block[:remaining]
+                channel.sendall(chunk)
+                remaining -= len(chunk)
+        if command:
+            self._send(channel, PROMPT)
+        return True
+
+    def _send(self, channel, data):
+        if self.latency:
+            time.sleep(self.latency)
+        channel.sendall(data)
+
+
+def spawn_server(latency=0.0):
+    """
+    Run the server in a child process, for benchmarks whose client side
+    changes paramiko globals.
+
+    :return: (process, port); terminate the process when done.
+    """
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--port", "0", "--latency", str(latency)],
+        stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    port = int(line.split(":")[1].split()[0])
+    return process, port
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=2222, show_default=True, help="0 picks a free port")
+@click.option("--username", default="bench", show_default=True)
+@click.option("--password", default="bench", show_default=True)
+@click.option("--latency", default=0.0, show_default=True, help="Seconds added before every reply")
+def main(host, port, username, password, latency):
+    server = SSHTestServer(host, port, username, password, latency)
+    server.start()
+    click.echo(f"Listening on {host}:{server.port} as {username}/{password}, Ctrl+C to stop")
+    sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,7 @@ from pyretroterm.themes3 import ThemeLibrary, LayeredHUDFrame, ThemeMapper
 from PyQt6.QtGui import QPalette, QColor
 from PyQt6.QtWidgets import QApplication, QMainWindow, QSplitter, QWidget, QHBoxLayout, QVBoxLayout, QMessageBox, \
     QInputDialog, QLineEdit, QStyleFactory
-from PyQt6.QtCore import QUrl, QThread, Qt, QCoreApplication, pyqtSignal
+from PyQt6.QtCore import QUrl, QThread, Qt, QCoreApplication, QTimer, pyqtSignal
 from contextlib import closing
 from typing import Optional, cast
 import click
@@ -27,6 +27,7 @@ from pyretroterm.helpers.settings import SettingsManager
 from pyretroterm.helpers.credslib import SecureCredentials
 
 from pyretroterm.widgets.setup import setup_menus
+from pyretroterm.ssh.log_index import LogIndexer
 from pyretroterm.widgets.terminal_tabs import TerminalTabWidget
 
 # Configure logging
@@ -100,6 +101,9 @@ class pyRetroTermWindow(QMainWindow):
         # self.start_server()
         self.session_navigator.connect_requested.connect(self.handle_session_connect)
 
+        # Pick up the sessions a connection broker kept across the restart
+        QTimer.singleShot(0, self.terminal_tabs.reattach_broker_sessions)
+
     def launch_telemetry(self):
         pass
 
@@ -355,6 +359,9 @@ class pyRetroTermWindow(QMainWindow):
         self.terminal_splitter.setSizes([250, width - 250])
         setup_menus(self)
 
+        # Index session logs in the background for Tools > Search Logs
+        LogIndexer.instance()
+
 
     # def switch_theme(self, theme_name: str):
     #     """Override switch_theme to save the preference."""
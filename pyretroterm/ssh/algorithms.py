@@ -0,0 +1,278 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import paramiko
+from paramiko.ssh_exception import IncompatiblePeer
+
+logger = logging.getLogger(__name__)
+
+# Algorithm tiers, tried in order until the host agrees on one set:
+#   'modern' - AEAD ciphers and curve25519/ECDH key exchange, what any
+#              current OpenSSH or network OS negotiates
+#   'legacy' - the modern set followed by CBC ciphers, SHA-1 key exchange
+#              and ssh-rsa/ssh-dss host keys for old switches and routers
+TIER_MODERN = "modern"
+TIER_LEGACY = "legacy"
+TIERS = (TIER_MODERN, TIER_LEGACY)
+
+MODERN = {
+    'ciphers': (
+        "chacha20-poly1305@openssh.com",
+        "aes256-gcm@openssh.com",
+        "aes128-gcm@openssh.com",
+        "aes128-ctr",
+        "aes256-ctr",
+        "aes192-ctr",
+    ),
+    'kex': (
+        "curve25519-sha256",
+        "curve25519-sha256@libssh.org",
+        "ecdh-sha2-nistp256",
+        "ecdh-sha2-nistp384",
+        "ecdh-sha2-nistp521",
+        "diffie-hellman-group16-sha512",
+        "diffie-hellman-group-exchange-sha256",
+        "diffie-hellman-group14-sha256",
+    ),
+    'keys': (
+        "ssh-ed25519",
+        "ecdsa-sha2-nistp256",
+        "ecdsa-sha2-nistp384",
+        "ecdsa-sha2-nistp521",
+        "rsa-sha2-512",
+        "rsa-sha2-256",
+    ),
+    'macs': (
+        "hmac-sha2-256-etm@openssh.com",
+        "hmac-sha2-512-etm@openssh.com",
+        "hmac-sha2-256",
+        "hmac-sha2-512",
+    ),
+}
+
+LEGACY = {
+    'ciphers': ("aes128-cbc", "aes256-cbc", "aes192-cbc", "3des-cbc"),
+    'kex': ("diffie-hellman-group14-sha1", "diffie-hellman-group-exchange-sha1", "diffie-hellman-group1-sha1"),
+    'keys': ("ssh-rsa", "ssh-dss"),
+    'macs': ("hmac-sha1", "hmac-sha1-96", "hmac-md5", "hmac-md5-96"),
+}
+
+# SecurityOptions field for each category
+_OPTION_FIELDS = {'ciphers': 'ciphers', 'kex': 'kex', 'keys': 'key_types', 'macs': 'digests'}
+
+DEFAULT_CACHE_PATH = "./algorithm_cache.json"
+
+
+def _supported(category):
+    """Algorithm names of a category this paramiko can actually run."""
+    if category == 'ciphers':
+        return set(paramiko.Transport._cipher_info)
+    if category == 'kex':
+        # curve25519 is only in paramiko's own list when the backend has X25519
+        return {name for name in paramiko.Transport._kex_info
+                if not name.startswith("curve25519") or name in paramiko.Transport._preferred_kex}
+    if category == 'keys':
+        return set(paramiko.Transport._key_info)
+    return set(paramiko.Transport._mac_info)
+
+
+def preferences(tier):
+    """
+    :return: dict of category -> names in order of preference for a tier,
+             limited to what paramiko implements.
+    """
+    if tier not in TIERS:
+        raise ValueError(f"Unknown algorithm tier: {tier}")
+    result = {}
+    for category, names in MODERN.items():
+        if tier == TIER_LEGACY:
+            names = names + LEGACY[category]
+        supported = _supported(category)
+        result[category] = tuple(name for name in names if name in supported)
+    return result
+
+
+def apply_preferences(transport, tier):
+    """Set a transport's algorithm preferences, before its key exchange starts."""
+    options = transport.get_security_options()
+    for category, names in preferences(tier).items():
+        setattr(options, _OPTION_FIELDS[category], names)
+
+
+def negotiated(transport):
+    """
+    :return: dict of the algorithms a connected transport agreed on.
+    """
+    return {
+        'kex': getattr(transport, 'kex_name', None),
+        'cipher': getattr(transport, 'local_cipher', None),
+        'mac': getattr(transport, 'local_mac', None),
+        'host_key': getattr(transport, 'host_key_type', None),
+        'compression': getattr(transport, 'local_compression', None),
+    }
+
+
+def needs_legacy(agreed):
+    """Whether any agreed algorithm is only in the legacy tier."""
+    legacy = {name for names in LEGACY.values() for name in names}
+    return any(agreed.get(field) in legacy for field in ('kex', 'cipher', 'mac', 'host_key'))
+
+
+class AlgorithmCache:
+    """
+    Per-host record of the algorithm tier that negotiated, what was agreed
+    and how long each connect phase took, kept in a small JSON file.
+
+    Hosts that needed the legacy tier go straight to it next time instead of
+    failing the modern attempt first. A legacy host that now agrees on
+    modern algorithms moves back to the modern tier.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self._hosts = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(host, port):
+        return f"{str(host).strip().lower()}:{int(port)}"
+
+    def _load(self):
+        if self._hosts is None:
+            self._hosts = {}
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._hosts = json.load(f)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring algorithm cache {self.path}: {e}")
+        return self._hosts
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._hosts, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.debug(f"Could not save algorithm cache: {e}")
+
+    def tiers(self, host, port):
+        """Tiers to try for a host, in order."""
+        with self._lock:
+            entry = self._load().get(self._key(host, port))
+        if entry and entry.get('tier') == TIER_LEGACY:
+            return [TIER_LEGACY]
+        return list(TIERS)
+
+    def get(self, host, port):
+        with self._lock:
+            entry = self._load().get(self._key(host, port))
+            return dict(entry) if entry else None
+
+    def record(self, host, port, transport, timings, fallbacks=0):
+        """
+        Note a successful connect.
+
+        :param timings: seconds per connect phase, e.g. ConnectWorker.timings.
+        :param fallbacks: tiers that failed to negotiate before this one.
+        """
+        agreed = negotiated(transport)
+        with self._lock:
+            hosts = self._load()
+            entry = hosts.setdefault(self._key(host, port), {'connects': 0, 'fallbacks': 0})
+            entry.update(agreed)
+            entry['tier'] = TIER_LEGACY if needs_legacy(agreed) else TIER_MODERN
+            entry['timings_ms'] = {phase: round(seconds * 1000, 1) for phase, seconds in timings.items()}
+            entry['connects'] += 1
+            entry['fallbacks'] += fallbacks
+            entry['updated'] = time.time()
+            self._save()
+        logger.info(f"{host}:{port} negotiated {agreed['kex']} / {agreed['cipher']} / {agreed['mac']} "
+                    f"/ {agreed['host_key']} in {entry['timings_ms']}")
+        return entry
+
+    def forget(self, host, port):
+        with self._lock:
+            if self._load().pop(self._key(host, port), None) is not None:
+                self._save()
+
+
+class NegotiatingTransport(paramiko.Transport):
+    """
+    Transport that remembers which key exchange it agreed on (paramiko
+    drops the engine once it is done) and how long the exchange took.
+    """
+    kex_name = None
+    kex_time = 0.0
+
+    def start_client(self, event=None, timeout=None):
+        started = time.monotonic()
+        try:
+            return super().start_client(event, timeout)
+        finally:
+            self.kex_time = time.monotonic() - started
+
+    def _parse_kex_init(self, m):
+        super()._parse_kex_init(m)
+        self.kex_name = next((name for name, kex_class in self._kex_info.items()
+                              if type(self.kex_engine) is kex_class), None)
+
+
+def connect_client(client, hostname, port=22, profile=None, open_sock=None, **kwargs):
+    """
+    ``SSHClient.connect`` with the host's algorithm tiers, falling back to
+    the legacy tier when the modern one has nothing in common with the host.
+    The result and phase timings go into the AlgorithmCache.
+
+    :param profile: TransportProfile applied before the key exchange.
+    :param open_sock: callable returning the socket to connect over, called
+                      again for each attempt, e.g. a jump host tunnel.
+    :param kwargs: passed on to SSHClient.connect.
+    :return: dict of phase timings in seconds.
+    """
+    cache = AlgorithmCache.instance()
+    tiers = cache.tiers(hostname, port)
+    if profile is not None:
+        kwargs['compress'] = profile.compression
+    for attempt, tier in enumerate(tiers):
+        timings = {}
+        started = time.monotonic()
+        if open_sock is not None:
+            kwargs['sock'] = open_sock()
+
+        def factory(sock, **factory_kwargs):
+            # SSHClient has resolved the name and connected by now
+            timings['tcp'] = time.monotonic() - started
+            transport = NegotiatingTransport(sock, **factory_kwargs)
+            apply_preferences(transport, tier)
+            if profile is not None:
+                profile.apply(transport)
+            return transport
+
+        try:
+            client.connect(hostname, port=port, transport_factory=factory, **kwargs)
+        except IncompatiblePeer as e:
+            if attempt == len(tiers) - 1:
+                raise
+            logger.info(f"{hostname}:{port} has no {tier} algorithms in common ({e}), retrying with {tiers[attempt + 1]}")
+            client.close()
+            continue
+        transport = client.get_transport()
+        timings['kex'] = transport.kex_time
+        timings['auth'] = time.monotonic() - started - timings['tcp'] - timings['kex']
+        cache.record(hostname, port, transport, timings, fallbacks=attempt)
+        return timings
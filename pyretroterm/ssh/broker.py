@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+Connection broker: a local process that holds SSH sessions for the GUI, so
+restarting pyRetroTerm doesn't cost every device a fresh login.
+
+The broker logs in with the same ConnectWorker the GUI uses (jump hosts,
+transport profiles, algorithm tiers and shared transports included), reads
+every shell into a per-session buffer whether or not a GUI is watching and
+serves the sessions on a Unix socket only this user can open. A terminal
+tab attaches to a session, detaches when the GUI exits, and the next GUI
+attaches again and gets the buffered output replayed first.
+
+    pyretroterm-broker                    # run in the foreground
+    pyretroterm-broker --list             # sessions the running broker holds
+    pyretroterm-broker --stop             # close them all and exit
+
+Every message is one frame: a kind byte and a 4 byte length, then JSON
+(kind J) or raw session bytes (kind D). A connection starts with one
+request:
+
+    {"op": "open", "session": {...}, "meta": {...}}   log in, then attached
+    {"op": "attach", "id": ..., "offset": n}          replay from offset, then attached
+    {"op": "list"}, {"op": "shutdown"}                one reply each
+
+Once attached, D frames carry shell output one way and keystrokes the
+other, J frames carry resize, keepalive, detach and close.
+"""
+import json
+import logging
+import os
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+
+import click
+from PyQt6.QtCore import Qt
+
+from .connect_pipeline import ConnectWorker
+from .jump import JumpHost
+from .transport_profile import TransportProfile
+from .transport_registry import TransportRegistry
+
+logger = logging.getLogger(__name__)
+
+# Output kept per session for a GUI that attaches later
+DEFAULT_BUFFER_BYTES = 4 * 1024 * 1024
+
+# Seconds between keepalives on a broker held transport, so NAT and
+# firewalls don't drop sessions no GUI is looking at
+KEEPALIVE_INTERVAL = 30
+
+FRAME_HEADER = struct.Struct("!cI")
+FRAME_JSON = b"J"
+FRAME_DATA = b"D"
+
+READ_SIZE = 65536
+
+
+def broker_available():
+    """Unix sockets, so not on Windows."""
+    return hasattr(socket, "AF_UNIX")
+
+
+def default_socket_path():
+    """
+    ``$PYRETROTERM_BROKER``, else ``broker.sock`` in a directory only this
+    user can open, under ``$XDG_RUNTIME_DIR`` or the temp dir.
+    """
+    path = os.environ.get("PYRETROTERM_BROKER")
+    if path:
+        return path
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"pyretroterm-{os.getuid()}", "broker.sock")
+
+
+def send_frame(sock, kind, body):
+    sock.sendall(FRAME_HEADER.pack(kind, len(body)) + body)
+
+
+def send_message(sock, message):
+    send_frame(sock, FRAME_JSON, json.dumps(message).encode("utf-8"))
+
+
+def read_frame(reader):
+    """
+    :param reader: the socket's ``makefile("rb")``.
+    :return: (kind, dict for JSON or bytes for data), (None, None) at EOF.
+    """
+    header = reader.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None, None
+    kind, size = FRAME_HEADER.unpack(header)
+    body = reader.read(size)
+    if len(body) < size:
+        return None, None
+    if kind == FRAME_JSON:
+        return kind, json.loads(body)
+    return kind, body
+
+
+def connect_broker(path=None, timeout=None):
+    """
+    :return: socket connected to the broker.
+    :raises OSError: no broker is listening, e.g. FileNotFoundError.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path or default_socket_path())
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def request(message, path=None, timeout=5):
+    """Send a one-shot request (list, shutdown) and return the broker's reply."""
+    sock = connect_broker(path, timeout)
+    try:
+        send_message(sock, message)
+        with sock.makefile("rb") as reader:
+            kind, reply = read_frame(reader)
+    finally:
+        sock.close()
+    if kind != FRAME_JSON:
+        raise ConnectionResetError("The connection broker closed the connection")
+    return reply
+
+
+class OutputBuffer:
+    """The last ``max_bytes`` of a session's output, addressed by stream offset."""
+
+    def __init__(self, max_bytes=DEFAULT_BUFFER_BYTES):
+        self.max_bytes = max_bytes
+        self._chunks = deque()
+        # Stream offsets of the first byte held and of the next byte to come
+        self.start = 0
+        self.end = 0
+
+    def append(self, data):
+        self._chunks.append(data)
+        self.end += len(data)
+        while self.end - self.start > self.max_bytes and len(self._chunks) > 1:
+            self.start += len(self._chunks.popleft())
+
+    def read(self, offset):
+        """
+        :return: (offset of the first byte returned, the bytes from there on),
+                 clipped to what is still held.
+        """
+        offset = min(max(offset, self.start), self.end)
+        parts = []
+        pos = self.start
+        for chunk in self._chunks:
+            end = pos + len(chunk)
+            if end > offset:
+                parts.append(chunk[max(0, offset - pos):])
+            pos = end
+        return offset, b"".join(parts)
+
+
+class _Client:
+    """A GUI connection, writes from the session readers and keepalive threads are serialised."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+        self._lock = threading.Lock()
+
+    def send(self, kind, body):
+        with self._lock:
+            send_frame(self.sock, kind, body)
+
+    def message(self, **message):
+        self.send(FRAME_JSON, json.dumps(message).encode("utf-8"))
+
+    def close(self):
+        # shutdown wakes a reader or writer blocked on the socket in another thread
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class BrokerSession:
+    """
+    One shell held by the broker. A thread per session reads the channel
+    into the buffer and on to the attached GUI, if any, so a GUI that has
+    stopped reading holds up its own session and no other.
+    """
+
+    def __init__(self, session_id, client, channel, transport_entry, settings, meta=None,
+                 buffer_bytes=DEFAULT_BUFFER_BYTES, on_closed=None):
+        """
+        :param transport_entry: TransportRegistry handle the session holds a
+                                reference on, None if the client is its own.
+        :param meta: whatever the GUI wants back when it reattaches.
+        :param on_closed: called with the session once the shell has closed.
+        """
+        self.id = session_id
+        self.client = client
+        self.channel = channel
+        self.transport_entry = transport_entry
+        self.host = settings['host']
+        self.port = int(settings.get('port', 22))
+        self.username = settings['username']
+        self.meta = meta or {}
+        self.on_closed = on_closed
+        self.buffer = OutputBuffer(buffer_bytes)
+        self.attached = None
+        self.opened = time.time()
+        self.detached_since = time.monotonic()
+        self.closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._read_loop, name=f"BrokerSession-{self.host}", daemon=True)
+
+    def start(self):
+        transport = self.channel.get_transport()
+        if transport is not None:
+            transport.set_keepalive(KEEPALIVE_INTERVAL)
+        self._thread.start()
+
+    def attach(self, client, offset=0, event="attached"):
+        """
+        Replay the buffer from ``offset`` to a GUI and stream to it from then on.
+
+        :return: the offset the replay starts at, None if the session has closed.
+        """
+        previous = self.attached
+        if previous is not None and previous is not client:
+            # Killed without detaching, or attached twice; only one GUI at a time
+            previous.close()
+        with self._lock:
+            if self.closed:
+                return None
+            start, data = self.buffer.read(offset)
+            client.message(event=event, id=self.id, offset=start)
+            if data:
+                client.send(FRAME_DATA, data)
+            self.attached = client
+            self.detached_since = None
+        logger.info(f"Attached to {self.username}@{self.host}:{self.port} [{self.id[:8]}] from offset {start}")
+        return start
+
+    def detach(self, client):
+        with self._lock:
+            if self.attached is client:
+                self.attached = None
+                self.detached_since = time.monotonic()
+                logger.info(f"Detached from {self.username}@{self.host}:{self.port} [{self.id[:8]}]")
+
+    def send(self, data):
+        try:
+            self.channel.sendall(data)
+        except (OSError, EOFError) as e:
+            logger.debug(f"Input to closed session {self.id[:8]} dropped: {e}")
+
+    def resize(self, cols, rows):
+        try:
+            self.channel.resize_pty(width=int(cols), height=int(rows))
+        except Exception as e:
+            logger.debug(f"Resize of session {self.id[:8]} failed: {e}")
+
+    def keepalive(self, client, request_id):
+        """Relay a GUI's keepalive probe to the transport, answered from its own thread."""
+
+        def probe():
+            transport = self.channel.get_transport()
+            try:
+                transport.global_request("keepalive@openssh.com", wait=True)
+            except Exception as e:
+                logger.debug(f"Keepalive failed: {e}")
+            try:
+                client.message(event="keepalive", id=request_id, active=transport.is_active())
+            except OSError:
+                pass
+
+        threading.Thread(target=probe, name="BrokerKeepalive", daemon=True).start()
+
+    def close(self):
+        """Close the shell, the reader gives back the transport once it has drained."""
+        try:
+            self.channel.close()
+        except Exception as e:
+            # The transport is already gone, which closes the channel anyway
+            logger.debug(f"Closing session {self.id[:8]}: {e}")
+
+    def info(self):
+        return {
+            'id': self.id,
+            'host': self.host,
+            'port': self.port,
+            'username': self.username,
+            'attached': self.attached is not None,
+            'opened': self.opened,
+            'detached_for': None if self.detached_since is None else time.monotonic() - self.detached_since,
+            'buffered': self.buffer.end - self.buffer.start,
+            'offset': self.buffer.end,
+            'meta': self.meta,
+        }
+
+    def _read_loop(self):
+        while True:
+            try:
+                data = self.channel.recv(READ_SIZE)
+            except Exception as e:
+                logger.debug(f"Session {self.id[:8]} read failed: {e}")
+                data = b""
+            if not data:
+                break
+            with self._lock:
+                self.buffer.append(data)
+                client = self.attached
+                if client is not None:
+                    try:
+                        client.send(FRAME_DATA, data)
+                    except OSError:
+                        # The GUI went away, keep buffering for the next one
+                        self.attached = None
+                        self.detached_since = time.monotonic()
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self.closed = True
+            client, self.attached = self.attached, None
+        logger.info(f"Session {self.username}@{self.host}:{self.port} [{self.id[:8]}] closed")
+        if client is not None:
+            try:
+                client.message(event="closed", id=self.id)
+            except OSError:
+                pass
+            client.close()
+        self.close()
+        if self.transport_entry is not None:
+            TransportRegistry.instance().release(self.transport_entry)
+        else:
+            self.client.close()
+        if self.on_closed is not None:
+            self.on_closed(self)
+
+
+def _listen(path):
+    """Bind the broker socket in a directory only this user can open."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if os.stat(directory).st_uid != os.getuid():
+        raise RuntimeError(f"{directory} belongs to another user, not listening there")
+    os.chmod(directory, 0o700)
+    if os.path.exists(path):
+        try:
+            connect_broker(path, timeout=1).close()
+        except OSError:
+            # Left behind by a broker that didn't exit cleanly
+            os.unlink(path)
+        else:
+            raise RuntimeError(f"A broker is already listening on {path}")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    os.chmod(path, 0o600)
+    listener.listen(16)
+    # Wake up now and then to notice shutdown
+    listener.settimeout(1.0)
+    return listener
+
+
+class Broker:
+    """
+    Owns the sessions and serves GUI connections on the broker socket, one
+    thread per connection.
+    """
+
+    def __init__(self, path=None, buffer_bytes=DEFAULT_BUFFER_BYTES, detached_timeout=0):
+        """
+        :param detached_timeout: seconds a session may stay detached before it
+                                 is closed, 0 to keep it until it is closed.
+        """
+        self.path = path or default_socket_path()
+        self.buffer_bytes = buffer_bytes
+        self.detached_timeout = detached_timeout
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._listener = None
+
+    def serve_forever(self):
+        self._listener = _listen(self.path)
+        logger.info(f"Connection broker listening on {self.path}")
+        try:
+            while not self._stop.is_set():
+                try:
+                    sock, _ = self._listener.accept()
+                except socket.timeout:
+                    self._expire()
+                    continue
+                except OSError:
+                    break
+                sock.settimeout(None)
+                threading.Thread(target=self._handle, args=(sock,), name="BrokerClient", daemon=True).start()
+        finally:
+            self._listener.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.close_all()
+
+    def shutdown(self):
+        self._stop.set()
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            session.close()
+        TransportRegistry.instance().close_all()
+
+    def _expire(self):
+        if not self.detached_timeout:
+            return
+        now = time.monotonic()
+        with self._lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            if session.detached_since is not None and now - session.detached_since > self.detached_timeout:
+                logger.info(f"Closing session {session.id[:8]} to {session.host}, detached too long")
+                session.close()
+
+    def _session_closed(self, session):
+        with self._lock:
+            self.sessions.pop(session.id, None)
+
+    def _handle(self, sock):
+        client = _Client(sock)
+        try:
+            kind, message = read_frame(client.reader)
+            if kind != FRAME_JSON:
+                return
+            op = message.get('op')
+            if op == "list":
+                with self._lock:
+                    sessions = [session.info() for session in self.sessions.values()]
+                client.message(event="sessions", sessions=sessions)
+            elif op == "shutdown":
+                client.message(event="ok")
+                self.shutdown()
+            elif op == "open":
+                session = self._open(client, message)
+                if session is not None:
+                    self._serve(client, session)
+            elif op == "attach":
+                with self._lock:
+                    session = self.sessions.get(message.get('id'))
+                if session is None or session.attach(client, int(message.get('offset', 0))) is None:
+                    client.message(event="failed", title="Session Closed",
+                                   message="The broker no longer holds this session")
+                else:
+                    self._serve(client, session)
+            else:
+                client.message(event="failed", title="Broker Error", message=f"Unknown request: {op}")
+        except (OSError, ValueError) as e:
+            logger.debug(f"Broker connection ended: {e}")
+        finally:
+            client.close()
+
+    def _open(self, client, message):
+        """Log in with a ConnectWorker run on this thread, stages go to the GUI as they happen."""
+        settings = message.get('session') or {}
+        worker = ConnectWorker(settings['host'], settings.get('port', 22), settings['username'],
+                               password=settings.get('password'), key_path=settings.get('key_path'),
+                               timeout=settings.get('timeout', 10), term=settings.get('term', "xterm"),
+                               reuse_transport=settings.get('reuse_transport', True),
+                               profile=TransportProfile.from_dict(settings.get('profile')),
+                               jump=JumpHost.parse(settings.get('jump')))
+        result = {}
+
+        def on_stage(stage, detail):
+            try:
+                client.message(event="stage", stage=stage, detail=detail)
+            except OSError:
+                # The tab went away, don't finish a login nobody will use
+                worker.cancel()
+
+        direct = Qt.ConnectionType.DirectConnection
+        worker.signals.stage_changed.connect(on_stage, type=direct)
+        worker.signals.connected.connect(lambda ssh_client, channel: result.update(client=ssh_client, channel=channel),
+                                         type=direct)
+        worker.signals.failed.connect(lambda title, text: result.update(title=title, message=text), type=direct)
+        worker.run()
+
+        if 'channel' not in result:
+            if 'title' in result:
+                client.message(event="failed", title=result['title'], message=result['message'])
+            return None
+        session = BrokerSession(uuid.uuid4().hex, result['client'], result['channel'], worker.transport_entry,
+                                settings, meta=message.get('meta'), buffer_bytes=self.buffer_bytes,
+                                on_closed=self._session_closed)
+        with self._lock:
+            self.sessions[session.id] = session
+        session.start()
+        try:
+            session.attach(client, 0, event="connected")
+        except OSError:
+            session.close()
+            return None
+        return session
+
+    def _serve(self, client, session):
+        """Relay an attached GUI's input until it detaches, closes the session or goes away."""
+        try:
+            while True:
+                kind, message = read_frame(client.reader)
+                if kind is None:
+                    break
+                if kind == FRAME_DATA:
+                    session.send(message)
+                    continue
+                op = message.get('op')
+                if op == "resize":
+                    session.resize(message['cols'], message['rows'])
+                elif op == "keepalive":
+                    session.keepalive(client, message.get('id'))
+                elif op == "detach":
+                    break
+                elif op == "close":
+                    client.close()
+                    session.close()
+                    break
+        finally:
+            client.close()
+            session.detach(client)
+
+
+@click.command()
+@click.option('--socket', 'socket_path', envvar='PYRETROTERM_BROKER', default=None,
+              help='Unix socket to listen on (or set PYRETROTERM_BROKER), a per-user runtime dir by default')
+@click.option('--buffer-mb', default=DEFAULT_BUFFER_BYTES / (1024 * 1024), show_default=True,
+              help='Output kept per session for a GUI that attaches later')
+@click.option('--detached-timeout', default=0, show_default=True,
+              help='Close sessions left detached this many seconds, 0 keeps them until closed')
+@click.option('--list', 'list_sessions', is_flag=True, help='List the sessions the running broker holds')
+@click.option('--stop', is_flag=True, help='Close every session and stop the running broker')
+@click.option('--verbose', '-v', is_flag=True, help='Log connects, attaches and detaches')
+def main(socket_path, buffer_mb, detached_timeout, list_sessions, stop, verbose):
+    if not broker_available():
+        click.echo("The connection broker needs Unix domain sockets", err=True)
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO if verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if list_sessions or stop:
+        try:
+            reply = request({'op': "shutdown" if stop else "list"}, socket_path)
+        except OSError as e:
+            click.echo(f"No broker on {socket_path or default_socket_path()}: {e}", err=True)
+            sys.exit(1)
+        if list_sessions and not reply.get('sessions'):
+            click.echo("No sessions")
+        for session in reply.get('sessions', []):
+            state = "attached" if session['attached'] else f"detached {session['detached_for']:.0f}s"
+            click.echo(f"{session['id'][:8]}  {session['username']}@{session['host']}:{session['port']}  "
+                       f"{state}  {session['buffered'] // 1024} KB buffered")
+        return
+
+    broker = Broker(socket_path, buffer_bytes=int(buffer_mb * 1024 * 1024), detached_timeout=detached_timeout)
+    try:
+        broker.serve_forever()
+    except RuntimeError as e:
+        click.echo(str(e), err=True)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
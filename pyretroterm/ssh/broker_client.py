@@ -0,0 +1,310 @@
+import itertools
+import json
+import logging
+import socket
+import threading
+
+from paramiko import pipe
+from paramiko.buffered_pipe import BufferedPipe
+
+from .broker import (FRAME_DATA, FRAME_JSON, broker_available, connect_broker, default_socket_path, read_frame,
+                     request, send_frame)
+from .connect_pipeline import ConnectCancelled, ConnectWorker
+from .health import DEAD_AFTER
+
+logger = logging.getLogger(__name__)
+
+# Output read off the broker socket but not yet taken by the reactor. Past
+# this the socket isn't read, so a paused terminal holds up the broker and
+# through it the SSH window, as it does for a channel of our own.
+IN_BUFFER_MAX = 1024 * 1024
+
+# What a PasteWorker is told it may send at once, there is no SSH window here
+SEND_WINDOW = 32768
+
+
+def list_sessions(path=None):
+    """
+    :return: info dicts for the sessions a running broker holds, empty if
+             there is no broker.
+    """
+    if not broker_available():
+        return []
+    try:
+        return request({'op': "list"}, path).get('sessions', [])
+    except OSError:
+        return []
+
+
+class BrokerTransport:
+    """
+    Stands in for the transport of a brokered session, so the HealthMonitor
+    can watch it: keepalives go to the broker, which sends them on the real
+    transport and says whether it is still active.
+    """
+
+    def __init__(self, channel):
+        self._channel = channel
+        self.active = True
+
+    def is_active(self):
+        return self.active and not self._channel.eof_received
+
+    def global_request(self, kind, data=None, wait=True):
+        return self._channel.keepalive()
+
+
+class BrokerChannel:
+    """
+    A shell held by the connection broker, with as much of paramiko's Channel
+    API as the terminal uses. Output is read off the broker socket into a
+    BufferedPipe with a pollable fileno, the way paramiko buffers a channel,
+    so the ChannelReactor, PasteWorker and HealthMonitor need no changes.
+
+    ``close()`` closes the session in the broker, ``detach()`` leaves it
+    running there for another attach.
+    """
+    out_window_size = SEND_WINDOW
+    out_max_packet_size = SEND_WINDOW
+
+    def __init__(self, sock, reader, session_id, offset=0):
+        """
+        :param reader: the socket's ``makefile("rb")``, which may already hold
+                       output read along with the attach reply.
+        :param offset: stream offset of the first byte still to come.
+        """
+        self.session_id = session_id
+        # Stream offset of the next byte the terminal will get, to reattach from
+        self.offset = offset
+        self.closed = False
+        self.eof_received = False
+        self.detached = False
+        self.in_buffer = BufferedPipe()
+        self._pipe = pipe.make_pipe()
+        self.in_buffer.set_event(self._pipe)
+        self._sock = sock
+        self._reader = reader
+        self._send_lock = threading.Lock()
+        self._room = threading.Condition()
+        self._keepalive_ids = itertools.count(1)
+        self._keepalives = {}
+        self.transport = BrokerTransport(self)
+        self._thread = threading.Thread(target=self._read_loop, name="BrokerChannel", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _read_loop(self):
+        try:
+            while True:
+                kind, message = read_frame(self._reader)
+                if kind is None:
+                    break
+                if kind == FRAME_DATA:
+                    self.in_buffer.feed(message)
+                    with self._room:
+                        while len(self.in_buffer) > IN_BUFFER_MAX and not self.closed:
+                            self._room.wait(1.0)
+                elif message.get('event') == "keepalive":
+                    waiter = self._keepalives.pop(message.get('id'), None)
+                    if waiter is not None:
+                        waiter[1] = message.get('active', False)
+                        waiter[0].set()
+                elif message.get('event') == "closed":
+                    self.transport.active = False
+        except (OSError, ValueError) as e:
+            logger.debug(f"Broker session {self.session_id[:8]} read failed: {e}")
+        finally:
+            self.eof_received = True
+            self.transport.active = False
+            for event, _ in list(self._keepalives.values()):
+                event.set()
+            self.in_buffer.close()
+
+    def fileno(self):
+        return self._pipe.fileno()
+
+    def recv_ready(self):
+        return self.in_buffer.read_ready()
+
+    def recv(self, nbytes):
+        data = self.in_buffer.read(nbytes)
+        self.offset += len(data)
+        with self._room:
+            self._room.notify()
+        return data
+
+    def send_ready(self):
+        return not self.closed and not self.eof_received
+
+    def _send(self, kind, body):
+        with self._send_lock:
+            send_frame(self._sock, kind, body)
+
+    def _message(self, message):
+        self._send(FRAME_JSON, json.dumps(message).encode("utf-8"))
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if self.closed:
+            raise OSError("Broker session is closed")
+        self._send(FRAME_DATA, data)
+        return len(data)
+
+    def sendall(self, data):
+        self.send(data)
+
+    def resize_pty(self, width=80, height=24, width_pixels=0, height_pixels=0):
+        self._message({'op': "resize", 'cols': width, 'rows': height})
+
+    def keepalive(self):
+        """
+        Round trip a keepalive through the broker to the device, blocks until
+        the answer. A broker that doesn't answer within DEAD_AFTER seconds
+        counts as the transport being gone.
+        """
+        request_id = next(self._keepalive_ids)
+        waiter = [threading.Event(), False]
+        self._keepalives[request_id] = waiter
+        try:
+            self._message({'op': "keepalive", 'id': request_id})
+        except OSError:
+            self._keepalives.pop(request_id, None)
+            return None
+        if self.eof_received:
+            # The reader finished before it could see this one
+            return None
+        if not waiter[0].wait(DEAD_AFTER):
+            self._keepalives.pop(request_id, None)
+            logger.debug(f"Broker session {self.session_id[:8]} keepalive timed out")
+        if not waiter[1]:
+            self.transport.active = False
+            return None
+        return True
+
+    def get_transport(self):
+        return self.transport
+
+    def detach(self):
+        """Let go of the session, leaving it running in the broker."""
+        self._shut("detach")
+        self.detached = True
+
+    def close(self):
+        """Close the session in the broker as well."""
+        self._shut("close")
+
+    def _shut(self, op):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._message({'op': op})
+        except OSError:
+            pass
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        with self._room:
+            self._room.notify_all()
+        self._pipe.close()
+
+
+class BrokerConnectWorker(ConnectWorker):
+    """
+    ConnectWorker that has the connection broker log in and hold the
+    session, so it outlives the GUI. Stages are relayed from the broker's
+    own ConnectWorker. When no broker is running it connects directly, the
+    same as a plain ConnectWorker.
+
+    With ``session_id`` it attaches to a session the broker already holds
+    instead, replaying its output from ``offset``.
+
+    ``connected`` carries the BrokerChannel as both client and channel,
+    closing either closes the session in the broker.
+    """
+
+    def __init__(self, *args, session_id=None, offset=0, meta=None, socket_path=None, **kwargs):
+        """
+        :param meta: handed back by ``list_sessions`` for reattaching, e.g.
+                     the tab's host and name. Never credentials, anyone
+                     listing sessions sees it.
+        """
+        super().__init__(*args, **kwargs)
+        self.session_id = session_id
+        self.offset = offset
+        self.meta = meta or {}
+        self.socket_path = socket_path or default_socket_path()
+        self.brokered = False
+
+    def settings(self):
+        """What the broker's ConnectWorker is built from."""
+        return {
+            'host': self.host,
+            'port': self.port,
+            'username': self.username,
+            'password': self.password,
+            'key_path': self.key_path,
+            'timeout': self.timeout,
+            'term': self.term,
+            'reuse_transport': self.reuse_transport,
+            'profile': self.profile.to_dict(),
+            'jump': self.jump.to_dict() if self.jump is not None else None,
+        }
+
+    def run(self):
+        try:
+            sock = connect_broker(self.socket_path, timeout=self.timeout)
+        except OSError as e:
+            if self.session_id is not None:
+                self.signals.failed.emit("Broker Unavailable", f"Could not reach the connection broker: {e}")
+                return
+            logger.info(f"No connection broker on {self.socket_path} ({e}), connecting directly")
+            super().run()
+            return
+
+        # Anything shared is shared in the broker, the tab only holds the session
+        self.brokered = True
+        self.addrinfo = None
+        try:
+            if self.session_id is None:
+                request = {'op': "open", 'session': self.settings(), 'meta': self.meta}
+            else:
+                self._stage("shell", "Attaching to broker session")
+                request = {'op': "attach", 'id': self.session_id, 'offset': self.offset}
+            sock.settimeout(None)
+            send_frame(sock, FRAME_JSON, json.dumps(request, default=str).encode("utf-8"))
+            reader = sock.makefile("rb")
+            while True:
+                kind, message = read_frame(reader)
+                if kind is None:
+                    raise ConnectionResetError("The connection broker closed the connection")
+                event = message.get('event')
+                if event == "stage":
+                    self._stage(message['stage'], message['detail'])
+                elif event == "failed":
+                    sock.close()
+                    self.signals.failed.emit(message['title'], message['message'])
+                    return
+                elif event in ("connected", "attached"):
+                    break
+            channel = BrokerChannel(sock, reader, message['id'], message['offset'])
+            if self._cancelled:
+                # A session we only came to attach to isn't ours to close
+                if self.session_id is not None:
+                    channel.detach()
+                else:
+                    channel.close()
+                return
+            channel.start()
+            logger.info(f"{event.capitalize()} broker session {message['id'][:8]} to {self.host}:{self.port}")
+            self.signals.connected.emit(channel, channel)
+        except ConnectCancelled:
+            # The broker sees the socket close and abandons the login
+            sock.close()
+        except (OSError, ValueError, KeyError) as e:
+            sock.close()
+            self.signals.failed.emit("Connection Error", f"Connection broker: {e}")
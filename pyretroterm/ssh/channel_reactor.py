@@ -0,0 +1,223 @@
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+import selectors
+import socket
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReactorHandle(QObject):
+    """A channel registered with the ChannelReactor. Signals are delivered on the GUI thread."""
+    data_ready = pyqtSignal(bytes)
+    closed = pyqtSignal()
+
+    def __init__(self, channel, output_handler, flow=None, parent=None):
+        super().__init__(parent)
+        self.channel = channel
+        self.output_handler = output_handler
+        self.flow = flow
+        self.active = True
+        self.paused = False
+
+
+class ChannelReactor(QObject):
+    """
+    Single I/O loop multiplexing every open paramiko channel through a selector.
+
+    Ready channels are drained into per-session buffers on the reactor thread,
+    then the whole turn is handed to the GUI thread with one queued signal.
+    """
+    batch_ready = pyqtSignal(object)
+
+    READ_SIZE = 65536
+    # Most read from one channel per turn, the selector fires again for the
+    # rest, so a flooding channel can't hold up the others
+    MAX_READ_PER_TURN = 4 * READ_SIZE
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        """Return the process-wide reactor, starting it on first use."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._instance.start()
+            return cls._instance
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._pending = []
+        self._running = False
+        self._thread = None
+
+        # Self-pipe used to wake the selector when registrations change
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._wakeup_send.setblocking(False)
+        self._selector.register(self._wakeup_recv, selectors.EVENT_READ, None)
+
+        # Cross-thread emit, so this is a queued connection onto the GUI thread
+        self.batch_ready.connect(self._dispatch)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ChannelReactor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def register(self, channel, output_handler, flow=None):
+        """
+        Start multiplexing a channel.
+
+        :param channel: an open paramiko channel.
+        :param output_handler: object whose ``process(bytes)`` returns the bytes to display.
+        :param flow: optional FlowControl, the channel stops being read while it is paused.
+        :return: a ReactorHandle whose ``data_ready`` signal carries the output.
+        """
+        handle = ReactorHandle(channel, output_handler, flow)
+        with self._lock:
+            self._pending.append(("add", handle))
+        self._wake()
+        return handle
+
+    def unregister(self, handle):
+        """Stop multiplexing a channel. Safe to call more than once."""
+        handle.active = False
+        with self._lock:
+            self._pending.append(("remove", handle))
+        self._wake()
+
+    def resume(self, handle):
+        """Start reading a channel paused by its flow control again. Any thread."""
+        with self._lock:
+            self._pending.append(("resume", handle))
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wakeup_send.send(b"\0")
+        except (BlockingIOError, OSError):
+            # Pipe already full or closed, the reactor will wake anyway
+            pass
+
+    def _apply_pending(self):
+        try:
+            while self._wakeup_recv.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        for op, handle in pending:
+            if op == "add" or (op == "resume" and handle.paused and handle.active):
+                handle.paused = False
+                try:
+                    self._selector.register(handle.channel.fileno(), selectors.EVENT_READ, handle)
+                except Exception as e:
+                    logger.error(f"Failed to register channel with reactor: {e}")
+                    handle.active = False
+            elif op == "remove":
+                self._unregister_channel(handle)
+
+    def _unregister_channel(self, handle):
+        try:
+            self._selector.unregister(handle.channel.fileno())
+        except (KeyError, ValueError, OSError):
+            pass
+
+    def _drain(self, handle):
+        """
+        Read what the channel has buffered, up to MAX_READ_PER_TURN, and stop
+        as soon as its flow control pauses.
+
+        :return: (data, closed, paused)
+        """
+        channel = handle.channel
+        flow = handle.flow
+        chunks = []
+        total = 0
+        paused = False
+        while total < self.MAX_READ_PER_TURN and channel.recv_ready():
+            data = channel.recv(self.READ_SIZE)
+            if not data:
+                break
+            chunks.append(data)
+            total += len(data)
+            if flow is not None and flow.sent(len(data)):
+                # Renderer is behind, leave the rest in paramiko so the SSH window closes
+                paused = True
+                break
+
+        data = b""
+        if chunks:
+            try:
+                data = handle.output_handler.process(b"".join(chunks))
+            except Exception as e:
+                print(f"Error while reading from channel: {e}")
+                handle.output_handler.log_data(f"Error while reading from channel: {e}")
+                if flow is not None:
+                    # Nothing reaches the renderer to acknowledge it
+                    flow.ack(total)
+
+        closed = channel.closed or (channel.eof_received and not channel.recv_ready())
+        return data, closed, paused
+
+    def _run(self):
+        while self._running:
+            try:
+                events = self._selector.select(timeout=1.0)
+            except OSError as e:
+                logger.error(f"Reactor select failed: {e}")
+                continue
+
+            turn = []
+            for key, _ in events:
+                handle = key.data
+                if handle is None:
+                    self._apply_pending()
+                    continue
+                if not handle.active:
+                    continue
+                try:
+                    data, closed, paused = self._drain(handle)
+                except Exception as e:
+                    logger.error(f"Reactor read error: {e}")
+                    data, closed, paused = b"", True, False
+
+                if data:
+                    turn.append((handle, data, False))
+                if paused and not closed:
+                    handle.paused = True
+                    self._unregister_channel(handle)
+                if closed:
+                    print("Channel closed...")
+                    handle.output_handler.log_data("Channel closed...")
+                    handle.active = False
+                    self._unregister_channel(handle)
+                    turn.append((handle, b"", True))
+
+            if turn:
+                self.batch_ready.emit(turn)
+
+    @pyqtSlot(object)
+    def _dispatch(self, turn):
+        """Runs on the GUI thread, fans the turn out to the per-session handles."""
+        for handle, data, closed in turn:
+            if data:
+                handle.data_ready.emit(data)
+            if closed:
+                handle.closed.emit()
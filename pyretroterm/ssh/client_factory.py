@@ -0,0 +1,140 @@
+import logging
+import os
+import threading
+
+import paramiko
+
+logger = logging.getLogger(__name__)
+
+# Where paramiko's load_system_host_keys looks
+KNOWN_HOSTS_PATH = os.path.expanduser("~/.ssh/known_hosts")
+
+
+class HostKeyStore:
+    """
+    known_hosts parsed once and shared, read again only when the file's
+    mtime or size changes. Clients get the current HostKeys object, which
+    is replaced rather than changed on reload, so one a client holds stays
+    consistent for its connect.
+    """
+
+    def __init__(self, path=KNOWN_HOSTS_PATH):
+        self.path = path
+        self._host_keys = paramiko.HostKeys()
+        self._stamp = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def host_keys(self):
+        """:return: paramiko.HostKeys, up to date with the file."""
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        with self._lock:
+            if stamp != self._stamp:
+                host_keys = paramiko.HostKeys()
+                if stamp is not None:
+                    try:
+                        host_keys.load(self.path)
+                    except (OSError, paramiko.SSHException) as e:
+                        logger.warning(f"Could not read {self.path}: {e}")
+                self._host_keys = host_keys
+                self._stamp = stamp
+                self.loads += 1
+            return self._host_keys
+
+
+class KeyCache:
+    """
+    Private keys of any type, decrypted once and kept in memory for the life
+    of the process. A key file that changes on disk is read again.
+    """
+
+    def __init__(self):
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def load(self, path, passphrase=None):
+        """
+        :param passphrase: for an encrypted key, ignored for a plain one.
+        :return: paramiko.PKey
+        :raises paramiko.PasswordRequiredException: encrypted and no passphrase given.
+        :raises paramiko.SSHException: not a key, or the passphrase is wrong.
+        """
+        path = os.path.abspath(os.path.expanduser(path))
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._keys.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        if isinstance(passphrase, str):
+            passphrase = passphrase.encode("utf-8")
+        try:
+            key = paramiko.PKey.from_path(path, passphrase=passphrase or None)
+        except TypeError:
+            # cryptography's way of saying a PEM key needs a passphrase
+            raise paramiko.PasswordRequiredException(f"Private key {path} is encrypted")
+        except ValueError as e:
+            raise paramiko.SSHException(f"Could not load private key {path}: {e}")
+        with self._lock:
+            self._keys[path] = (stamp, key)
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+
+class ClientFactory:
+    """
+    Builds the paramiko SSHClients for every SSH code path: known_hosts
+    already loaded from the shared HostKeyStore, the missing host key policy
+    set, and private keys from the shared KeyCache.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self, known_hosts=KNOWN_HOSTS_PATH):
+        self.host_key_store = HostKeyStore(known_hosts)
+        self.key_cache = KeyCache()
+
+    def create(self, reject_unknown=False):
+        """
+        :param reject_unknown: refuse hosts missing from known_hosts instead
+                               of accepting their key.
+        :return: paramiko.SSHClient, not yet connected.
+        """
+        client = paramiko.SSHClient()
+        client._system_host_keys = self.host_key_store.host_keys()
+        client.set_missing_host_key_policy(paramiko.RejectPolicy() if reject_unknown else paramiko.AutoAddPolicy())
+        return client
+
+    def private_key(self, path, passphrase=None):
+        """See KeyCache.load."""
+        return self.key_cache.load(path, passphrase)
+
+    def check_host_key(self, client, hostname, port, server_key):
+        """
+        What SSHClient.connect does for a transport set up by hand: look the
+        key up in known_hosts and the client's own keys, ask the policy if
+        neither has it.
+
+        :raises paramiko.BadHostKeyException: the known key is different.
+        """
+        name = hostname if int(port) == 22 else f"[{hostname}]:{port}"
+        known = client._system_host_keys.get(name) or client.get_host_keys().get(name)
+        known = known.get(server_key.get_name()) if known is not None else None
+        if known is None:
+            client._policy.missing_host_key(client, name, server_key)
+        elif known != server_key:
+            raise paramiko.BadHostKeyException(name, server_key, known)
@@ -0,0 +1,336 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+import socket
+import time
+import logging
+
+import paramiko
+from paramiko.ssh_exception import IncompatiblePeer
+
+from .algorithms import AlgorithmCache, NegotiatingTransport, apply_preferences
+from .client_factory import ClientFactory
+from .health import HEALTH_OK, HealthMonitor
+from .jump import open_tunnel
+from .transport_registry import TransportRegistry, transport_key
+from .transport_profile import TransportProfile
+
+logger = logging.getLogger(__name__)
+
+# Connection stages, in order, as reported by ConnectWorker.signals.stage_changed
+STAGES = ("dns", "tcp", "kex", "auth", "shell")
+
+MAX_PARALLEL_CONNECTS = 16
+
+# Seconds to wait for the server to open a shell channel. paramiko's own
+# default is an hour, which a hung shared transport would make us wait out.
+CHANNEL_OPEN_TIMEOUT = 10
+
+_pool = None
+
+
+def connect_pool():
+    """Thread pool shared by every connect pipeline."""
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(MAX_PARALLEL_CONNECTS)
+    return _pool
+
+
+class ConnectCancelled(Exception):
+    pass
+
+
+class ConnectSignals(QObject):
+    stage_changed = pyqtSignal(str, str)   # stage, detail
+    connected = pyqtSignal(object, object)  # client, channel
+    failed = pyqtSignal(str, str)          # title, message
+
+
+class ConnectWorker(QRunnable):
+    """
+    Runs DNS, TCP, key exchange, authentication and shell setup for one
+    session on the connect pool, reporting each stage back to the GUI thread.
+
+    With ``reuse_transport`` the authenticated transport is shared through the
+    TransportRegistry, and a target that is already logged in only costs a new
+    shell channel. The reference taken here is handed to the receiver of
+    ``connected``, which must release it with ``transport_entry``. A pooled
+    transport the HealthMonitor reports stale or dead is left to the tabs on
+    it, and this session logs in on its own.
+
+    ``profile`` is the TransportProfile for the transport and shell channel.
+
+    With ``jump`` (a JumpHost) the target is reached over a direct-tcpip
+    channel through the jump host, whose one login is shared by every
+    session behind it.
+
+    ``addrinfo`` from an earlier connect skips the DNS lookup, e.g. to
+    reconnect while the resolver is unreachable. It is looked up afresh if
+    none of the cached addresses answer.
+
+    Key exchange tries the host's algorithm tiers from the AlgorithmCache,
+    modern first unless the host is known to need legacy algorithms, and
+    records what was negotiated along with the stage timings.
+    """
+
+    def __init__(self, host, port, username, password=None, key_path=None, timeout=10, term="xterm",
+                 reuse_transport=True, addrinfo=None, profile=None, jump=None):
+        super().__init__()
+        self.host = str(host).strip()
+        self.port = int(port)
+        self.username = str(username).strip()
+        self.password = str(password).strip() if password is not None else None
+        self.key_path = key_path.strip() if key_path else None
+        self.timeout = timeout
+        self.term = term
+        self.reuse_transport = reuse_transport
+        self.profile = profile or TransportProfile()
+        self.jump = jump
+        # A target behind a jump host is not the same as one reached directly
+        self.transport_key = transport_key(self.host, self.port, self.username, self.password, self.key_path,
+                                           options=(self.profile.transport_key(), str(jump) if jump else None))
+        self.reused = False
+        self.addrinfo = addrinfo
+        # Handle of the pooled transport this worker holds a reference on
+        self.transport_entry = None
+        self.sock = None
+        self.signals = ConnectSignals()
+        self.timings = {}
+        self.fallbacks = 0
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def _stage(self, stage, detail):
+        if self._cancelled:
+            raise ConnectCancelled()
+        self._stage_started = time.monotonic()
+        self.signals.stage_changed.emit(stage, detail)
+
+    def _stage_done(self, stage):
+        self.timings[stage] = time.monotonic() - self._stage_started
+
+    def run(self):
+        self.sock = None
+        client = None
+        registry = TransportRegistry.instance()
+        try:
+            if self.reuse_transport:
+                # Serialise logins per target so tabs opened together share one
+                with registry.connect_lock(self.transport_key):
+                    self.transport_entry = registry.acquire(self.transport_key)
+                    if self.transport_entry is not None and not self._healthy(self.transport_entry):
+                        # Stopped answering, but other tabs are on it, so leave it
+                        # be and give this session a login of its own
+                        logger.info(f"Shared transport to {self.host}:{self.port} is not answering, "
+                                    f"logging in separately")
+                        registry.release(self.transport_entry)
+                        self.transport_entry = None
+                        client = self._connect_client()
+                    elif self.transport_entry is not None:
+                        self.reused = True
+                        client = self.transport_entry.client
+                    else:
+                        client = self._connect_client()
+                        self.transport_entry = registry.add(self.transport_key, client)
+            else:
+                client = self._connect_client()
+
+            self._stage("shell", "Opening shell on shared transport" if self.reused else "Opening shell")
+            try:
+                channel = open_shell_channel(client, self.term, self.profile, timeout=self.timeout)
+            except Exception:
+                if not self.reused:
+                    raise
+                # Pooled transport went away underneath us, or won't take
+                # another channel, log in again. Other tabs may still be on
+                # it, so only give back our reference, acquire drops it if dead.
+                logger.info(f"Shared transport to {self.host}:{self.port} refused a shell, reconnecting")
+                registry.release(self.transport_entry)
+                self.transport_entry = None
+                self.reused = False
+                client = None
+                with registry.connect_lock(self.transport_key):
+                    client = self._connect_client()
+                    live = registry.acquire(self.transport_key)
+                    if live is None:
+                        self.transport_entry = registry.add(self.transport_key, client)
+                    else:
+                        # Still up for the tabs on it, this session keeps its own
+                        registry.release(live)
+                self._stage("shell", "Opening shell")
+                channel = open_shell_channel(client, self.term, self.profile, timeout=self.timeout)
+            self._stage_done("shell")
+
+            if self._cancelled:
+                channel.close()
+                raise ConnectCancelled()
+            if not self.reused:
+                AlgorithmCache.instance().record(self.host, self.port, client.get_transport(), self.timings,
+                                                 fallbacks=self.fallbacks)
+            logger.info(f"Connected to {self.host}:{self.port} reused={self.reused} {self.timings}")
+            self.signals.connected.emit(client, channel)
+
+        except ConnectCancelled:
+            self._close(client)
+        except socket.gaierror:
+            self._close(client)
+            self.signals.failed.emit("Connection Failed", f"Could not resolve hostname: {self.host}")
+        except socket.timeout:
+            self._close(client)
+            self.signals.failed.emit("Connection Failed",
+                                     f"Connection to {self.host}:{self.port} timed out after {self.timeout} seconds")
+        except ConnectionRefusedError:
+            self._close(client)
+            self.signals.failed.emit("Connection Failed",
+                                     f"Connection refused by {self.host}:{self.port} - service may not be running")
+        except paramiko.AuthenticationException:
+            self._close(client)
+            self.signals.failed.emit("Login Failure", f"Authentication Failed: {self.host}")
+        except paramiko.SSHException as e:
+            self._close(client)
+            self.signals.failed.emit("Login Failure", f"Connection Failed: {self.host} Reason: {e}")
+        except Exception as e:
+            self._close(client)
+            self.signals.failed.emit("Connection Error", str(e))
+
+    @staticmethod
+    def _healthy(entry):
+        """Whether a pooled transport is still answering the HealthMonitor's keepalives."""
+        return HealthMonitor.instance().transport_state(entry.client.get_transport()) == HEALTH_OK
+
+    def _connect_client(self):
+        """Full DNS, TCP, key exchange and authentication, returns an SSHClient."""
+        if self.jump is not None:
+            self._stage("dns", f"{self.host} is resolved by {self.jump.host}")
+            self._stage_done("dns")
+            self._stage("tcp", f"Connecting to {self.host}:{self.port} through {self.jump}")
+            self.sock = open_tunnel(self.jump, self.host, self.port, self.timeout)
+            self._stage_done("tcp")
+        else:
+            cached = self.addrinfo is not None
+            if cached:
+                self._stage("dns", f"Using cached address for {self.host}")
+            else:
+                self._stage("dns", f"Resolving {self.host}")
+                self.addrinfo = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+            self._stage_done("dns")
+
+            self._stage("tcp", f"Connecting to {self.host}:{self.port}")
+            try:
+                self.sock = self._open_socket(self.addrinfo)
+            except OSError:
+                if not cached:
+                    raise
+                # The host may have moved, try what DNS says now
+                self.addrinfo = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+                self.sock = self._open_socket(self.addrinfo)
+            self._stage_done("tcp")
+
+        client = ClientFactory.instance().create()
+
+        tiers = AlgorithmCache.instance().tiers(self.host, self.port)
+        kex_started = time.monotonic()
+        for attempt, tier in enumerate(tiers):
+            if attempt:
+                # The host dropped the connection after the failed negotiation
+                self._stage("tcp", f"Reconnecting to {self.host}:{self.port} with {tier} algorithms")
+                self.sock = self._reopen_socket()
+            self._stage("kex", "Negotiating keys" if tier == tiers[0] else f"Negotiating keys ({tier} algorithms)")
+            transport = NegotiatingTransport(self.sock)
+            apply_preferences(transport, tier)
+            self.profile.apply(transport)
+            client._transport = transport
+            try:
+                transport.start_client(timeout=self.timeout)
+                break
+            except IncompatiblePeer as e:
+                transport.close()
+                if attempt == len(tiers) - 1:
+                    raise
+                logger.info(f"{self.host}:{self.port} has no {tier} algorithms in common ({e})")
+                self.fallbacks += 1
+        self._check_host_key(client, transport)
+        self.timings["kex"] = time.monotonic() - kex_started
+
+        self._stage("auth", f"Authenticating as {self.username}")
+        self._authenticate(transport)
+        # Keepalives are sent by the HealthMonitor once a session uses it
+        self._stage_done("auth")
+        return client
+
+    def _reopen_socket(self):
+        """Another connection to the target, the way the first one was made."""
+        if self.jump is not None:
+            return open_tunnel(self.jump, self.host, self.port, self.timeout)
+        return self._open_socket(self.addrinfo)
+
+    def _open_socket(self, addrinfo):
+        last_error = None
+        for family, socktype, proto, _, sockaddr in addrinfo:
+            if self._cancelled:
+                raise ConnectCancelled()
+            sock = socket.socket(family, socktype, proto)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(sockaddr)
+                return sock
+            except OSError as e:
+                sock.close()
+                last_error = e
+        raise last_error or OSError(f"No addresses for {self.host}")
+
+    def _check_host_key(self, client, transport):
+        ClientFactory.instance().check_host_key(client, self.host, self.port, transport.get_remote_server_key())
+
+    def _authenticate(self, transport):
+        if self.key_path:
+            # Any key type, decrypted with the password if it needs one
+            private_key = ClientFactory.instance().private_key(self.key_path, self.password)
+            transport.auth_publickey(self.username, private_key)
+        else:
+            try:
+                transport.auth_password(self.username, self.password or "")
+            except paramiko.BadAuthenticationType as e:
+                if "keyboard-interactive" not in e.allowed_types:
+                    raise
+                password = self.password or ""
+                transport.auth_interactive(self.username, lambda title, instructions, prompts: [password] * len(prompts))
+
+    def _close(self, client):
+        """Give back or close whatever this worker had set up."""
+        try:
+            if self.transport_entry is not None:
+                # Pooled, other tabs may still be using it
+                TransportRegistry.instance().release(self.transport_entry)
+                self.transport_entry = None
+            elif client is not None:
+                client.close()
+            elif self.sock is not None:
+                self.sock.close()
+        except Exception:
+            pass
+
+
+def open_shell_channel(client, term="xterm", profile=None, timeout=CHANNEL_OPEN_TIMEOUT):
+    """
+    Invoke an interactive shell, falling back to a bare pty session.
+
+    :param profile: TransportProfile whose window and packet size the channel uses.
+    :param timeout: seconds to wait for the server to open the channel.
+    """
+    transport = client.get_transport()
+    window = profile.channel_kwargs() if profile is not None else {}
+    try:
+        channel = transport.open_session(timeout=timeout, **window)
+        channel.get_pty(term)
+        channel.invoke_shell()
+        channel.set_combine_stderr(True)
+        print("Invoked Shell!")
+    except Exception:
+        print(f"Shell not supported, falling back to pty...")
+        channel = transport.open_session(timeout=timeout, **window)
+        channel.get_pty()  # Request a pseudo-terminal
+        channel.set_combine_stderr(True)
+    return channel
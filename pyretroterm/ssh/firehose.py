@@ -0,0 +1,223 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+from collections import deque
+import re
+import time
+
+from .stream_decoder import StreamDecoder
+
+try:
+    import pyte
+except ImportError:
+    pyte = None
+
+# Output rate (bytes/s, averaged over RATE_WINDOW seconds) at which a tab stops
+# streaming to xterm.js and switches to screen snapshots, and the rate it has
+# to stay under for EXIT_HOLD seconds before streaming resumes.
+DEFAULT_ENTER_RATE = 8 * 1024 * 1024
+DEFAULT_EXIT_RATE = 1024 * 1024
+DEFAULT_SNAPSHOT_INTERVAL_MS = 200
+RATE_WINDOW = 0.5
+EXIT_HOLD = 1.0
+
+# Only the end of the stream since the last snapshot is fed to the screen model
+TAIL_BYTES = 64 * 1024
+
+ANSI_RE = re.compile(r"\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])|[\x00-\x08\x0b-\x0c\x0e-\x1f\x7f]")
+
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+
+
+class TailScreen:
+    """Fallback screen model: the last ``rows`` lines of plain text."""
+
+    def __init__(self, cols=80, rows=24):
+        self.cols = cols
+        self.rows = rows
+        self.decoder = StreamDecoder()
+        self.lines = deque(maxlen=rows)
+        self.current = ""
+
+    def resize(self, cols, rows):
+        self.cols = cols
+        self.rows = rows
+        self.lines = deque(self.lines, maxlen=rows)
+
+    def reset(self):
+        self.decoder.reset()
+        self.lines.clear()
+        self.current = ""
+
+    def feed(self, data):
+        text = ANSI_RE.sub("", self.decoder.decode(data))
+        parts = text.split("\n")
+        for part in parts[:-1]:
+            self.lines.append(self._overwrite(self.current, part))
+            self.current = ""
+        self.current = self._overwrite(self.current, parts[-1])
+
+    @staticmethod
+    def _overwrite(line, part):
+        part = part.rstrip("\r")
+        if "\r" in part:
+            # A bare CR returns to column 0, keep what was written last
+            return part.rsplit("\r", 1)[1]
+        return line + part
+
+    def render(self):
+        lines = list(self.lines)[-(self.rows - 1):] + [self.current]
+        return CLEAR_SCREEN + "\r\n".join(line[:self.cols] for line in lines)
+
+
+class PyteScreen:
+    """Screen model backed by pyte's VT100 emulation (text only, no attributes)."""
+
+    def __init__(self, cols=80, rows=24):
+        self.screen = pyte.Screen(cols, rows)
+        self.stream = pyte.ByteStream(self.screen)
+
+    def resize(self, cols, rows):
+        self.screen.resize(rows, cols)
+
+    def reset(self):
+        self.screen.reset()
+
+    def feed(self, data):
+        self.stream.feed(data)
+
+    def render(self):
+        lines = [line.rstrip() for line in self.screen.display]
+        cursor = self.screen.cursor
+        return CLEAR_SCREEN + "\r\n".join(lines) + f"\x1b[{cursor.y + 1};{cursor.x + 1}H"
+
+
+def make_screen(cols=80, rows=24):
+    """Use pyte when it is installed, the plain tail-of-lines model otherwise."""
+    if pyte is not None:
+        return PyteScreen(cols, rows)
+    return TailScreen(cols, rows)
+
+
+class FirehoseGate(QObject):
+    """
+    Sits in front of the output batcher and watches the output rate.
+
+    Below ``enter_rate`` every chunk is passed straight through on ``output``.
+    Above it the gate stops forwarding, keeps the end of the stream in a screen
+    model and emits a redraw of that screen on ``snapshot`` every
+    ``interval_ms``, until the rate has stayed under ``exit_rate`` for
+    EXIT_HOLD seconds. The session log is written before the gate, so it
+    still gets every byte.
+    """
+    output = pyqtSignal(bytes)
+    snapshot = pyqtSignal(str)
+    state_changed = pyqtSignal(bool, float)
+
+    def __init__(self, cols=80, rows=24, enter_rate=DEFAULT_ENTER_RATE, exit_rate=DEFAULT_EXIT_RATE,
+                 interval_ms=DEFAULT_SNAPSHOT_INTERVAL_MS, on_consumed=None, parent=None):
+        """
+        :param on_consumed: called with the size of every chunk the gate swallows,
+                            e.g. to acknowledge it to flow control.
+        """
+        super().__init__(parent)
+        if exit_rate >= enter_rate:
+            raise ValueError("Exit rate must be below the enter rate")
+        self.enter_rate = enter_rate
+        self.exit_rate = exit_rate
+        self.on_consumed = on_consumed
+        self.screen = make_screen(cols, rows)
+        self.active = False
+        self._samples = deque()
+        self._window_bytes = 0
+        self._tail = deque()
+        self._tail_size = 0
+        self._quiet_since = None
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._tick)
+
+        # Counters
+        self.activations = 0
+        self.bytes_skipped = 0
+        self.snapshots = 0
+
+    def resize(self, cols, rows):
+        self.screen.resize(cols, rows)
+
+    def rate(self):
+        """Bytes per second over the last RATE_WINDOW seconds."""
+        cutoff = time.monotonic() - RATE_WINDOW
+        while self._samples and self._samples[0][0] < cutoff:
+            self._window_bytes -= self._samples.popleft()[1]
+        return self._window_bytes / RATE_WINDOW
+
+    @pyqtSlot(bytes)
+    def append(self, data):
+        if not data:
+            return
+        self._samples.append((time.monotonic(), len(data)))
+        self._window_bytes += len(data)
+
+        if not self.active:
+            if self.rate() < self.enter_rate:
+                self.output.emit(data)
+                return
+            self._enter()
+
+        self._tail.append(data)
+        self._tail_size += len(data)
+        while self._tail_size - len(self._tail[0]) >= TAIL_BYTES:
+            self._tail_size -= len(self._tail.popleft())
+        self.bytes_skipped += len(data)
+        if self.on_consumed is not None:
+            self.on_consumed(len(data))
+
+    def _enter(self):
+        self.active = True
+        self.activations += 1
+        self._quiet_since = None
+        self.screen.reset()
+        self._timer.start()
+        self.state_changed.emit(True, self.rate())
+
+    def _exit(self, rate):
+        self.active = False
+        self._timer.stop()
+        self.state_changed.emit(False, rate)
+
+    @pyqtSlot()
+    def _tick(self):
+        self._emit_snapshot()
+        rate = self.rate()
+        if rate >= self.exit_rate:
+            self._quiet_since = None
+            self.state_changed.emit(True, rate)
+            return
+        now = time.monotonic()
+        if self._quiet_since is None:
+            self._quiet_since = now
+            self.state_changed.emit(True, rate)
+        elif now - self._quiet_since >= EXIT_HOLD:
+            self._exit(rate)
+
+    def _emit_snapshot(self):
+        if not self._tail:
+            return
+        data = b"".join(self._tail)
+        self._tail.clear()
+        self._tail_size = 0
+        if len(data) > TAIL_BYTES:
+            # Lost the screen's earlier state anyway, restart it on a line boundary
+            data = data[-TAIL_BYTES:]
+            data = data[data.find(b"\n") + 1:]
+            self.screen.reset()
+        self.screen.feed(data)
+        self.snapshots += 1
+        self.snapshot.emit(self.screen.render())
+
+    def stats(self):
+        return {'active': self.active, 'activations': self.activations, 'bytes_skipped': self.bytes_skipped,
+                'snapshots': self.snapshots, 'rate_mb_s': self.rate() / (1024 * 1024)}
+
+    def stop(self):
+        self._timer.stop()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Run commands against a fleet of hosts with pysshpass.
+
+Targets come from a session YAML file (the same format the session
+navigator uses), a YAML list of hosts, or a plain text inventory with one
+``host[:port]`` per line. Hosts run on a bounded thread pool and each result
+is written to stdout as one JSON line as soon as that host finishes.
+
+    python -m pyretroterm.ssh.fleet -i sessions/sessions.yaml -f Example \\
+        -u admin -c "show version" --workers 64 --timeout 30 > results.ndjson
+"""
+import json
+import sys
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import click
+import yaml
+
+from .pysshpass import ssh_client, close_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 32
+
+
+def load_targets(path, folder=None):
+    """
+    Read targets from an inventory file.
+
+    :param path: session YAML, YAML host list or text file of host[:port] lines.
+    :param folder: only take sessions from this session folder.
+    :return: list of dicts with host, port and display_name.
+    """
+    path = Path(path)
+    text = path.read_text()
+    targets = []
+
+    if path.suffix.lower() in ('.yaml', '.yml'):
+        data = yaml.safe_load(text) or []
+        for item in data:
+            if isinstance(item, dict) and 'sessions' in item:
+                # Session navigator format: folder_name + sessions
+                if folder and item.get('folder_name') != folder:
+                    continue
+                for session in item.get('sessions') or []:
+                    targets.append(_target(session))
+            elif isinstance(item, dict):
+                targets.append(_target(item))
+            else:
+                targets.append(_parse_host(str(item)))
+    else:
+        for line in text.splitlines():
+            line = line.split('#', 1)[0].strip()
+            if line:
+                targets.append(_parse_host(line))
+
+    return [t for t in targets if t['host']]
+
+
+def _target(entry):
+    host = str(entry.get('host', '')).strip()
+    return {
+        'host': host,
+        'port': int(entry.get('port') or 22),
+        'display_name': entry.get('display_name') or host,
+        'username': entry.get('username'),
+        'password': entry.get('password'),
+    }
+
+
+def _parse_host(value):
+    host, _, port = value.strip().partition(':')
+    return {'host': host, 'port': int(port or 22), 'display_name': host}
+
+
+def run_host(target, username, password, cmds, invoke_shell=False, prompt='#', prompt_count=1,
+             timeout=30, disable_auto_add_policy=False, look_for_keys=False, inter_command_time=1):
+    """
+    Run the command list on one host.
+
+    :return: result dict, never raises.
+    """
+    started = time.monotonic()
+    result = {
+        'host': target['host'],
+        'port': target['port'],
+        'display_name': target['display_name'],
+        'ok': False,
+        'output': '',
+        'error': None,
+    }
+    try:
+        output = ssh_client(
+            host=target['host'],
+            port=target['port'],
+            user=target.get('username') or username,
+            password=target.get('password') or password,
+            cmds=cmds,
+            invoke_shell=invoke_shell,
+            prompt=prompt,
+            prompt_count=prompt_count,
+            timeout=timeout,
+            disable_auto_add_policy=disable_auto_add_policy,
+            look_for_keys=look_for_keys,
+            inter_command_time=inter_command_time,
+            console=False,
+        )
+        result['output'] = output or ''
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        close_logging(target['host'], target['port'])
+    result['elapsed'] = round(time.monotonic() - started, 3)
+    return result
+
+
+def run_fleet(targets, workers=DEFAULT_WORKERS, **kwargs):
+    """
+    Run run_host over every target with at most ``workers`` in flight.
+
+    :return: generator of result dicts in completion order.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="fleet") as pool:
+        futures = [pool.submit(run_host, target, **kwargs) for target in targets]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+@click.command()
+@click.option('--inventory', '-i', required=True, type=click.Path(exists=True, dir_okay=False),
+              help='Session YAML, YAML host list or text file of host[:port] lines')
+@click.option('--folder', '-f', default=None, help='Only run against this session folder')
+@click.option('--user', '-u', required=True, help='SSH username')
+@click.option('--password', '-p', envvar='PYSSH_PASS', prompt=True, hide_input=True,
+              help='SSH password (or set PYSSH_PASS)')
+@click.option('--cmds', '-c', required=True, help='Comma separated commands')
+@click.option('--invoke-shell', is_flag=True, help='Run the commands in an interactive shell')
+@click.option('--prompt', default='#', show_default=True, help='Prompt to wait for in shell mode')
+@click.option('--prompt-count', default=1, show_default=True, help='Prompts to see before finishing')
+@click.option('--timeout', '-t', default=30, show_default=True, help='Per-host connect and idle timeout, seconds')
+@click.option('--inter-command-time', default=1.0, show_default=True, help='Pause between shell commands')
+@click.option('--workers', '-w', default=DEFAULT_WORKERS, show_default=True, help='Hosts to run at once')
+@click.option('--disable-auto-add-policy', is_flag=True, help='Reject hosts missing from known_hosts')
+@click.option('--look-for-keys', is_flag=True, help='Try keys from ~/.ssh')
+def main(inventory, folder, user, password, cmds, invoke_shell, prompt, prompt_count, timeout,
+         inter_command_time, workers, disable_auto_add_policy, look_for_keys):
+    targets = load_targets(inventory, folder)
+    if not targets:
+        click.echo("No hosts found in inventory", err=True)
+        sys.exit(1)
+
+    click.echo(f"Running on {len(targets)} hosts, {workers} at a time", err=True)
+    started = time.monotonic()
+    failed = 0
+    for result in run_fleet(targets, workers=workers, username=user, password=password, cmds=cmds,
+                            invoke_shell=invoke_shell, prompt=prompt, prompt_count=prompt_count,
+                            timeout=timeout, disable_auto_add_policy=disable_auto_add_policy,
+                            look_for_keys=look_for_keys, inter_command_time=inter_command_time):
+        if not result['ok']:
+            failed += 1
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+    click.echo(f"Done: {len(targets) - failed} ok, {failed} failed in "
+               f"{time.monotonic() - started:.1f}s", err=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
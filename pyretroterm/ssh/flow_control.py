@@ -0,0 +1,88 @@
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Unacknowledged bytes at which reading from the channel stops, and the level
+# it has to drain back down to before reading resumes. While paused paramiko
+# stops extending the SSH window, so the remote end is throttled too, once it
+# has used up the window already granted (see transport_profile.PRESETS).
+DEFAULT_HIGH_WATERMARK = 2 * 1024 * 1024
+DEFAULT_LOW_WATERMARK = 512 * 1024
+
+
+class FlowControl:
+    """
+    Tracks output handed to a renderer that it has not acknowledged yet.
+
+    The reader calls ``sent()`` for every batch it forwards; the renderer
+    acknowledges what it has actually drawn through ``ack()``. Crossing the
+    high watermark pauses the reader, dropping below the low one resumes it.
+    Safe to use from the reader thread and the GUI/event loop thread at once.
+    """
+
+    def __init__(self, high=DEFAULT_HIGH_WATERMARK, low=DEFAULT_LOW_WATERMARK, on_pause=None, on_resume=None):
+        """
+        :param on_pause: called (on the thread calling sent) when reading should stop.
+        :param on_resume: called (on the thread calling ack) when reading may continue.
+        """
+        if low >= high:
+            raise ValueError("Low watermark must be below the high watermark")
+        self.high = high
+        self.low = low
+        self.on_pause = on_pause
+        self.on_resume = on_resume
+        self.pending = 0
+        self.paused = False
+        self.pauses = 0
+        self._lock = threading.Lock()
+        self._resumed = threading.Event()
+        self._resumed.set()
+
+    def sent(self, nbytes):
+        """
+        Count bytes forwarded to the renderer.
+
+        :return: True if the reader should stop now.
+        """
+        with self._lock:
+            self.pending += nbytes
+            if self.paused or self.pending < self.high:
+                return self.paused
+            self.paused = True
+            self.pauses += 1
+            self._resumed.clear()
+        logger.debug(f"Output paused with {self.pending} bytes unacknowledged")
+        if self.on_pause is not None:
+            self.on_pause()
+        return True
+
+    def ack(self, nbytes):
+        """Count bytes the renderer has processed."""
+        with self._lock:
+            self.pending = max(0, self.pending - int(nbytes))
+            if not self.paused or self.pending > self.low:
+                return
+            self.paused = False
+            self._resumed.set()
+        logger.debug(f"Output resumed with {self.pending} bytes unacknowledged")
+        if self.on_resume is not None:
+            self.on_resume()
+
+    def reset(self):
+        """Forget the backlog and release a paused reader, e.g. on disconnect."""
+        with self._lock:
+            was_paused = self.paused
+            self.pending = 0
+            self.paused = False
+            self._resumed.set()
+        if was_paused and self.on_resume is not None:
+            self.on_resume()
+
+    def wait_resumed(self, timeout=None):
+        """Block a reader thread while output is paused. Returns False on timeout."""
+        return self._resumed.wait(timeout)
+
+    def stats(self):
+        return {'pending': self.pending, 'paused': self.paused, 'pauses': self.pauses,
+                'high': self.high, 'low': self.low}
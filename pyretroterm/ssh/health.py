@@ -0,0 +1,232 @@
+import atexit
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Session health as reported to listeners
+HEALTH_OK = "ok"
+HEALTH_STALE = "stale"
+HEALTH_DEAD = "dead"
+
+# Keepalive intervals: transports with recent traffic are probed often, idle
+# ones rarely
+ACTIVE_INTERVAL = 3.0
+IDLE_INTERVAL = 30.0
+IDLE_AFTER = 300.0
+
+# A probe unanswered for max(STALE_MIN, STALE_RTT_FACTOR * smoothed RTT)
+# marks the transport stale, for DEAD_AFTER it is given up on
+STALE_MIN = 3.0
+STALE_RTT_FACTOR = 8
+DEAD_AFTER = 30.0
+
+# Input that has had no output back for this long gets a probe right away,
+# that's the moment a user notices a hung session
+SUSPECT_AFTER = 1.0
+
+TICK = 0.25
+
+
+class _Watch:
+    def __init__(self, transport):
+        self.transport = transport
+        self.listeners = {}
+        self.state = HEALTH_OK
+        self.srtt = None
+        self.last_rtt = None
+        now = time.monotonic()
+        self.last_input = 0.0
+        self.last_output = now
+        self.last_reply = now
+        # A new session counts as in use
+        self.last_active = now
+        self.probe_started = None
+        self.next_probe = 0.0
+        self.probes = 0
+        self.stale_count = 0
+
+
+class HealthMonitor:
+    """
+    Watches every transport that has a session on it: sends
+    keepalive@openssh.com requests on an adaptive interval, keeps a smoothed
+    RTT and reports each transport as ok, stale or dead.
+
+    Listeners are called from the monitor's threads as
+    ``callback(state, rtt_ms)`` after every reply and on every state change,
+    rtt_ms is -1 when there is no new measurement.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._instance.start()
+                atexit.register(cls._instance.stop)
+            return cls._instance
+
+    def __init__(self):
+        self._watches = {}    # id(transport) -> _Watch
+        self._tokens = {}     # token -> _Watch
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="HealthMonitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def watch(self, transport, callback):
+        """
+        Start watching a transport, several sessions may share one.
+
+        :return: token for ``input``, ``output``, ``health`` and ``unwatch``.
+        """
+        token = next(self._counter)
+        with self._lock:
+            watch = self._watches.get(id(transport))
+            if watch is None or watch.transport is not transport:
+                watch = self._watches[id(transport)] = _Watch(transport)
+            watch.listeners[token] = callback
+            self._tokens[token] = watch
+        return token
+
+    def unwatch(self, token):
+        with self._lock:
+            watch = self._tokens.pop(token, None)
+            if watch is None:
+                return
+            watch.listeners.pop(token, None)
+            if not watch.listeners and self._watches.get(id(watch.transport)) is watch:
+                del self._watches[id(watch.transport)]
+
+    def input(self, token):
+        """The user sent something on this session."""
+        watch = self._tokens.get(token)
+        if watch is not None:
+            now = time.monotonic()
+            watch.last_active = now
+            if watch.last_input <= watch.last_output:
+                watch.last_input = now
+
+    def output(self, token):
+        """Data arrived on this session, which proves the transport is alive."""
+        watch = self._tokens.get(token)
+        if watch is not None:
+            watch.last_output = time.monotonic()
+            if watch.state == HEALTH_STALE:
+                watch.last_reply = watch.last_output
+                self._set_state(watch, HEALTH_OK)
+
+    def health(self, token):
+        """
+        :return: dict with state, rtt_ms and srtt_ms for a session's transport.
+        """
+        watch = self._tokens.get(token)
+        if watch is None:
+            return {'state': HEALTH_DEAD, 'rtt_ms': None, 'srtt_ms': None}
+        return {
+            'state': watch.state,
+            'rtt_ms': watch.last_rtt * 1000 if watch.last_rtt is not None else None,
+            'srtt_ms': watch.srtt * 1000 if watch.srtt is not None else None,
+            'probes': watch.probes,
+            'stale_count': watch.stale_count,
+            'since_reply_s': time.monotonic() - watch.last_reply,
+        }
+
+    def transport_state(self, transport):
+        """
+        :return: what the monitor last saw of a transport, HEALTH_OK if no
+                 session on it is watched.
+        """
+        with self._lock:
+            watch = self._watches.get(id(transport))
+        if watch is None or watch.transport is not transport:
+            return HEALTH_OK
+        return watch.state
+
+    def _run(self):
+        while not self._stop.wait(TICK):
+            with self._lock:
+                watches = list(self._watches.values())
+            now = time.monotonic()
+            for watch in watches:
+                try:
+                    self._check(watch, now)
+                except Exception as e:
+                    logger.debug(f"Health check failed: {e}")
+
+    def _check(self, watch, now):
+        if watch.state == HEALTH_DEAD:
+            return
+        if not watch.transport.is_active():
+            self._set_state(watch, HEALTH_DEAD)
+            return
+        if watch.probe_started is not None:
+            waited = now - watch.probe_started
+            stale_after = max(STALE_MIN, STALE_RTT_FACTOR * (watch.srtt or 0.0))
+            if waited > DEAD_AFTER:
+                self._set_state(watch, HEALTH_DEAD)
+            elif waited > stale_after and watch.state == HEALTH_OK:
+                self._set_state(watch, HEALTH_STALE)
+            return
+        # Typed, nothing came back and no probe has answered since
+        suspect = (watch.last_input > watch.last_output and watch.last_input > watch.last_reply
+                   and now - watch.last_input > SUSPECT_AFTER)
+        if now >= watch.next_probe or suspect:
+            watch.probe_started = now
+            # global_request blocks until the reply, so one thread per probe
+            threading.Thread(target=self._probe, args=(watch,), name="HealthProbe", daemon=True).start()
+
+    def _probe(self, watch):
+        started = watch.probe_started
+        try:
+            watch.transport.global_request("keepalive@openssh.com", wait=True)
+        except Exception as e:
+            logger.debug(f"Keepalive failed: {e}")
+        now = time.monotonic()
+        watch.probe_started = None
+        if not watch.transport.is_active():
+            self._set_state(watch, HEALTH_DEAD)
+            return
+        rtt = now - started
+        watch.probes += 1
+        watch.last_rtt = rtt
+        watch.srtt = rtt if watch.srtt is None else 0.875 * watch.srtt + 0.125 * rtt
+        watch.last_reply = now
+        active = now - max(watch.last_active, watch.last_output) < IDLE_AFTER
+        watch.next_probe = now + (ACTIVE_INTERVAL if active else IDLE_INTERVAL)
+        if watch.state != HEALTH_DEAD:
+            watch.state = HEALTH_OK
+        self._notify(watch, rtt * 1000)
+
+    def _set_state(self, watch, state):
+        if watch.state == state:
+            return
+        if state == HEALTH_STALE:
+            watch.stale_count += 1
+        logger.info(f"Transport {id(watch.transport):x} is {state}")
+        watch.state = state
+        self._notify(watch)
+
+    def _notify(self, watch, rtt_ms=-1.0):
+        for callback in list(watch.listeners.values()):
+            try:
+                callback(watch.state, rtt_ms)
+            except Exception as e:
+                logger.debug(f"Health listener failed: {e}")
@@ -0,0 +1,194 @@
+import logging
+import re
+import threading
+
+import paramiko
+
+from .algorithms import connect_client
+from .client_factory import ClientFactory
+from .transport_registry import TransportRegistry, transport_key
+
+logger = logging.getLogger(__name__)
+
+# Reaching a session through a jump host, from the sessions YAML. Folder or
+# session, the session wins, ``proxy_jump: none`` turns it off again:
+#
+#   - folder_name: DC2 OOB
+#     proxy_jump: netops@bastion2.example.net:2222
+#     sessions:
+#     - host: dc2-oob-sw1
+#     - host: dc2-core-1
+#       proxy_jump:
+#         host: bastion2-core.example.net
+#         username: svc_jump
+#         key_path: ~/.ssh/svc_jump_ed25519
+#
+# Credentials left out are the session's own.
+JUMP_RE = re.compile(r"^(?:(?P<username>[^@\s]+)@)?(?P<host>\[[^\]]+\]|[^:@\s]+)(?::(?P<port>\d+))?$")
+JUMP_OFF = ("", "none", "off", "false", "direct")
+
+
+class JumpHost:
+    """A bastion to reach a target through, as in ssh's ProxyJump."""
+
+    def __init__(self, host, port=22, username=None, password=None, key_path=None):
+        self.host = str(host).strip().strip("[]")
+        self.port = int(port)
+        self.username = username
+        self.password = password
+        self.key_path = key_path
+
+    @classmethod
+    def parse(cls, value, username=None, password=None, key_path=None):
+        """
+        :param value: ``[user@]host[:port]``, a mapping with host, port,
+                      username, password and key_path, or None.
+        :param username: used where the jump host doesn't set its own, same
+                         for password and key_path.
+        :return: JumpHost, or None for no jump host.
+        """
+        if value is None:
+            return None
+        if isinstance(value, JumpHost):
+            value = value.to_dict()
+        if isinstance(value, dict):
+            if not value.get('host'):
+                raise ValueError(f"proxy_jump needs a host: {value!r}")
+            settings = dict(value)
+        else:
+            text = str(value).strip()
+            if text.lower() in JUMP_OFF:
+                return None
+            m = JUMP_RE.match(text)
+            if not m:
+                raise ValueError(f"Not a jump host: {value!r} (expected [user@]host[:port])")
+            settings = {key: val for key, val in m.groupdict().items() if val is not None}
+        jump = cls(settings['host'], settings.get('port') or 22, settings.get('username'),
+                   settings.get('password'), settings.get('key_path'))
+        # The session's password is no use for a different user on the jump host
+        if jump.password is None and jump.key_path is None and jump.username in (None, username):
+            jump.password = password
+            jump.key_path = key_path
+        if jump.username is None:
+            jump.username = username
+        return jump
+
+    @classmethod
+    def from_config(cls, *entries):
+        """
+        The ``proxy_jump`` setting for a session from its YAML entries,
+        outermost first (folder, then session).
+
+        :return: the setting as found, None if there isn't one.
+        """
+        value = None
+        for entry in entries:
+            if entry and 'proxy_jump' in entry:
+                value = entry['proxy_jump']
+        # Fail on a typo now rather than on connect
+        cls.parse(value)
+        return value
+
+    def to_dict(self):
+        return {
+            'host': self.host,
+            'port': self.port,
+            'username': self.username,
+            'password': self.password,
+            'key_path': self.key_path,
+        }
+
+    def registry_key(self):
+        """TransportRegistry key of the authenticated transport to the bastion."""
+        return transport_key(self.host, self.port, self.username or "", self.password, self.key_path, options="jump")
+
+    def __str__(self):
+        user = f"{self.username}@" if self.username else ""
+        return f"{user}{self.host}:{self.port}"
+
+    def __repr__(self):
+        return f"JumpHost({str(self)!r})"
+
+
+class JumpChannel:
+    """
+    A direct-tcpip channel through a bastion that paramiko (and netmiko) can
+    use as the ``sock`` of a target connection. Closing it, which the
+    target's transport does when it closes, gives back the reference on the
+    bastion transport.
+    """
+
+    def __init__(self, channel, jump, entry):
+        """
+        :param entry: TransportRegistry handle of the bastion transport.
+        """
+        self._channel = channel
+        self.jump = jump
+        self._entry = entry
+        self._released = False
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._channel, name)
+
+    def close(self):
+        try:
+            self._channel.close()
+        finally:
+            with self._lock:
+                released, self._released = self._released, True
+            if not released:
+                TransportRegistry.instance().release(self._entry)
+
+
+def bastion_client(jump, timeout=10):
+    """
+    The authenticated client to a jump host, shared through the
+    TransportRegistry so any number of targets cost one bastion login.
+
+    :return: TransportRegistry handle holding a reference the caller must
+             release, its ``client`` is the bastion's SSHClient.
+    """
+    registry = TransportRegistry.instance()
+    key = jump.registry_key()
+    with registry.connect_lock(key):
+        entry = registry.acquire(key)
+        if entry is not None:
+            return entry
+        logger.info(f"Logging in to jump host {jump}")
+        factory = ClientFactory.instance()
+        client = factory.create()
+        pkey = factory.private_key(jump.key_path, jump.password) if jump.key_path else None
+        try:
+            connect_client(client, jump.host, jump.port, username=jump.username, password=jump.password, pkey=pkey,
+                           look_for_keys=False, allow_agent=False, timeout=timeout)
+        except Exception:
+            client.close()
+            raise
+        return registry.add(key, client)
+
+
+def open_tunnel(jump, host, port, timeout=10):
+    """
+    Open a direct-tcpip channel through ``jump`` to ``host:port``, logging
+    in to the jump host first if there is no live transport to it.
+
+    :return: JumpChannel to use as a connection's socket.
+    :raises ConnectionRefusedError: the jump host could not reach the target.
+    """
+    registry = TransportRegistry.instance()
+    for attempt in range(2):
+        entry = bastion_client(jump, timeout)
+        transport = entry.client.get_transport()
+        try:
+            channel = transport.open_channel("direct-tcpip", (host, int(port)), ("127.0.0.1", 0), timeout=timeout)
+            return JumpChannel(channel, jump, entry)
+        except paramiko.ChannelException as e:
+            registry.release(entry)
+            raise ConnectionRefusedError(f"Jump host {jump} could not connect to {host}:{port}: {e.text}")
+        except (paramiko.SSHException, EOFError, OSError):
+            registry.release(entry)
+            if attempt or transport.is_active():
+                raise
+            # The bastion went away since it was pooled, log in again
+            registry.discard(entry)
@@ -0,0 +1,209 @@
+from collections import deque
+import threading
+import time
+
+# Histogram resolution: every power of two is split into 2**SUB_BUCKET_BITS
+# linear buckets, so any recorded value is within ~3% of its bucket.
+SUB_BUCKET_BITS = 5
+
+# A keystroke not echoed within this long is dropped, so unrelated output
+# arriving much later isn't counted as its echo
+ECHO_TIMEOUT = 5.0
+# Writes longer than this are pastes or escape sequences, not keystrokes
+MAX_KEYSTROKE_BYTES = 4
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of latencies in microseconds: log-linear buckets,
+    constant memory and relative precision whatever the range.
+    """
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    @staticmethod
+    def bucket_index(value):
+        sub = 1 << SUB_BUCKET_BITS
+        if value < sub:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS - 1
+        return (shift + 1) * sub + (value >> shift) - sub
+
+    @staticmethod
+    def bucket_value(index):
+        """Middle of the range of values that land in bucket ``index``."""
+        sub = 1 << SUB_BUCKET_BITS
+        if index < sub:
+            return index
+        shift = index // sub - 1
+        low = (index % sub + sub) << shift
+        return low + (1 << shift) // 2
+
+    def record(self, micros):
+        micros = max(0, int(micros))
+        index = self.bucket_index(micros)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += micros
+        self.min = micros if self.min is None else min(self.min, micros)
+        self.max = micros if self.max is None else max(self.max, micros)
+
+    def percentile(self, p):
+        if not self.count:
+            return 0
+        target = max(1, int(round(self.count * p / 100.0)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self.bucket_value(index), self.max)
+        return self.max
+
+    def summary(self):
+        """Milliseconds, ready to show or export."""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'min_ms': self.min / 1000,
+            'mean_ms': self.total / self.count / 1000,
+            'p50_ms': self.percentile(50) / 1000,
+            'p90_ms': self.percentile(90) / 1000,
+            'p99_ms': self.percentile(99) / 1000,
+            'max_ms': self.max / 1000,
+        }
+
+    def buckets(self):
+        """Non-empty buckets as [value_us, count] pairs."""
+        return [[self.bucket_value(index), n] for index, n in enumerate(self.counts) if n]
+
+    def reset(self):
+        self.__init__()
+
+
+class EchoTracker:
+    """
+    Matches keystrokes to the first output that follows them and splits the
+    delay into two parts:
+
+    - network: keystroke sent on the channel until output arrived from it
+      (round trip plus the device's own echo time)
+    - app: output read until the terminal had it on screen, i.e. our own
+      batching and rendering queues
+
+    ``input``/``sent``/``emitted``/``rendered`` run on the GUI thread,
+    ``received`` on the reader thread.
+    """
+
+    def __init__(self):
+        self.network = LatencyHistogram()
+        self.app = LatencyHistogram()
+        self.total = LatencyHistogram()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.keystrokes = 0
+        self.rtt = LatencyHistogram()
+        self.last_rtt_ms = None
+        self._lock = threading.Lock()
+        self._typed = None
+        self._sent = deque()       # (typed_at, sent_at) waiting for output
+        self._received = deque()   # (typed_at, received_at) waiting for the frontend
+        self._emitted = deque()    # (typed_at, received_at, emitted byte count) waiting for an ack
+        self._emitted_bytes = 0
+        self._acked_bytes = 0
+
+    def input(self, data):
+        self.bytes_out += len(data)
+        self._typed = time.perf_counter() if 0 < len(data) <= MAX_KEYSTROKE_BYTES else None
+
+    def sent(self):
+        if self._typed is None:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            while self._sent and now - self._sent[0][0] > ECHO_TIMEOUT:
+                self._sent.popleft()
+            self._sent.append((self._typed, now))
+        self.keystrokes += 1
+        self._typed = None
+
+    def received(self, nbytes):
+        self.bytes_in += nbytes
+        if not self._sent:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            # Everything typed before this output was read has been echoed by now
+            while self._sent:
+                typed_at, sent_at = self._sent.popleft()
+                if now - typed_at <= ECHO_TIMEOUT:
+                    self.network.record((now - sent_at) * 1e6)
+                    self._received.append((typed_at, now))
+
+    def emitted(self, nbytes, acked=False):
+        """
+        Output was handed to the frontend.
+
+        :param acked: the frontend acknowledges output once rendered, wait for
+                      that instead of counting it as on screen now.
+        """
+        self._emitted_bytes += nbytes
+        if not self._received:
+            return
+        with self._lock:
+            pending, self._received = self._received, deque()
+        if acked:
+            self._emitted.extend((typed_at, received_at, self._emitted_bytes) for typed_at, received_at in pending)
+        else:
+            self._record_rendered(pending)
+
+    def rendered(self, nbytes):
+        """The frontend acknowledged nbytes of output."""
+        self._acked_bytes += nbytes
+        done = []
+        while self._emitted and self._emitted[0][2] <= self._acked_bytes:
+            done.append(self._emitted.popleft()[:2])
+        self._record_rendered(done)
+
+    def _record_rendered(self, entries):
+        now = time.perf_counter()
+        for typed_at, received_at in entries:
+            self.app.record((now - received_at) * 1e6)
+            self.total.record((now - typed_at) * 1e6)
+
+    def record_rtt(self, seconds):
+        self.rtt.record(seconds * 1e6)
+        self.last_rtt_ms = seconds * 1000
+
+    def stats(self):
+        return {
+            'keystrokes': self.keystrokes,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'echo_total': self.total.summary(),
+            'echo_network': self.network.summary(),
+            'echo_app': self.app.summary(),
+            'keepalive_rtt': self.rtt.summary(),
+            'last_rtt_ms': self.last_rtt_ms,
+        }
+
+    def export(self):
+        """stats() plus the raw histogram buckets, for offline analysis."""
+        data = self.stats()
+        data['exported_at'] = time.time()
+        data['buckets_us'] = {name: histogram.buckets() for name, histogram in (
+            ('echo_total', self.total), ('echo_network', self.network), ('echo_app', self.app),
+            ('keepalive_rtt', self.rtt))}
+        return data
+
+    def reset(self):
+        for histogram in (self.network, self.app, self.total, self.rtt):
+            histogram.reset()
+        self.keystrokes = 0
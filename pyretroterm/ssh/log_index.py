@@ -0,0 +1,381 @@
+import atexit
+import gzip
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from .firehose import ANSI_RE
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG_DIR = "./logs"
+INDEX_FILENAME = "log_index.db"
+DEFAULT_POLL_INTERVAL = 2.0
+# Read at most this much of one file per pass so a large backfill never
+# holds up tailing the live logs
+READ_BATCH = 4 * 1024 * 1024
+
+# session_<host>.log, its numbered siblings session_<host>~<n>.log and
+# rotated segments session_<host>[~<n>].<YYYYmmdd-HHMMSS>[-n].log[.gz|.zst]
+LOG_NAME_RE = re.compile(r"^session_(?P<host>[^~]+?)(?:~\d+)?(?P<segment>\.\d{8}-\d{6}(?:-\d+)?)?\.log$")
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE,
+    host TEXT,
+    inode INTEGER,
+    offset INTEGER DEFAULT 0,
+    static INTEGER DEFAULT 0,
+    done INTEGER DEFAULT 0
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5(
+    text, host, file_id UNINDEXED, offset UNINDEXED, ts UNINDEXED
+);
+"""
+
+
+def open_log(path):
+    """Open a session log or rotated segment for binary reading, decompressing if needed."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise OSError(f"zstandard is not installed, cannot read {path}")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+    return open(path, "rb")
+
+
+def resolve_log(path):
+    """
+    A rotated segment is compressed and removed after rotation, find where
+    its content lives now.
+
+    :return: existing path, or None.
+    """
+    for candidate in (path,) + tuple(path + suffix for suffix in COMPRESSED_SUFFIXES):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching every word, without FTS5 syntax."""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"' for term in terms)
+
+
+class LogIndexer:
+    """
+    Background full-text index over the session logs in ``log_dir``.
+
+    A thread polls the directory, tails every ``session_*.log`` from where it
+    stopped last time and adds each new line (escape sequences stripped) to
+    an SQLite FTS5 table with its host, byte offset and timestamp. Rotated
+    segments are followed to their new, possibly compressed, name. The index
+    lives in the log directory and survives restarts.
+
+    Timestamps are when the line was indexed, which is within a poll interval
+    of when it was written; content that was already on disk gets the file's
+    modification time.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls, log_dir=DEFAULT_LOG_DIR):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(log_dir)
+                cls._instance.start()
+                atexit.register(cls._instance.stop)
+            return cls._instance
+
+    def __init__(self, log_dir=DEFAULT_LOG_DIR, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.log_dir = os.path.abspath(log_dir)
+        self.db_path = os.path.join(self.log_dir, INDEX_FILENAME)
+        self.poll_interval = poll_interval
+        self.lines_indexed = 0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._reader = None
+        self._reader_lock = threading.Lock()
+
+    def start(self):
+        if self._thread is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="LogIndexer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._reader_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def poke(self):
+        """Index now instead of waiting for the next poll."""
+        self._wake.set()
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        # Searches from the GUI read while the indexer writes
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(SCHEMA)
+        return db
+
+    # -- search API, any thread --
+
+    def search(self, text, host=None, since=None, limit=200, raw=False):
+        """
+        Full-text search over every indexed line, most recently indexed first.
+
+        :param text: words that must all appear, or an FTS5 query when raw is True.
+        :param host: only lines from this host.
+        :param since: only lines indexed at or after this epoch time.
+        :return: list of dicts with host, path, offset, ts and text.
+        :raises ValueError: on an invalid raw query.
+        """
+        query = text if raw else fts_query(text)
+        if not query:
+            return []
+        query = f"text : ({query})"
+        if host:
+            # Host is an indexed column so FTS5 narrows to it, the equality
+            # check drops hosts that only share tokens with it
+            query += f" AND host : ({fts_query(host)})"
+        sql = ("SELECT lines.host, files.path, lines.offset, lines.ts, lines.text FROM lines "
+               "JOIN files ON files.id = lines.file_id WHERE lines MATCH ?")
+        params = [query]
+        if host:
+            sql += " AND lines.host = ?"
+            params.append(host)
+        if since is not None:
+            sql += " AND lines.ts >= ?"
+            params.append(since)
+        # Index order is write order for tailed logs, and unlike ts FTS5 can
+        # walk it backwards without sorting every match
+        sql += " ORDER BY lines.rowid DESC LIMIT ?"
+        params.append(limit)
+        with self._reader_lock:
+            if self._reader is None:
+                self._reader = self._connect()
+            try:
+                rows = self._reader.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                raise ValueError(f"Bad search query: {e}")
+        return [{'host': row[0], 'path': row[1], 'offset': row[2], 'ts': row[3], 'text': row[4]}
+                for row in rows]
+
+    def hosts(self):
+        with self._reader_lock:
+            if self._reader is None:
+                self._reader = self._connect()
+            return [row[0] for row in self._reader.execute("SELECT DISTINCT host FROM files ORDER BY host")]
+
+    @staticmethod
+    def read_context(path, offset, before=32 * 1024, after=32 * 1024):
+        """
+        Text around a hit for a log viewer.
+
+        :return: (text, position of the hit line within text), text is empty if
+                 the log is gone.
+        """
+        actual = resolve_log(path)
+        if actual is None:
+            return "", 0
+        start = max(0, offset - before)
+        with open_log(actual) as f:
+            if start:
+                f.seek(start)
+            data = f.read(offset - start + after)
+        if start:
+            # Start on a line boundary
+            cut = data.find(b"\n") + 1
+            if cut > offset - start:
+                cut = 0
+            data = data[cut:]
+            start += cut
+        head = ANSI_RE.sub("", data[:offset - start].decode("utf-8", errors="replace"))
+        text = ANSI_RE.sub("", data[offset - start:].decode("utf-8", errors="replace"))
+        return head + text, len(head)
+
+    # -- indexer thread --
+
+    def _run(self):
+        try:
+            db = self._connect()
+        except sqlite3.Error as e:
+            logger.error(f"Log index unavailable: {e}")
+            return
+        while not self._stop.is_set():
+            try:
+                busy = self._index_pass(db)
+            except Exception as e:
+                logger.error(f"Log indexing failed: {e}")
+                busy = False
+            if not busy:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+        db.close()
+
+    def _index_pass(self, db):
+        """One scan of the log directory. Returns True if there is more to read right away."""
+        self._discover(db)
+        busy = False
+        for file_id, path, host, inode, offset, static in db.execute(
+                "SELECT id, path, host, inode, offset, static FROM files WHERE done = 0").fetchall():
+            if self._stop.is_set():
+                break
+            busy |= self._index_file(db, file_id, path, host, inode, offset, static)
+        return busy
+
+    def _list_logs(self):
+        """Session logs in the directory by path without compression suffix: (inode, name match)."""
+        listing = {}
+        try:
+            names = os.listdir(self.log_dir)
+        except OSError:
+            return listing
+        for name in names:
+            base = name
+            for suffix in COMPRESSED_SUFFIXES:
+                if name.endswith(suffix):
+                    base = name[:-len(suffix)]
+            match = LOG_NAME_RE.match(base)
+            if match is None:
+                continue
+            try:
+                listing[os.path.join(self.log_dir, base)] = (os.stat(os.path.join(self.log_dir, name)).st_ino, match)
+            except OSError:
+                continue
+        return listing
+
+    def _discover(self, db):
+        entries = {row[0]: row[1:] for row in db.execute("SELECT path, id, host, inode, offset, static, done FROM files")}
+        listing = self._list_logs()
+
+        # Follow rotated live logs first, so the renamed file is not indexed twice
+        for path, (file_id, host, inode, offset, static, done) in list(entries.items()):
+            if static or done:
+                continue
+            current = listing.get(path)
+            try:
+                truncated = current is not None and os.path.getsize(path) < offset
+            except OSError:
+                continue
+            if current is None or current[0] != inode or truncated:
+                self._follow_rotation(db, file_id, path, host, inode, current[0] if current else None,
+                                      listing, entries)
+
+        for path, (inode, match) in sorted(listing.items()):
+            if path in entries:
+                continue
+            static = 1 if match.group("segment") or not os.path.exists(path) else 0
+            db.execute("INSERT INTO files (path, host, inode, static) VALUES (?, ?, ?, ?)",
+                       (path, match.group("host"), inode, static))
+        db.commit()
+
+    def _follow_rotation(self, db, file_id, path, host, old_inode, new_inode, listing, entries):
+        """
+        A live log was rotated: what we indexed so far now lives in a segment,
+        move the entry there and start the live path from scratch.
+        """
+        prefix = os.path.basename(os.path.splitext(path)[0]) + "."
+        candidates = [segment for segment, (inode, match) in listing.items()
+                      if segment not in entries and match.group("segment")
+                      and os.path.basename(segment).startswith(prefix)]
+        # A renamed segment keeps its inode, a compressed one is the newest
+        renamed = [segment for segment in candidates if listing[segment][0] == old_inode]
+        segment = renamed[0] if renamed else max(candidates, default=None)
+        if segment is not None:
+            db.execute("UPDATE files SET path = ?, static = 1 WHERE id = ?", (segment, file_id))
+            entries[segment] = (file_id, host, old_inode, 0, 1, 0)
+        else:
+            # Truncated in place or the old content is gone, keep the lines but stop reading
+            db.execute("UPDATE files SET path = ?, done = 1 WHERE id = ?", (f"{path}#{file_id}", file_id))
+        del entries[path]
+        if new_inode is not None:
+            db.execute("INSERT INTO files (path, host, inode) VALUES (?, ?, ?)", (path, host, new_inode))
+            entries[path] = (None, host, new_inode, 0, 0, 0)
+
+    def _index_file(self, db, file_id, path, host, inode, offset, static):
+        actual = resolve_log(path)
+        if actual is None:
+            # Removed, or rotated away from under us
+            if static:
+                db.execute("UPDATE files SET done = 1 WHERE id = ?", (file_id,))
+                db.commit()
+            return False
+
+        if not static:
+            try:
+                st = os.stat(actual)
+            except OSError:
+                return False
+            if st.st_ino != inode or st.st_size <= offset:
+                # Nothing new, or rotated: the next discovery pass sorts that out
+                return st.st_ino != inode
+
+        try:
+            with open_log(actual) as f:
+                if offset:
+                    f.seek(offset)
+                data = f.read(READ_BATCH)
+                mtime = os.path.getmtime(actual)
+        except OSError as e:
+            logger.warning(f"Cannot read {actual}: {e}")
+            return False
+
+        if not data:
+            if static:
+                db.execute("UPDATE files SET done = 1 WHERE id = ?", (file_id,))
+                db.commit()
+            return False
+        # Live files: leave a partial last line for the next pass
+        end = len(data) if static and len(data) < READ_BATCH else data.rfind(b"\n") + 1
+        if end == 0:
+            if static:
+                end = len(data)
+            else:
+                return False
+
+        # Content written since the last pass is "now", anything older keeps its mtime
+        ts = time.time() if offset and not static else mtime
+        rows = []
+        pos = 0
+        for line in data[:end].split(b"\n"):
+            text = ANSI_RE.sub("", line.decode("utf-8", errors="replace")).strip()
+            if text:
+                rows.append((text, host, file_id, offset + pos, ts))
+            pos += len(line) + 1
+        db.executemany("INSERT INTO lines (text, host, file_id, offset, ts) VALUES (?, ?, ?, ?, ?)", rows)
+        db.execute("UPDATE files SET offset = ? WHERE id = ?", (offset + end, file_id))
+        db.commit()
+        self.lines_indexed += len(rows)
+        return len(data) == READ_BATCH
+
+    def stats(self):
+        with self._reader_lock:
+            if self._reader is None:
+                self._reader = self._connect()
+            files, = self._reader.execute("SELECT COUNT(*) FROM files").fetchone()
+        return {'files': files, 'lines_indexed': self.lines_indexed}
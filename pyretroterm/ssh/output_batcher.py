@@ -0,0 +1,107 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+import time
+
+
+class OutputBatcher(QObject):
+    """
+    Coalesces the small chunks produced by the shell reader into fewer, larger
+    writes towards xterm.js.
+
+    A batch is flushed after ``interval_ms`` milliseconds or as soon as
+    ``max_bytes`` of output is pending, whichever comes first. Payloads are
+    raw bytes so the terminal can decode them itself.
+    """
+    flushed = pyqtSignal(bytes)
+
+    def __init__(self, interval_ms=8, max_bytes=64 * 1024, parent=None):
+        super().__init__(parent)
+        self.interval_ms = interval_ms
+        self.max_bytes = max_bytes
+        self._pending = []
+        self._pending_size = 0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+        # Counters
+        self.chunks_in = 0
+        self.bytes_in = 0
+        self.flushes = 0
+        self._first_data_at = None
+        self._last_data_at = None
+        self._window_started_at = time.monotonic()
+        self._window_bytes = 0
+        self._current_rate = 0.0
+        self._peak_rate = 0.0
+
+    @pyqtSlot(bytes)
+    def append(self, data):
+        """Queue a chunk of output, flushing immediately if the size bound is hit."""
+        if not data:
+            return
+        now = time.monotonic()
+        if self._first_data_at is None:
+            self._first_data_at = now
+        self._last_data_at = now
+
+        self._pending.append(data)
+        self._pending_size += len(data)
+        self.chunks_in += 1
+        self.bytes_in += len(data)
+
+        if self._pending_size >= self.max_bytes:
+            self.flush()
+        elif not self._timer.isActive():
+            self._timer.start(self.interval_ms)
+
+    @pyqtSlot()
+    def flush(self):
+        """Emit everything pending as a single write."""
+        self._timer.stop()
+        if not self._pending:
+            return
+        data = b"".join(self._pending)
+        self._pending = []
+        self._pending_size = 0
+        self.flushes += 1
+        self._update_rate(len(data))
+        self.flushed.emit(data)
+
+    def _update_rate(self, size):
+        now = time.monotonic()
+        self._window_bytes += size
+        elapsed = now - self._window_started_at
+        if elapsed >= 1.0:
+            self._current_rate = self._window_bytes / elapsed
+            self._peak_rate = max(self._peak_rate, self._current_rate)
+            self._window_started_at = now
+            self._window_bytes = 0
+
+    def stats(self):
+        """Return counters describing how much the batching saved."""
+        active = 0.0
+        if self._first_data_at is not None:
+            active = self._last_data_at - self._first_data_at
+        sustained = self.bytes_in / active if active > 0 else 0.0
+        return {
+            "chunks_in": self.chunks_in,
+            "js_calls": self.flushes,
+            "calls_saved": self.chunks_in - self.flushes,
+            "reduction": (self.chunks_in / self.flushes) if self.flushes else 0.0,
+            "bytes_in": self.bytes_in,
+            "sustained_mb_s": sustained / (1024 * 1024),
+            "current_mb_s": self._current_rate / (1024 * 1024),
+            "peak_mb_s": self._peak_rate / (1024 * 1024),
+        }
+
+    def reset_stats(self):
+        self.chunks_in = 0
+        self.bytes_in = 0
+        self.flushes = 0
+        self._first_data_at = None
+        self._last_data_at = None
+        self._window_started_at = time.monotonic()
+        self._window_bytes = 0
+        self._current_rate = 0.0
+        self._peak_rate = 0.0
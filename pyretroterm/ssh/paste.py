@@ -0,0 +1,259 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+import re
+import threading
+import time
+
+from .prompt_matcher import PromptMatcher
+
+# How a paste is paced:
+#   'window' - as fast as the SSH window allows, for hosts with a real tty
+#   'echo'   - also keep the output echoed back within max_in_flight bytes of
+#              what was sent, so the paste runs at the device's own speed
+#   'prompt' - send one line, wait for the prompt, send the next
+PASTE_MODES = ("window", "echo", "prompt")
+DEFAULT_PASTE_MODE = "echo"
+
+# Writes from the terminal at least this long, or with more than one line,
+# go through the paste engine instead of one channel.send
+PASTE_THRESHOLD = 256
+
+# Whole lines are grouped into chunks of up to this many bytes
+CHUNK_BYTES = 1024
+# 'echo' mode: bytes sent but not yet echoed before sending stops
+MAX_IN_FLIGHT = 2048
+# Give up waiting for an echo or prompt after this long and send anyway
+HANDSHAKE_TIMEOUT = 5.0
+PROGRESS_INTERVAL = 0.1
+
+# Used by 'prompt' mode when the session has no prompt pattern of its own
+DEFAULT_PROMPT_PATTERN = r"[\w\-.()/:@~\[\]]+[#>$%]\s*$"
+
+BRACKETED_PASTE_START = "\x1b[200~"
+BRACKETED_PASTE_END = "\x1b[201~"
+
+LINE_RE = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+$")
+
+
+def is_paste(data):
+    """Whether a write from the terminal is a paste rather than typing."""
+    return len(data) >= PASTE_THRESHOLD or bool(re.search(r"[\r\n]", data.rstrip("\r\n")))
+
+
+def split_lines(text):
+    """Split pasted text into lines that each end in a single CR, as typed."""
+    lines = []
+    for m in LINE_RE.finditer(text):
+        line = m.group(0)
+        stripped = line.rstrip("\r\n")
+        lines.append(stripped + "\r" if stripped != line else line)
+    return lines
+
+
+def make_chunks(lines, chunk_bytes=CHUNK_BYTES):
+    """
+    Group whole lines into chunks of up to ``chunk_bytes``. A longer line is
+    a chunk of its own.
+
+    :return: list of (text, line count).
+    """
+    chunks = []
+    current = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) > chunk_bytes:
+            chunks.append(("".join(current), len(current)))
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append(("".join(current), len(current)))
+    return chunks
+
+
+class PasteWorker(QThread):
+    """
+    Sends one paste on its own thread, a chunk at a time, never more than
+    the channel's send window so ``send`` doesn't block, paced by the mode.
+
+    ``received`` is fed the session's decoded output from the reader thread.
+    """
+    progress = pyqtSignal(int, int)
+    finished_paste = pyqtSignal(str)
+
+    def __init__(self, channel, text, mode=DEFAULT_PASTE_MODE, prompt_pattern=None,
+                 chunk_bytes=CHUNK_BYTES, max_in_flight=MAX_IN_FLIGHT, timeout=HANDSHAKE_TIMEOUT):
+        """
+        :param text: the paste as the terminal delivered it.
+        :param mode: one of PASTE_MODES.
+        :param prompt_pattern: prompt regex for 'prompt' mode, DEFAULT_PROMPT_PATTERN if None.
+        """
+        super().__init__()
+        if mode not in PASTE_MODES:
+            raise ValueError(f"Unknown paste mode: {mode}")
+        self.channel = channel
+        self.mode = mode
+        self.chunk_bytes = chunk_bytes
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+
+        # The remote application asked for bracketed paste: it reads the
+        # whole paste itself, so keep the markers and skip any handshake
+        self.bracketed = text.startswith(BRACKETED_PASTE_START) and text.endswith(BRACKETED_PASTE_END)
+        if self.bracketed:
+            text = text[len(BRACKETED_PASTE_START):-len(BRACKETED_PASTE_END)]
+            self.mode = "window"
+
+        self.matcher = None
+        if self.mode == "prompt":
+            self.matcher = PromptMatcher(prompt_pattern or DEFAULT_PROMPT_PATTERN, count=None, collect=False)
+            chunks = [(line, 1) for line in split_lines(text)]
+        else:
+            chunks = make_chunks(split_lines(text), chunk_bytes)
+        if self.bracketed:
+            chunks = [(BRACKETED_PASTE_START, 0)] + chunks + [(BRACKETED_PASTE_END, 0)]
+        self._chunks = chunks
+        self._extra = []
+        self.total_lines = sum(lines for _, lines in chunks)
+        self.lines_sent = 0
+        self.bytes_sent = 0
+        self.bytes_echoed = 0
+        self.timeouts = 0
+        self.started = None
+        self.elapsed = 0.0
+
+        self._lock = threading.Lock()
+        self._output = threading.Event()
+        self._cancel = threading.Event()
+
+    def received(self, text):
+        """Output from the session, on the reader thread."""
+        # Counted in bytes, like bytes_sent, so multibyte echo isn't under-credited
+        echoed = len(text.encode("utf-8"))
+        with self._lock:
+            self.bytes_echoed += echoed
+        matcher = self.matcher
+        if matcher is not None:
+            matcher.feed(text)
+        self._output.set()
+
+    def extend(self, data):
+        """Keystrokes typed during the paste go out after it, in order."""
+        with self._lock:
+            self._extra.append(data)
+
+    def take_pending(self):
+        """Keystrokes that came in after the last chunk went out."""
+        with self._lock:
+            extra, self._extra = self._extra, []
+        return "".join(extra)
+
+    def cancel(self):
+        self._cancel.set()
+        self._output.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def run(self):
+        self.started = time.monotonic()
+        last_progress = 0.0
+        status = "done"
+        chunks = iter(self._chunks)
+        try:
+            while True:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    extra = self.take_pending()
+                    if not extra:
+                        break
+                    chunk = (extra, 0)
+                if self.cancelled:
+                    status = "cancelled"
+                    break
+                text, lines = chunk
+                status = "closed"
+                if self.mode == "prompt" and lines:
+                    matches = self.matcher.matches
+                    if not self._send(text):
+                        break
+                    self._wait(lambda: self.matcher.matches > matches)
+                else:
+                    if self.mode == "echo" and lines:
+                        # Output beyond the echo (banners, prompts) earns no extra credit
+                        with self._lock:
+                            self.bytes_echoed = min(self.bytes_echoed, self.bytes_sent)
+                        self._wait(lambda: self._in_flight() < self.max_in_flight)
+                    if not self._send(text):
+                        break
+                status = "done"
+                self.lines_sent += lines
+                now = time.monotonic()
+                if now - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = now
+                    self.progress.emit(self.lines_sent, self.total_lines)
+        except Exception as e:
+            print(f"Paste failed: {e}")
+            status = "closed"
+        if status == "closed" and self.cancelled:
+            status = "cancelled"
+        if status == "cancelled" and self.bracketed:
+            # Don't leave the remote application stuck in paste mode
+            self._send(BRACKETED_PASTE_END)
+        self.elapsed = time.monotonic() - self.started
+        self.progress.emit(self.lines_sent, self.total_lines)
+        self.finished_paste.emit(status)
+
+    def _send(self, text):
+        """
+        Send all of ``text``, no more than the window has room for at a time.
+
+        :return: False if the channel closed or the paste was cancelled.
+        """
+        data = text.encode("utf-8")
+        while data:
+            if self.channel.closed:
+                return False
+            if not self.channel.send_ready():
+                # Window exhausted, the device hasn't consumed what we sent yet
+                if self._cancel.wait(0.005):
+                    return False
+                continue
+            room = max(1, min(len(data), self.channel.out_window_size, self.channel.out_max_packet_size))
+            sent = self.channel.send(data[:room])
+            data = data[sent:]
+            with self._lock:
+                self.bytes_sent += sent
+        return True
+
+    def _in_flight(self):
+        """Bytes sent that haven't been echoed back yet."""
+        with self._lock:
+            return self.bytes_sent - self.bytes_echoed
+
+    def _wait(self, ready):
+        """Wait for ``ready()`` as output arrives, up to the handshake timeout."""
+        deadline = time.monotonic() + self.timeout
+        while not ready():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # No echo (or a prompt we don't recognise), carry on regardless
+                self.timeouts += 1
+                with self._lock:
+                    self.bytes_echoed = self.bytes_sent
+                return
+            self._output.clear()
+            if ready() or self.cancelled:
+                return
+            self._output.wait(min(remaining, 0.25))
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'lines_sent': self.lines_sent,
+            'total_lines': self.total_lines,
+            'bytes_sent': self.bytes_sent,
+            'timeouts': self.timeouts,
+            'elapsed': self.elapsed if self.elapsed else (time.monotonic() - self.started if self.started else 0.0),
+        }
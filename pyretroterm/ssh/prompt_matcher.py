@@ -0,0 +1,100 @@
+import re
+
+# Default number of trailing characters kept between feeds. Must be longer
+# than the longest prompt you expect to match.
+DEFAULT_WINDOW = 512
+
+# sudo's password prompt, as printed by sudo itself or a PAM module
+SUDO_PASSWORD_PROMPT = r"\[sudo\] password for [^:\n]*:|^[Pp]assword:\s*$"
+
+
+def prompt_regex(prompt, require=None):
+    """
+    Build a pattern matching a line that contains a literal prompt string.
+
+    :param prompt: literal prompt text, e.g. '#' or 'router1#'.
+    :param require: optional literal that must also appear on the same line.
+    """
+    pattern = f"[^\n]*{re.escape(prompt)}"
+    if require:
+        pattern = f"(?=[^\n]*{re.escape(require)})" + pattern
+    return "^" + pattern
+
+
+class PromptMatcher:
+    """
+    Streaming prompt detector. Feed it decoded output as it arrives and it
+    reports when the prompt pattern has been seen.
+
+    Only a bounded tail of earlier output is rescanned on every feed, so a
+    prompt split across two reads still matches and the cost per chunk does
+    not grow with the amount of output. Output is collected as a list of
+    chunks and only joined when asked for.
+    """
+
+    def __init__(self, pattern, count=1, window=DEFAULT_WINDOW, flags=re.MULTILINE, collect=True):
+        """
+        :param pattern: regex string or compiled pattern.
+        :param count: matches needed before ``matched`` is set, None to never stop.
+        :param window: characters of earlier output rescanned with each feed.
+        :param flags: regex flags, used when pattern is a string.
+        :param collect: keep the output for ``output()``.
+        """
+        self.regex = pattern if isinstance(pattern, re.Pattern) else re.compile(pattern, flags)
+        self.count = count
+        self.window = window
+        self.collect = collect
+        self.reset()
+
+    def reset(self):
+        self.matches = 0
+        self.last_match = None
+        self._tail = ""
+        # The character before _tail, so ^ doesn't match where the tail
+        # starts mid-line. Empty at the start of the stream.
+        self._before = ""
+        self._chunks = []
+
+    @property
+    def matched(self):
+        return self.count is not None and self.matches >= self.count
+
+    def feed(self, text):
+        """
+        Scan newly received text.
+
+        :param text: decoded output.
+        :return: number of prompts found in this feed.
+        """
+        if not text:
+            return 0
+        if self.collect:
+            self._chunks.append(text)
+        if self.matched:
+            return 0
+
+        buf = self._before + self._tail + text
+        pos = len(self._before)
+        found = 0
+        last_end = pos
+        for m in self.regex.finditer(buf, pos):
+            if m.end() == m.start():
+                continue
+            found += 1
+            last_end = m.end()
+            self.last_match = m.group(0)
+            if self.count is not None and self.matches + found >= self.count:
+                break
+        self.matches += found
+
+        # Never rescan text that already produced a match
+        start = max(last_end, len(buf) - self.window)
+        self._before = buf[start - 1] if start else ""
+        self._tail = buf[start:]
+        return found
+
+    def output(self):
+        """All collected output as one string."""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
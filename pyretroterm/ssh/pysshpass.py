@@ -1,59 +1,104 @@
-import sys
+import socket
 import paramiko
-import click
 from queue import Queue, Empty
 import threading
 import time
-import os
 import logging
 from pathlib import Path
 
+from .stream_decoder import StreamDecoder
+from .prompt_matcher import PromptMatcher, prompt_regex
+from .client_factory import ClientFactory
 
-def setup_logging(host):
-    """Configure logging with fallback to current directory"""
+# Guards the per-target loggers, fleet runs set them up and tear them down
+# from many threads, and counts the runs using each one
+_logging_lock = threading.Lock()
+_logging_users = {}
+
+
+def _logger_name(host, port):
+    return f"{__name__}.{host}:{int(port)}"
+
+
+def _log_dir():
     try:
         # Try to create log directory relative to script location
-        log_dir = Path(__file__).parent.parent / 'log'
+        return Path(__file__).parent.parent / 'log'
     except NameError:
         # Fallback to current working directory if __file__ is not available (e.g., in wheel)
-        log_dir = Path.cwd() / 'log'
+        return Path.cwd() / 'log'
+
+
+def setup_logging(host, port=22, console=True):
+    """
+    Per-target logger writing to log/<host>.log (log/<host>_<port>.log off
+    port 22), with fallback to current directory. Handlers are attached once
+    per target and the root logger is left alone, so this is safe to call
+    from many threads. Every call must be paired with ``close_logging``.
+
+    :param host: host name, also used for the log file name.
+    :param port: SSH port, targets on one host but different ports log apart.
+    :param console: echo output to stderr as well.
+    """
+    logger = logging.getLogger(_logger_name(host, port))
+    with _logging_lock:
+        _logging_users[logger.name] = _logging_users.get(logger.name, 0) + 1
+        if logger.handlers:
+            return logger
+
+        log_dir = _log_dir()
+        log_dir.mkdir(parents=True, exist_ok=True)
+        log_file = log_dir / (f'{host}.log' if int(port) == 22 else f'{host}_{int(port)}.log')
+
+        formatter = logging.Formatter('%(message)s')
+        handlers = [logging.FileHandler(log_file)]
+        if console:
+            handlers.append(logging.StreamHandler())
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        return logger
+
+
+def close_logging(host, port=22):
+    """Detach and close the handlers setup_logging added for a target once its last run is done."""
+    logger = logging.getLogger(_logger_name(host, port))
+    with _logging_lock:
+        users = _logging_users.pop(logger.name, 0) - 1
+        if users > 0:
+            _logging_users[logger.name] = users
+            return
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
 
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = log_dir / f'{host}.log'
 
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
-    return logging.getLogger(__name__)
+def ssh_client(host, user, password, cmds, invoke_shell, prompt, prompt_count, timeout,
+               disable_auto_add_policy, look_for_keys, inter_command_time, connect_only=False,
+               port=22, console=True):
+    """
+    SSH Client for running remote commands.
 
+    :return: the collected output, or the connected client with connect_only.
+    """
+    logger = setup_logging(host, port, console=console)
 
-def ssh_client(host, user, password, cmds, invoke_shell, prompt, prompt_count, timeout,
-               disable_auto_add_policy, look_for_keys, inter_command_time, connect_only=False):
-    """SSH Client for running remote commands."""
-    logger = setup_logging(host)
-
-    client = paramiko.SSHClient()
-    if disable_auto_add_policy:
-        client.load_system_host_keys()
-        client.set_missing_host_key_policy(paramiko.RejectPolicy())
-    else:
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    client = ClientFactory.instance().create(reject_unknown=disable_auto_add_policy)
 
     # Keep existing SSH configuration code...
 
     try:
         client.connect(
             hostname=host,
+            port=int(port),
             username=user,
             password=password,
             look_for_keys=look_for_keys,
             timeout=timeout,
+            banner_timeout=timeout,
+            auth_timeout=timeout,
             allow_agent=False
         )
         logger.info(f"Connected to {host} using the specified algorithms.")
@@ -61,7 +106,7 @@ def ssh_client(host, user, password, cmds, invoke_shell, prompt, prompt_count, t
             return client
     except paramiko.AuthenticationException:
         logger.error("Authentication failed, please verify your credentials.")
-        sys.exit(1)
+        raise ValueError("Authentication failed")
     except paramiko.SSHException as e:
         logger.error(f"Could not establish SSH connection: {str(e)}")
         raise ValueError(f"Paramiko: {e}")
@@ -77,18 +122,25 @@ def ssh_client(host, user, password, cmds, invoke_shell, prompt, prompt_count, t
 
     def execute_direct_command(command, timeout):
         stdin, stdout, stderr = client.exec_command(command)
-        start_time = time.time()
-        output = ""
+        channel = stdout.channel
+        # Block in recv until data, EOF or `timeout` seconds of silence
+        channel.settimeout(timeout)
+        decoder = StreamDecoder()
+        output = []
         while True:
-            if stdout.channel.recv_ready():
-                output_chunk = stdout.channel.recv(4096).decode('utf-8')
-                logger.info(output_chunk.rstrip())
-                output += output_chunk
-                start_time = time.time()
-            if time.time() - start_time > timeout:
+            try:
+                data = channel.recv(4096)
+            except socket.timeout:
                 logger.info("Command timed out.")
                 break
-        return output
+            if not data:
+                break
+            output_chunk = decoder.decode(data)
+            logger.info(output_chunk.rstrip())
+            output.append(output_chunk)
+        output.append(decoder.flush())
+        channel.close()
+        return "".join(output)
 
     if invoke_shell:
         try:
@@ -112,10 +164,18 @@ def ssh_client(host, user, password, cmds, invoke_shell, prompt, prompt_count, t
             output = output_queue.get(timeout=timeout)
             logger.info("\nExiting: Prompt detected.")
         except Empty:
+            output = None
             logger.info("\nExiting due to timeout.")
 
         channel.close()
-        return
+        if output is None:
+            # The reader hands over what it has once the channel is closed
+            try:
+                output = output_queue.get(timeout=1)
+            except Empty:
+                output = ""
+        client.close()
+        return output
     else:
         output = ""
         for cmd in [cmd.strip() for cmd in cmds.split(',') if cmd.strip()]:
@@ -126,21 +186,24 @@ def ssh_client(host, user, password, cmds, invoke_shell, prompt, prompt_count, t
 
 
 def read_output(channel, output_queue, prompt, prompt_count, logger):
-    counter = 0
-    output = ""
+    # A prompt is a line holding both the prompt string and a '-', which may
+    # arrive split across several reads
+    matcher = PromptMatcher(prompt_regex(prompt, require="-"), count=prompt_count)
+    decoder = StreamDecoder()
     while True:
-        if channel.recv_ready():
-            output_chunk = channel.recv(4096).decode('utf-8').replace('\r', '')
-            logger.info(output_chunk.rstrip())
-            output += output_chunk
-
-            for line in output_chunk.split("\n"):
-                if (prompt in line) and ("-" in line):
-                    counter += 1
-                    if counter >= prompt_count:
-                        output_queue.put(output)
-                        return
-
-        if channel.closed:
-            output_queue.put(output)
-            return
\ No newline at end of file
+        # Blocks until data arrives, returns b'' once the channel is closed
+        try:
+            data = channel.recv(4096)
+        except (socket.timeout, OSError):
+            data = b""
+        if not data:
+            matcher.feed(decoder.flush())
+            output_queue.put(matcher.output())
+            return
+
+        output_chunk = decoder.decode(data).replace('\r', '')
+        logger.info(output_chunk.rstrip())
+        matcher.feed(output_chunk)
+        if matcher.matched:
+            output_queue.put(matcher.output())
+            return
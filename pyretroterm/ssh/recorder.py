@@ -0,0 +1,254 @@
+from bisect import bisect_right
+from collections import deque
+import json
+import os
+import re
+import threading
+import time
+
+from .session_logger import SessionLogWriter
+
+# Recordings are asciicast v2 (https://docs.asciinema.org/manual/asciicast/v2/):
+# a JSON header line, then one [time, code, data] event per line. Next to
+# every recording sits a keyframe index, <name>.cast.idx, so a player can
+# jump into the middle of a long recording without reading what came before.
+RECORDINGS_DIR = "./recordings"
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+# Seconds of recording between keyframes, and how much output before each
+# keyframe a player replays to rebuild the screen when seeking there
+KEYFRAME_INTERVAL = 10.0
+KEYFRAME_TAIL = 16 * 1024
+
+# Keystrokes answering a prompt like this are recorded masked
+SECRET_PROMPT_RE = re.compile(r"(?i)(password|passphrase|passcode)[^\n]*:\s*$")
+
+
+def recording_path(host, directory=RECORDINGS_DIR):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(directory, f"{host}_{stamp}.cast")
+
+
+class KeyframeTracker:
+    """
+    Decides when a keyframe is due and what goes in it. Used while recording
+    and when indexing a recording that has no index yet.
+
+    A keyframe is the event offset to resume from plus ``tail_offset``, where
+    the last ``tail`` characters of output before it start. Seeking replays
+    just that stretch to rebuild the screen.
+    """
+
+    def __init__(self, width, height, interval=KEYFRAME_INTERVAL, tail=KEYFRAME_TAIL):
+        self.size = [width, height]
+        self.interval = interval
+        self.tail_size = tail
+        self._tail = deque()  # (offset, length) of recent output events
+        self._tail_len = 0
+        self._next_at = 0.0
+
+    def event(self, t, code, data, offset):
+        """
+        Account for an event about to be written at byte ``offset``.
+
+        :return: keyframe dict to store, or None.
+        """
+        keyframe = None
+        if t >= self._next_at:
+            tail_offset = self._tail[0][0] if self._tail else offset
+            keyframe = {'t': t, 'offset': offset, 'tail_offset': tail_offset, 'size': list(self.size)}
+            self._next_at = t + self.interval
+        if code == "o":
+            self._tail.append((offset, len(data)))
+            self._tail_len += len(data)
+            while self._tail_len - self._tail[0][1] >= self.tail_size:
+                self._tail_len -= self._tail.popleft()[1]
+        elif code == "r":
+            try:
+                cols, rows = data.split("x")
+                self.size = [int(cols), int(rows)]
+            except ValueError:
+                pass
+        return keyframe
+
+
+class SessionRecorder:
+    """
+    Records a terminal session as asciicast v2 through the SessionLogWriter,
+    so the reader thread only formats a line and queues it.
+
+    ``output``, ``input`` and ``resize`` may be called from different threads.
+    """
+
+    def __init__(self, path, width=80, height=24, title=None, record_input=True,
+                 keyframe_interval=KEYFRAME_INTERVAL):
+        writer = SessionLogWriter.instance()
+        # One file per recording: no rotation, no compression
+        self.cast = writer.open(path, max_bytes=0, rotate_interval=0, compression=None)
+        self.path = self.cast.path
+        self.index = writer.open(self.path + INDEX_SUFFIX, max_bytes=0, rotate_interval=0, compression=None)
+        self.record_input = record_input
+        self.started = time.time()
+        self._clock = time.monotonic()
+        self._lock = threading.Lock()
+        self._tracker = KeyframeTracker(width, height, interval=keyframe_interval)
+        self._secret = False
+        self._recent = ""
+        self.events = 0
+        self.closed = False
+
+        header = {'version': 2, 'width': width, 'height': height, 'timestamp': int(self.started),
+                  'env': {'TERM': 'xterm-256color'}}
+        if title:
+            header['title'] = title
+        line = json.dumps(header) + "\n"
+        self.cast.write(line)
+        self._offset = len(line)
+        self.index.write(json.dumps({'version': INDEX_VERSION, 'interval': keyframe_interval}) + "\n")
+
+    def _event(self, code, data):
+        with self._lock:
+            if self.closed:
+                return
+            t = round(time.monotonic() - self._clock, 6)
+            keyframe = self._tracker.event(t, code, data, self._offset)
+            if keyframe is not None:
+                self.index.write(json.dumps(keyframe) + "\n")
+            # ASCII-only JSON written untranslated, so characters are bytes
+            # and offsets stay exact
+            line = json.dumps([t, code, data]) + "\n"
+            self.cast.write(line)
+            self._offset += len(line)
+            self.events += 1
+
+    def output(self, text):
+        if not text:
+            return
+        self._recent = (self._recent + text)[-256:]
+        self._secret = bool(SECRET_PROMPT_RE.search(self._recent))
+        self._event("o", text)
+
+    def input(self, text):
+        if not text or not self.record_input:
+            return
+        if self._secret:
+            # Keep the timing, not the password
+            text = re.sub(r"[^\r\n]", "*", text)
+        self._event("i", text)
+
+    def resize(self, cols, rows):
+        self._event("r", f"{cols}x{rows}")
+
+    def marker(self, label=""):
+        self._event("m", label)
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.cast.close()
+        self.index.close()
+
+
+def build_index(path, interval=KEYFRAME_INTERVAL):
+    """
+    Write the keyframe index for a recording made elsewhere (or whose index
+    got lost) with a single pass over the file.
+
+    :return: path of the index.
+    """
+    keyframes = []
+    with open(path, "rb") as f:
+        header = json.loads(f.readline())
+        tracker = KeyframeTracker(header.get('width', 80), header.get('height', 24), interval=interval)
+        offset = f.tell()
+        for raw in f:
+            try:
+                t, code, data = json.loads(raw)
+            except ValueError:
+                break
+            keyframe = tracker.event(t, code, data, offset)
+            if keyframe is not None:
+                keyframes.append(keyframe)
+            offset += len(raw)
+    index_path = path + INDEX_SUFFIX
+    with open(index_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({'version': INDEX_VERSION, 'interval': interval}) + "\n")
+        for keyframe in keyframes:
+            f.write(json.dumps(keyframe) + "\n")
+    return index_path
+
+
+class CastReader:
+    """
+    Random access to an asciicast v2 recording through its keyframe index,
+    building the index first if there is none.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.header = json.loads(f.readline())
+            self.events_offset = f.tell()
+        self.width = self.header.get('width', 80)
+        self.height = self.header.get('height', 24)
+        index_path = self.path + INDEX_SUFFIX
+        if not os.path.exists(index_path):
+            build_index(self.path)
+        self.keyframes = self._load_index(index_path)
+        self.duration = self._last_event_time()
+        if self.duration - self.keyframes[-1]['t'] > 3 * KEYFRAME_INTERVAL:
+            # The recording kept going after its index stopped, e.g. a crash
+            build_index(self.path)
+            self.keyframes = self._load_index(index_path)
+        self._times = [keyframe['t'] for keyframe in self.keyframes]
+
+    def _load_index(self, index_path):
+        keyframes = []
+        with open(index_path, encoding="utf-8") as f:
+            f.readline()
+            for line in f:
+                try:
+                    keyframes.append(json.loads(line))
+                except ValueError:
+                    break
+        if not keyframes:
+            keyframes.append({'t': 0.0, 'offset': self.events_offset, 'tail_offset': self.events_offset,
+                              'size': [self.width, self.height]})
+        return keyframes
+
+    def _last_event_time(self):
+        size = os.path.getsize(self.path)
+        window = 64 * 1024
+        with open(self.path, "rb") as f:
+            while True:
+                start = max(self.events_offset, size - window)
+                f.seek(start)
+                lines = f.read(size - start).splitlines()
+                # The first line is cut unless we started at the first event
+                for raw in reversed(lines if start == self.events_offset else lines[1:]):
+                    try:
+                        return float(json.loads(raw)[0])
+                    except (ValueError, TypeError, IndexError):
+                        continue
+                if start == self.events_offset:
+                    return 0.0
+                window *= 4
+
+    def keyframe_at(self, t):
+        """Last keyframe at or before time t."""
+        return self.keyframes[max(0, bisect_right(self._times, t) - 1)]
+
+    def events(self, offset):
+        """Yield (t, code, data) from byte offset to the end of the recording."""
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                try:
+                    t, code, data = json.loads(raw)
+                except ValueError:
+                    # Partial last line of a recording still being written
+                    return
+                yield t, code, data
@@ -0,0 +1,146 @@
+from bisect import bisect_left
+from collections import deque
+import threading
+
+from .firehose import ANSI_RE
+
+# Raw output kept per session, oldest chunks are dropped past the cap
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+class _Chunk:
+    __slots__ = ("offset", "lines_before", "newlines", "data")
+
+    def __init__(self, offset, lines_before):
+        self.offset = offset
+        self.lines_before = lines_before
+        self.newlines = 0
+        self.data = bytearray()
+
+
+class ScrollbackStore:
+    """
+    Append-only store of a session's raw output with line-number lookup.
+
+    Output is kept in fixed size chunks. Every chunk records its stream offset
+    and how many newlines came before it, which is the line index: finding a
+    line is a bisect over the chunks plus a scan inside one chunk, so appending
+    costs a single ``bytes.count`` however fast the output arrives.
+
+    Lines are numbered from the start of the session and stay stable when old
+    chunks are evicted; ``first_line`` moves forward instead. Safe to append
+    from one thread and read from another.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, chunk_size=DEFAULT_CHUNK_SIZE):
+        if max_bytes < chunk_size:
+            raise ValueError("max_bytes must hold at least one chunk")
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._chunks = deque([_Chunk(0, 0)])
+        self._size = 0
+        self._evicted = False
+        self._lock = threading.Lock()
+
+    def append(self, data):
+        if not data:
+            return
+        with self._lock:
+            view = memoryview(data)
+            while view:
+                chunk = self._chunks[-1]
+                room = self.chunk_size - len(chunk.data)
+                if room == 0:
+                    chunk = _Chunk(chunk.offset + len(chunk.data), chunk.lines_before + chunk.newlines)
+                    self._chunks.append(chunk)
+                    room = self.chunk_size
+                filled = len(chunk.data)
+                chunk.data += view[:room]
+                chunk.newlines += chunk.data.count(b"\n", filled)
+                self._size += len(chunk.data) - filled
+                view = view[room:]
+            while self._size > self.max_bytes and len(self._chunks) > 1:
+                self._size -= len(self._chunks.popleft().data)
+                self._evicted = True
+
+    @property
+    def line_count(self):
+        """Number of the line currently being written (complete lines so far)."""
+        chunk = self._chunks[-1]
+        return chunk.lines_before + chunk.newlines
+
+    @property
+    def first_line(self):
+        """Oldest line still held in full."""
+        first = self._chunks[0].lines_before
+        return first + 1 if self._evicted else first
+
+    def _line_offset(self, line):
+        """Stream offset where a line starts, line must be within the store."""
+        if line == 0:
+            return 0
+        # The chunk holding the newline that ends line - 1
+        ends = [chunk.lines_before + chunk.newlines for chunk in self._chunks]
+        chunk = self._chunks[bisect_left(ends, line)]
+        pos = -1
+        for _ in range(line - chunk.lines_before):
+            pos = chunk.data.find(b"\n", pos + 1)
+        return chunk.offset + pos + 1
+
+    def _read(self, start, end):
+        parts = []
+        for chunk in self._chunks:
+            chunk_end = chunk.offset + len(chunk.data)
+            if chunk_end <= start:
+                continue
+            if chunk.offset >= end:
+                break
+            parts.append(bytes(chunk.data[max(0, start - chunk.offset):end - chunk.offset]))
+        return b"".join(parts)
+
+    def _lines(self, start, end):
+        with self._lock:
+            start = max(start, self.first_line)
+            end = min(end, self.line_count)
+            if end <= start:
+                return start, []
+            data = self._read(self._line_offset(start), self._line_offset(end))
+        return start, data.split(b"\n")[:-1]
+
+    def lines(self, start, count):
+        """
+        Raw bytes of complete lines ``start`` up to ``start + count``, clipped to
+        what the store still holds.
+
+        :return: (first line number returned, list of lines without the newline)
+        """
+        return self._lines(start, start + count)
+
+    def page_before(self, before, count):
+        """
+        Up to ``count`` lines ending just before line ``before``.
+
+        :param before: line number, negative values count back from line_count.
+        :return: same as lines().
+        """
+        if before < 0:
+            before = max(0, self.line_count + before)
+        return self._lines(before - count, before)
+
+    def clear(self):
+        with self._lock:
+            last = self._chunks[-1]
+            self._chunks = deque([_Chunk(last.offset + len(last.data), last.lines_before + last.newlines)])
+            self._size = 0
+            self._evicted = True
+
+    def stats(self):
+        return {'bytes': self._size, 'max_bytes': self.max_bytes, 'chunks': len(self._chunks),
+                'first_line': self.first_line, 'line_count': self.line_count}
+
+
+def plain_text(line, encoding="utf-8"):
+    """Printable text of one stored line, escape sequences and overwritten text removed."""
+    text = ANSI_RE.sub("", line.decode(encoding, errors="replace")).rstrip("\r")
+    return text.rsplit("\r", 1)[-1]
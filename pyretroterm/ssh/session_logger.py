@@ -0,0 +1,268 @@
+import atexit
+import gzip
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_ROTATE_INTERVAL = 24 * 60 * 60
+DEFAULT_COMPRESSION = "gzip"
+# Between a log's name and the number of a sibling opened alongside it,
+# session_<host>~2.log. Never part of a hostname, so the host can be told
+# apart from the number, unlike with "-" as in core-sw-2.
+SIBLING_SEPARATOR = "~"
+
+_STOP = object()
+_CLOSE = object()
+
+
+class SessionLog:
+    """
+    Handle for one session log file. ``write`` only queues data, all file
+    I/O happens on the SessionLogWriter thread.
+    """
+
+    def __init__(self, writer, path, max_bytes, rotate_interval, compression, encoding="utf-8"):
+        self.writer = writer
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.compression = compression
+        self.encoding = encoding
+        self.closed = False
+
+        # Writer thread state
+        self._file = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._dirty = False
+        self._pending_cr = False
+
+    def write(self, data):
+        if not self.closed and data:
+            self.writer.queue.put((self, data))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.queue.put((self, _CLOSE))
+
+    # -- everything below runs on the writer thread --
+
+    def _open_file(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Generous buffer, the writer flushes on its own schedule. Binary, so
+        # newlines aren't translated and _size counts the bytes on disk,
+        # which is what recording offsets and the log index rely on.
+        self._file = open(self.path, "ab", buffering=64 * 1024)
+        self._size = self._file.tell()
+        self._opened_at = time.time()
+
+    def _normalize(self, data):
+        # Keep a CR at the end of a chunk until we know whether LF follows
+        if self._pending_cr:
+            data = "\r" + data
+            self._pending_cr = False
+        if data.endswith("\r"):
+            data = data[:-1]
+            self._pending_cr = True
+        return data.replace("\r\n", "\n").replace("\r", "\n")
+
+    def _write(self, data):
+        if self._file is None:
+            self._open_file()
+        text = self._normalize(data)
+        if not text:
+            return
+        raw = text.encode(self.encoding, errors="replace")
+        self._file.write(raw)
+        self._size += len(raw)
+        self._dirty = True
+        if self._should_rotate():
+            self._rotate()
+
+    def _flush(self):
+        if self._file is not None and self._dirty:
+            self._file.flush()
+            self._dirty = False
+
+    def _should_rotate(self):
+        if self.max_bytes and self._size >= self.max_bytes:
+            return True
+        if self.rotate_interval and time.time() - self._opened_at >= self.rotate_interval:
+            return True
+        return False
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        stem, ext = os.path.splitext(self.path)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        segment = f"{stem}.{stamp}{ext}"
+        counter = 1
+        while any(os.path.exists(segment + suffix) for suffix in ("", ".gz", ".zst")):
+            counter += 1
+            segment = f"{stem}.{stamp}-{counter}{ext}"
+        os.replace(self.path, segment)
+        self.writer.compress(segment, self.compression)
+        self._open_file()
+
+    def _close_file(self):
+        if self._pending_cr and self._file is not None:
+            self._file.write(b"\n")
+            self._pending_cr = False
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SessionLogWriter:
+    """
+    Background service owning every session log.
+
+    File handles stay open for the lifetime of a session, writes are buffered
+    and flushed every ``flush_interval`` seconds, and files are rotated by size
+    or age with the closed segment compressed off the writer thread.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._instance.start()
+                atexit.register(cls._instance.stop)
+            return cls._instance
+
+    def __init__(self, flush_interval=1.0):
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self._logs = {}
+        self._paths_lock = threading.Lock()
+        self._open_paths = set()
+        self._thread = None
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SessionLogCompress")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="SessionLogWriter", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self.queue.put(_STOP)
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._compressor.shutdown(wait=True)
+
+    def open(self, path, max_bytes=DEFAULT_MAX_BYTES, rotate_interval=DEFAULT_ROTATE_INTERVAL,
+             compression=DEFAULT_COMPRESSION):
+        """
+        Open a session log. If another open session already writes to ``path``
+        a numbered sibling is used instead so output never interleaves.
+
+        :param path: requested log file path.
+        :param max_bytes: rotate once the file reaches this size (0 disables).
+        :param rotate_interval: rotate after this many seconds (0 disables).
+        :param compression: 'gzip', 'zstd' or None for rotated segments.
+        :return: SessionLog
+        """
+        path = self._claim_path(os.path.abspath(path))
+        return SessionLog(self, path, max_bytes, rotate_interval, compression)
+
+    def _claim_path(self, path):
+        with self._paths_lock:
+            candidate = path
+            stem, ext = os.path.splitext(path)
+            counter = 1
+            while candidate in self._open_paths:
+                counter += 1
+                candidate = f"{stem}{SIBLING_SEPARATOR}{counter}{ext}"
+            self._open_paths.add(candidate)
+            return candidate
+
+    def _release_path(self, path):
+        with self._paths_lock:
+            self._open_paths.discard(path)
+
+    def compress(self, path, compression):
+        if compression:
+            self._compressor.submit(self._compress, path, compression)
+
+    @staticmethod
+    def _compress(path, compression):
+        try:
+            if compression == "zstd" and zstandard is not None:
+                target = path + ".zst"
+                with open(path, "rb") as src, open(target, "wb") as dst:
+                    zstandard.ZstdCompressor().copy_stream(src, dst)
+            else:
+                if compression == "zstd":
+                    logger.warning("zstandard not installed, compressing log segment with gzip")
+                target = path + ".gz"
+                with open(path, "rb") as src, gzip.open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            os.remove(path)
+        except Exception as e:
+            logger.error(f"Failed to compress log segment {path}: {e}")
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                break
+            if item is not None:
+                self._handle(item)
+
+            now = time.monotonic()
+            if now - last_flush >= self.flush_interval:
+                for log in list(self._logs.values()):
+                    try:
+                        log._flush()
+                    except Exception as e:
+                        logger.error(f"Failed to flush {log.path}: {e}")
+                last_flush = now
+
+        # Drain whatever is left and close everything
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                self._handle(item)
+        for log in list(self._logs.values()):
+            log._close_file()
+        self._logs.clear()
+
+    def _handle(self, item):
+        log, data = item
+        try:
+            if data is _CLOSE:
+                log._close_file()
+                self._logs.pop(id(log), None)
+                self._release_path(log.path)
+            else:
+                self._logs[id(log)] = log
+                log._write(data)
+        except Exception as e:
+            logger.error(f"Session log error for {log.path}: {e}")
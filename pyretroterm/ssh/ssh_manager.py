@@ -2,32 +2,111 @@
 import paramiko
 import asyncio
 import base64
+import threading
+
+from pyretroterm.ssh.stream_decoder import StreamDecoder, DEFAULT_ERRORS
+from pyretroterm.ssh.flow_control import FlowControl
+from pyretroterm.ssh.health import HealthMonitor
+from pyretroterm.ssh.algorithms import connect_client
+from pyretroterm.ssh.client_factory import ClientFactory
+from pyretroterm.ssh.jump import JumpHost, open_tunnel
+from pyretroterm.ssh.transport_profile import TransportProfile
+from pyretroterm.ssh.connect_pipeline import open_shell_channel
+from pyretroterm.ssh.ws_frames import encode_frame, tab_id_bytes, MSG_OUTPUT, MSG_ERROR
+
+READ_SIZE = 65536
+# Most read from a channel each time the loop finds it readable, the loop
+# comes back for the rest so one flooding tab can't hold up the others
+MAX_READ_PER_WAKEUP = 4 * READ_SIZE
 
 class SSHClientManager:
-    def __init__(self):
+    def __init__(self, decode_errors=DEFAULT_ERRORS):
         self.clients = {}
+        self.decode_errors = decode_errors
 
     async def create_client(self, tab_id):
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        self.clients[tab_id] = {'client': ssh_client, 'channel': None}
+        ssh_client = ClientFactory.instance().create()
+        self.clients[tab_id] = {'client': ssh_client, 'channel': None,
+                                'decoder': StreamDecoder(errors=self.decode_errors),
+                                'framing': 'json', 'frame_id': None, 'flow': None,
+                                'health': None, 'health_state': 'ok', 'rtt_ms': None}
+
+    async def negotiate_framing(self, tab_id, requested, websocket):
+        """
+        Switch a tab to binary frames if the client asked for them and the tab
+        id can be carried in the frame header, and tell the client the result.
 
-    async def connect(self, tab_id, hostname, port, username, password, websocket):
+        :return: the framing mode in use, 'json' or 'binary'.
+        """
+        mode = 'json'
+        if requested == 'binary':
+            try:
+                self.clients[tab_id]['frame_id'] = tab_id_bytes(tab_id)
+                mode = 'binary'
+            except ValueError:
+                print(f"Tab id {tab_id} is not a UUID, staying on JSON frames")
+        self.clients[tab_id]['framing'] = mode
+        await websocket.send_json({'type': 'framing', 'mode': mode, 'tabId': tab_id})
+        return mode
+
+    async def connect(self, tab_id, hostname, port, username, password, websocket, framing=None,
+                      flow_control=False, transport_profile=None, proxy_jump=None):
+        """
+        :param framing: the 'framing' field of the client's connect message, if any.
+        :param flow_control: the client acknowledges output ('ack' messages), so
+                             reading may pause while too much is outstanding.
+        :param transport_profile: TransportProfile, or its to_dict() form, for window,
+                                  packet size, compression and rekey limits.
+        :param proxy_jump: jump host to connect through, ``[user@]host[:port]``
+                           or a mapping, see jump.py.
+        """
+        if not isinstance(transport_profile, TransportProfile):
+            transport_profile = TransportProfile.from_dict(transport_profile)
+        if flow_control:
+            self.clients[tab_id]['flow'] = FlowControl()
+        if framing is not None:
+            await self.negotiate_framing(tab_id, framing, websocket)
         ssh_client = self.clients[tab_id]['client']
         try:
-            transport = paramiko.Transport((hostname, int(port)))
-            transport.set_keepalive(60)
-            transport.connect(username=username, password=password)
-            ssh_client._transport = transport
-            channel = ssh_client.invoke_shell(term="xterm")
+            jump = JumpHost.parse(proxy_jump, username, password)
+            open_sock = (lambda: open_tunnel(jump, hostname, int(port))) if jump is not None else None
+            connect_client(ssh_client, hostname, int(port), transport_profile, open_sock=open_sock,
+                           username=username, password=password, look_for_keys=False, allow_agent=False)
+            transport = ssh_client.get_transport()
+            channel = open_shell_channel(ssh_client, "xterm", transport_profile)
             self.clients[tab_id]['channel'] = channel
+            # Keepalives, RTT and stale detection, reported to the client as 'health' messages
+            loop = asyncio.get_running_loop()
+            self.clients[tab_id]['health'] = HealthMonitor.instance().watch(
+                transport, lambda state, rtt_ms: self._on_health(tab_id, websocket, loop, state, rtt_ms))
         except paramiko.SSHException as e:
             await self.handle_ssh_error(tab_id, hostname, e, websocket)
         except Exception as e:
             print(f"SSH Server error: {e}")
 
+    def _on_health(self, tab_id, websocket, loop, state, rtt_ms):
+        """HealthMonitor callback, runs on the monitor's threads."""
+        client_data = self.clients.get(tab_id)
+        if client_data is None:
+            return
+        if rtt_ms >= 0:
+            client_data['rtt_ms'] = rtt_ms
+        if state == client_data['health_state']:
+            return
+        client_data['health_state'] = state
+        message = {'type': 'health', 'state': state, 'rtt': client_data['rtt_ms'], 'tabId': tab_id}
+        try:
+            asyncio.run_coroutine_threadsafe(websocket.send_json(message), loop)
+        except RuntimeError:
+            # Loop already closed
+            pass
+
     async def handle_ssh_error(self, tab_id, hostname, error, websocket):
         error_message = f"SSH connection error to {hostname}: {error}"
+        if self.clients[tab_id]['framing'] == 'binary':
+            await websocket.send_bytes(encode_frame(MSG_ERROR, self.clients[tab_id]['frame_id'],
+                                                    error_message.encode('utf-8')))
+            return
         encoded_data = base64.b64encode(error_message.encode('utf-8')).decode('utf-8')
         await websocket.send_json({'type': 'ssh_output', 'data': encoded_data, 'tabId': tab_id})
 
@@ -36,6 +115,12 @@ class SSHClientManager:
         if channel:
             channel.send(input_data)
 
+    async def ack_output(self, tab_id, nbytes):
+        """The client has written nbytes of output to its terminal."""
+        client_data = self.clients.get(tab_id)
+        if client_data and client_data['flow'] is not None:
+            client_data['flow'].ack(nbytes)
+
     async def resize_terminal(self, tab_id, cols, rows):
         channel = self.clients[tab_id]['channel']
         if channel:
@@ -46,15 +131,139 @@ class SSHClientManager:
         if client_data:
             channel = client_data['channel']
             client = client_data['client']
+            if client_data['flow'] is not None:
+                client_data['flow'].reset()
+            if client_data['health'] is not None:
+                HealthMonitor.instance().unwatch(client_data['health'])
             if channel:
                 channel.close()
             client.close()
 
     async def listen_to_ssh_output(self, tab_id, websocket):
-        while True:
-            await asyncio.sleep(0.1)
-            channel = self.clients[tab_id]['channel']
-            if channel and channel.recv_ready():
-                data = channel.recv(1024)
-                encoded_data = base64.b64encode(data).decode('utf-8')
-                await websocket.send_json({'type': 'ssh_output', 'data': encoded_data, 'tabId': tab_id})
+        """
+        Forward channel output to the websocket as soon as it arrives.
+
+        The channel's event pipe is watched with loop.add_reader, each wakeup
+        drains everything paramiko has buffered and sends it as one message.
+        Event loops without add_reader (Proactor on Windows) fall back to a
+        blocking reader thread.
+        """
+        while tab_id in self.clients and self.clients[tab_id]['channel'] is None:
+            # connect() has not opened the shell yet
+            await asyncio.sleep(0.05)
+        if tab_id not in self.clients:
+            return
+        channel = self.clients[tab_id]['channel']
+        decoder = self.clients[tab_id]['decoder']
+        # Binary frames carry raw bytes, xterm.js decodes UTF-8 across writes itself
+        frame_id = self.clients[tab_id]['frame_id'] if self.clients[tab_id]['framing'] == 'binary' else None
+        flow = self.clients[tab_id]['flow']
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop_pump = self._start_pump(loop, channel, queue, flow)
+        try:
+            while True:
+                data = await queue.get()
+                if data is None:
+                    break
+                # Coalesce whatever else arrived while we were sending
+                chunks = [data]
+                while not queue.empty():
+                    more = queue.get_nowait()
+                    if more is None:
+                        queue.put_nowait(None)
+                        break
+                    chunks.append(more)
+                data = b"".join(chunks)
+                if frame_id is not None:
+                    await websocket.send_bytes(encode_frame(MSG_OUTPUT, frame_id, data))
+                    continue
+                # Only forward complete characters, the rest waits for the next read
+                text = decoder.decode(data)
+                if not text:
+                    if flow is not None:
+                        flow.ack(len(data))
+                    continue
+                encoded_data = base64.b64encode(text.encode('utf-8')).decode('utf-8')
+                await websocket.send_json({'type': 'ssh_output', 'data': encoded_data, 'tabId': tab_id,
+                                           'bytes': len(data)})
+        finally:
+            stop_pump()
+
+    @staticmethod
+    def _start_pump(loop, channel, queue, flow=None):
+        """
+        Push channel output onto an asyncio queue, None once the channel is done.
+        Every read is counted with ``flow.sent()`` as it happens, and while
+        ``flow`` is paused the channel is left unread, so paramiko stops
+        opening the SSH window and the remote side slows down.
+
+        :return: callable that stops the pump.
+        """
+        def channel_done():
+            return channel.closed or (channel.eof_received and not channel.recv_ready())
+
+        try:
+            fd = channel.fileno()
+
+            def on_readable():
+                chunks = []
+                total = 0
+                while total < MAX_READ_PER_WAKEUP and channel.recv_ready():
+                    data = channel.recv(READ_SIZE)
+                    if not data:
+                        break
+                    chunks.append(data)
+                    total += len(data)
+                    if flow is not None and flow.sent(len(data)):
+                        # on_pause took the reader off the loop
+                        break
+                if chunks:
+                    queue.put_nowait(b"".join(chunks))
+                if channel_done():
+                    stop()
+                    queue.put_nowait(None)
+
+            stopped = []
+
+            def resume():
+                if stopped:
+                    return
+                loop.add_reader(fd, on_readable)
+                # Whatever piled up in paramiko while we were paused
+                on_readable()
+
+            def stop():
+                stopped.append(True)
+                loop.remove_reader(fd)
+
+            if flow is not None:
+                # sent() and ack() both run on the loop, so these do too
+                flow.on_pause = lambda: loop.remove_reader(fd)
+                flow.on_resume = resume
+
+            resume()
+            return stop
+        except NotImplementedError:
+            pass
+
+        def reader():
+            while True:
+                if flow is not None:
+                    while not flow.wait_resumed(1.0):
+                        if channel.closed:
+                            break
+                try:
+                    data = channel.recv(READ_SIZE)
+                except Exception:
+                    data = b""
+                if not data:
+                    loop.call_soon_threadsafe(queue.put_nowait, None)
+                    return
+                if flow is not None:
+                    flow.sent(len(data))
+                loop.call_soon_threadsafe(queue.put_nowait, data)
+
+        threading.Thread(target=reader, daemon=True).start()
+        return lambda: None
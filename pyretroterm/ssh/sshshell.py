@@ -1,84 +1,429 @@
-from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
-from .sshshellreader import ShellReaderThread
+from PyQt6.QtCore import QObject, QTimer, pyqtProperty, pyqtSignal, pyqtSlot
+from .sshshellreader import ShellOutputHandler
+from .channel_reactor import ChannelReactor
+from .output_batcher import OutputBatcher
+from .stream_decoder import StreamDecoder, DEFAULT_ERRORS
+from .connect_pipeline import ConnectWorker, connect_pool
+from .transport_registry import TransportRegistry
+from .flow_control import FlowControl
+from .firehose import FirehoseGate
+from .recorder import SessionRecorder, recording_path
+from .latency import EchoTracker
+from .health import HealthMonitor, HEALTH_OK, HEALTH_DEAD
+from .paste import PasteWorker, DEFAULT_PASTE_MODE, is_paste
+from .transport_profile import TransportProfile
+from .jump import JumpHost
+from .broker import broker_available
+from .broker_client import BrokerChannel, BrokerConnectWorker
+from .scrollback import ScrollbackStore, DEFAULT_MAX_BYTES as DEFAULT_SCROLLBACK_BYTES, plain_text
 from PyQt6.QtWidgets import QMessageBox
 import paramiko
+import base64
+import json
+
+# How output reaches xterm.js: 'webchannel' pushes base64 bytes through the
+# output_b64 signal, 'javascript' evaluates handle_output() per batch.
+OUTPUT_TRANSPORTS = ("webchannel", "javascript")
+
+# How often the latency overlay is refreshed while it is shown
+LATENCY_OVERLAY_INTERVAL_MS = 1000
 
 
 class Backend(QObject):
     send_output = pyqtSignal(str)
+    output_b64 = pyqtSignal(str)
+    connect_progress = pyqtSignal(str, str)
+    connected = pyqtSignal()
+    connect_failed = pyqtSignal(str, str)
+    prompt_detected = pyqtSignal(str)
+    screen_snapshot = pyqtSignal(str)
+    firehose_changed = pyqtSignal(bool, float)
+    latency_stats = pyqtSignal(str)
+    paste_progress = pyqtSignal(int, int)
+    paste_finished = pyqtSignal(str)
+    health_changed = pyqtSignal(str, float)
     buffer = ""
 
-    def __init__(self, host, username, password=None, port='22', key_path=None, parent_widget=None, parent=None):
+    def __init__(self, host, username, password=None, port='22', key_path=None, parent_widget=None, parent=None,
+                 decode_errors=DEFAULT_ERRORS, output_transport="webchannel", reuse_transport=True,
+                 prompt_pattern=None, firehose=True, scrollback_bytes=DEFAULT_SCROLLBACK_BYTES, record=False,
+                 paste_mode=DEFAULT_PASTE_MODE, transport_profile=None, proxy_jump=None, broker=False,
+                 broker_session=None, broker_meta=None, can_login=True):
         super().__init__(parent)
         self.parent_widget = parent_widget
+        self.decode_errors = decode_errors
+        if output_transport not in OUTPUT_TRANSPORTS:
+            raise ValueError(f"Unknown output transport: {output_transport}")
+        self.output_transport = output_transport
+        self._text_decoder = StreamDecoder(errors=decode_errors)
         self.client = None
         self.channel = None
-        self.reader_thread = None
+        self.reader_handle = None
+        self.output_handler = None
 
-        try:
-            self.client = paramiko.SSHClient()
-            self.client.load_system_host_keys()  # Load known host keys from the system
-            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # Automatically add unknown hosts
-            host = str(host).strip()
-            username = str(username).strip()
-
-            if key_path:
-                try:
-                    private_key = paramiko.RSAKey(filename=key_path.strip())
-                    self.client.connect(hostname=host, username=username, pkey=private_key)
-                    transport = self.client.get_transport()
-                    transport.set_keepalive(60)
-                except paramiko.AuthenticationException as e:
-                    self.notify("Login Failure", f"Authentication Failed: {host}")
-                    return
-                except paramiko.SSHException as e:
-                    self.notify("Login Failure", f"Connection Failed: {host} Reason: {e}")
-                    return
-                except Exception as e:
-                    self.notify("Error", str(e))
-                    return
+        # Coalesce reader chunks before they reach xterm.js
+        self.output_batcher = OutputBatcher(parent=self)
+        self.output_batcher.flushed.connect(self.emit_output)
+
+        # The web channel page acknowledges what xterm.js has parsed, reading
+        # pauses while too much is outstanding
+        self.flow = FlowControl(on_resume=self._resume_reading) if output_transport == "webchannel" else None
+
+        # Past what xterm.js can render, show periodic screen snapshots instead
+        self.firehose = None
+        if firehose:
+            self.firehose = FirehoseGate(on_consumed=self.flow.ack if self.flow is not None else None, parent=self)
+            self.firehose.output.connect(self.output_batcher.append)
+            self.firehose.snapshot.connect(self.emit_snapshot)
+            self.firehose.state_changed.connect(
+                lambda active, rate: self.firehose_changed.emit(active, rate / (1024 * 1024)))
+
+        # History beyond xterm.js' own scrollback, paged in by the page on demand
+        self.scrollback = ScrollbackStore(max_bytes=scrollback_bytes) if scrollback_bytes else None
+
+        # Keystroke-to-echo latency, bytes in/out and keepalive RTT
+        self.latency = EchoTracker()
+        self._latency_timer = QTimer(self)
+        self._latency_timer.setInterval(LATENCY_OVERLAY_INTERVAL_MS)
+        self._latency_timer.timeout.connect(self.emit_latency_stats)
+
+        # Large pastes are sent in paced chunks by a PasteWorker, see paste.py
+        self.paste_mode = paste_mode
+        self.paste = None
+        self._last_paste = None
+
+        # Liveness and RTT from the HealthMonitor, reported from its threads
+        self.health_token = None
+        self.health_state = HEALTH_OK
+        self.health_changed.connect(self._apply_health)
+
+        self.host = str(host).strip()
+        self.port = port
+        self.username = str(username).strip()
+        self.password = password
+        self.key_path = key_path
+        self.reuse_transport = reuse_transport
+        # Window, packet size, compression and rekey limits, see transport_profile.py
+        if isinstance(transport_profile, dict):
+            transport_profile = TransportProfile.from_dict(transport_profile)
+        self.transport_profile = transport_profile or TransportProfile()
+        # Jump host the session is reached through, see jump.py
+        self.proxy_jump = JumpHost.parse(proxy_jump, self.username, self.password, self.key_path)
+        # Have the connection broker hold the session when one is running, so
+        # it survives the GUI, see broker.py. broker_session attaches to one
+        # it already holds, broker_meta is kept with it for reattaching.
+        self.broker = broker and broker_available()
+        self.broker_session = broker_session
+        self.broker_meta = broker_meta
+        self._broker_offset = 0
+        # False for a tab rebuilt from a broker session, which has none of the
+        # credentials, jump host or profile to log in again with, only attach
+        self.can_login = can_login
+        self.prompt_pattern = prompt_pattern
+        # Handle of the pooled transport this session holds a reference on
+        self.transport_entry = None
+        self.state = "connecting"
+        self.connect_worker = None
+        self.frontend_ready = False
+        self._held_output = []
+        self._pty_size = None
+        # Kept for reconnecting without a DNS lookup
+        self._addrinfo = None
+        self.recorder = None
+        if record:
+            self.start_recording(record if isinstance(record, str) else None)
+
+        # Connect off the GUI thread, the tab shows progress meanwhile
+        self.start_connect()
+
+    def start_connect(self):
+        """Kick off the DNS/TCP/KEX/auth/shell pipeline on the connect pool."""
+        self.state = "connecting"
+        if self.broker:
+            self.connect_worker = BrokerConnectWorker(self.host, self.port, self.username,
+                                                      password=self.password, key_path=self.key_path,
+                                                      reuse_transport=self.reuse_transport,
+                                                      profile=self.transport_profile, jump=self.proxy_jump,
+                                                      session_id=self.broker_session, offset=self._broker_offset,
+                                                      meta=self.broker_meta)
+        else:
+            self.connect_worker = ConnectWorker(self.host, self.port, self.username,
+                                                password=self.password, key_path=self.key_path,
+                                                reuse_transport=self.reuse_transport, addrinfo=self._addrinfo,
+                                                profile=self.transport_profile, jump=self.proxy_jump)
+        self.connect_worker.signals.stage_changed.connect(self._on_connect_stage)
+        self.connect_worker.signals.connected.connect(self._on_connected)
+        self.connect_worker.signals.failed.connect(self._on_connect_failed)
+        connect_pool().start(self.connect_worker)
+
+    def _on_connect_stage(self, stage, detail):
+        self.connect_progress.emit(stage, detail)
+        self.output_batcher.append(f"\x1b[90m[{stage}] {detail}...\x1b[0m\r\n".encode())
+
+    def _on_connected(self, client, channel):
+        self.transport_entry = self.connect_worker.transport_entry
+        if self.connect_worker.addrinfo is not None:
+            self._addrinfo = self.connect_worker.addrinfo
+        if self.state == "closed":
+            # Tab went away while we were connecting
+            if self.broker_session is not None:
+                # Reattaching, e.g. the GUI is exiting again, so leave the session be
+                channel.detach()
             else:
-                password = str(password).strip()
-                try:
-                    self.client.connect(hostname=host, port=int(port), username=username, password=password, look_for_keys=False)
-                    transport = self.client.get_transport()
-                    transport.set_keepalive(60)
-                except paramiko.AuthenticationException as e:
-                    self.notify("Login Failure", f"Authentication Failed: {host}")
-                    return
-                except paramiko.SSHException as e:
-                    self.notify("Login Failure", f"Connection Failed: {host} Reason: {e}")
-                    return
-                except Exception as e:
-                    self.notify("Error", str(e))
-                    return
-
-            self.setup_shell()
+                channel.close()
+            self.release_client(client)
+            return
+        self.client = client
+        self.channel = channel
+        if isinstance(channel, BrokerChannel):
+            self.broker_session = channel.session_id
+        self.state = "connected"
+        self.setup_shell()
+        if self._pty_size is not None:
+            self.channel.resize_pty(width=self._pty_size[0], height=self._pty_size[1])
+        self.health_state = HEALTH_OK
+        self.health_token = HealthMonitor.instance().watch(channel.get_transport(), self._on_health)
+        self.connected.emit()
 
-        except Exception as e:
-            self.notify("Connection Error", str(e))
-            print(e)
+    def _on_connect_failed(self, title, message):
+        if self.state == "closed":
+            return
+        self.state = "failed"
+        # Whatever the broker held for us is gone, the next connect opens a new session
+        self.broker_session = None
+        self._broker_offset = 0
+        self.output_batcher.append(f"\x1b[31m{message}\x1b[0m\r\n".encode())
+        self.connect_failed.emit(title, message)
+        self.notify(title, message)
 
     def setup_shell(self):
-        try:
-            self.channel = self.client.invoke_shell("xterm")
-            self.channel.set_combine_stderr(True)
-            print("Invoked Shell!")
-        except Exception as e:
-            print(f"Shell not supported, falling back to pty...")
-            transport = self.client.get_transport()
-            options = transport.get_security_options()
-            print(options)
+        # Start reading the channel on the shared reactor
+        if self.channel is not None:
+            self.output_handler = ShellOutputHandler(self.buffer, parent_widget=self.parent_widget,
+                                                     decode_errors=self.decode_errors,
+                                                     prompt_pattern=self.prompt_pattern,
+                                                     on_prompt=self.prompt_detected.emit)
+            self.output_handler.recorder = self.recorder
+            self.output_handler.latency = self.latency
+            self.reader_handle = ChannelReactor.instance().register(self.channel, self.output_handler, flow=self.flow)
+            if self.scrollback is not None:
+                self.reader_handle.data_ready.connect(self.scrollback.append)
+            if self.firehose is not None:
+                self.reader_handle.data_ready.connect(self.firehose.append)
+            else:
+                self.reader_handle.data_ready.connect(self.output_batcher.append)
+            self.reader_handle.data_ready.connect(self._on_channel_data)
+            self.reader_handle.closed.connect(self._on_channel_closed)
 
-            self.channel = transport.open_session()
-            self.channel.get_pty()  # Request a pseudo-terminal
-            self.channel.set_combine_stderr(True)
+    def _on_channel_data(self, data):
+        if self.health_token is not None:
+            HealthMonitor.instance().output(self.health_token)
 
-        # Start reading the channel
-        if self.channel is not None:
-            self.reader_thread = ShellReaderThread(self.channel, self.buffer, parent_widget=self.parent_widget)
-            self.reader_thread.data_ready.connect(self.send_output)
-            self.reader_thread.start()
+    def _on_channel_closed(self):
+        self.output_batcher.flush()
+        self.broker_session = None
+        self._broker_offset = 0
+        if self.state == "connected":
+            self.state = "disconnected"
+            if self.can_login:
+                self.output_batcher.append(
+                    "\r\n\x1b[33m[connection closed - press Enter to reconnect]\x1b[0m\r\n".encode())
+            else:
+                self._refuse_login()
+
+    def _on_health(self, state, rtt_ms):
+        """HealthMonitor callback, runs on the monitor's threads."""
+        if rtt_ms >= 0:
+            self.latency.record_rtt(rtt_ms / 1000)
+        self.health_changed.emit(state, rtt_ms)
+
+    def _apply_health(self, state, rtt_ms):
+        if state == self.health_state:
+            return
+        self.health_state = state
+        if state == HEALTH_DEAD and self.state == "connected":
+            self.state = "disconnected"
+            self.output_batcher.append(
+                "\r\n\x1b[31m[connection lost - press Enter to reconnect]\x1b[0m\r\n".encode())
+
+    @pyqtSlot()
+    def reconnect(self):
+        """
+        Log in again with the same credentials and the cached address. The
+        page is left alone, so the terminal keeps everything it showed.
+        """
+        if self.state in ("connecting", "closed"):
+            return
+        if self.state == "detached":
+            self.attach()
+            return
+        if not self.can_login:
+            self._refuse_login()
+            return
+        self.output_batcher.append(f"\r\n\x1b[33m[reconnecting to {self.host}]\x1b[0m\r\n".encode())
+        # Other tabs may share the transport, so only our reference goes. The
+        # registry drops it once dead, a stale one is skipped by the worker.
+        self._close_session()
+        self.broker_session = None
+        self._broker_offset = 0
+        if self.flow is not None:
+            self.flow.reset()
+        self.start_connect()
+
+    def _refuse_login(self):
+        self.output_batcher.append(
+            "\r\n\x1b[33m[connection closed - this tab was restored from the connection broker without "
+            "credentials, open the session again to log in]\x1b[0m\r\n".encode())
+
+    @property
+    def brokered(self):
+        """Whether the connection broker holds this tab's session."""
+        return isinstance(self.channel, BrokerChannel)
+
+    def detach(self):
+        """
+        Let go of a brokered session without closing it. It keeps running,
+        and buffering its output, in the broker until this or another GUI
+        attaches to it again.
+
+        :return: True if there was a brokered session to leave behind.
+        """
+        if not self.brokered or self.state != "connected":
+            return False
+        self.output_batcher.flush()
+        self._close_session(detach=True)
+        self.state = "detached"
+        self.output_batcher.append(
+            "\r\n\x1b[33m[detached, the broker keeps the session - press Enter to attach]\x1b[0m\r\n".encode())
+        return True
+
+    @pyqtSlot()
+    def attach(self):
+        """Attach again to the brokered session this tab detached from, output since then is replayed."""
+        if self.state != "detached":
+            return
+        self.output_batcher.append(f"\r\n\x1b[33m[attaching to {self.host}]\x1b[0m\r\n".encode())
+        self.start_connect()
+
+    def health(self):
+        """
+        :return: dict with the session's health state and keepalive RTTs.
+        """
+        if self.health_token is None:
+            return {'state': self.state, 'rtt_ms': None, 'srtt_ms': None}
+        return HealthMonitor.instance().health(self.health_token)
+
+    def set_prompt_pattern(self, pattern):
+        """Start (or stop, with None) emitting prompt_detected when the shell prompt is seen."""
+        self.prompt_pattern = pattern
+        if self.output_handler is not None:
+            self.output_handler.set_prompt_pattern(pattern)
+
+    def start_recording(self, path=None):
+        """
+        Record the session as asciicast v2, see recorder.py.
+
+        :param path: .cast file to write, a timestamped file under ./recordings by default.
+        :return: the path actually used.
+        """
+        if self.recorder is not None:
+            return self.recorder.path
+        cols, rows = self._pty_size or (80, 24)
+        self.recorder = SessionRecorder(path or recording_path(self.host), width=cols, height=rows,
+                                        title=f"{self.username}@{self.host}")
+        if self.output_handler is not None:
+            self.output_handler.recorder = self.recorder
+        return self.recorder.path
+
+    def stop_recording(self):
+        recorder, self.recorder = self.recorder, None
+        if self.output_handler is not None:
+            self.output_handler.recorder = None
+        if recorder is not None:
+            recorder.close()
+
+    def _resume_reading(self):
+        if self.reader_handle is not None:
+            ChannelReactor.instance().resume(self.reader_handle)
+
+    @pyqtSlot(int)
+    def ack_output(self, nbytes):
+        """Called by the page once xterm.js has processed a batch of output."""
+        if self.flow is not None:
+            self.flow.ack(nbytes)
+        self.latency.rendered(nbytes)
+
+    @pyqtSlot(int, int, result=str)
+    def history_page(self, before, count):
+        """
+        Older output for the page's history pane, as JSON with the first line
+        number returned, the oldest line still stored and the lines as text.
+
+        :param before: line number to page back from, negative counts back from the newest line.
+        """
+        if self.scrollback is None:
+            return json.dumps({'start': 0, 'first': 0, 'lines': []})
+        start, lines = self.scrollback.page_before(before, count)
+        return json.dumps({'start': start, 'first': self.scrollback.first_line,
+                           'lines': [plain_text(line) for line in lines]})
+
+    @pyqtProperty(str, constant=True)
+    def output_mode(self):
+        """The output transport, so the page only subscribes to signals in 'webchannel' mode."""
+        return self.output_transport
+
+    @pyqtSlot()
+    def set_frontend_ready(self):
+        """Called by the page once it is subscribed to output_b64."""
+        self.frontend_ready = True
+        for data in self._held_output:
+            self.output_b64.emit(base64.b64encode(data).decode('ascii'))
+            self.latency.emitted(len(data), acked=True)
+        self._held_output = []
+
+    @pyqtSlot(bytes)
+    def emit_output(self, data):
+        """Push a batch of raw output to the frontend using the configured transport."""
+        if self.output_transport == "webchannel":
+            if not self.frontend_ready:
+                # Nothing is listening yet, hold it until the page subscribes
+                self._held_output.append(data)
+                return
+            self.output_b64.emit(base64.b64encode(data).decode('ascii'))
+            self.latency.emitted(len(data), acked=True)
+        else:
+            text = self._text_decoder.decode(data)
+            if text:
+                self.send_output.emit(text)
+            self.latency.emitted(len(data))
+
+    @pyqtSlot(str)
+    def emit_snapshot(self, screen):
+        """Redraw the whole screen while the tab is in firehose mode."""
+        # Anything still batched belongs before the redraw
+        self.output_batcher.flush()
+        if self.output_transport == "webchannel":
+            if self.frontend_ready:
+                self.screen_snapshot.emit(screen)
+        else:
+            self.send_output.emit(screen)
+
+    def set_latency_overlay(self, enabled):
+        """Start or stop pushing latency_stats to the page once a second."""
+        if enabled:
+            self.emit_latency_stats()
+            self._latency_timer.start()
+        else:
+            self._latency_timer.stop()
+            self.latency_stats.emit("")
+
+    @property
+    def latency_overlay(self):
+        return self._latency_timer.isActive()
+
+    @pyqtSlot()
+    def emit_latency_stats(self):
+        self.latency_stats.emit(json.dumps(self.latency.stats()))
 
     def notify(self, message, info):
         msg = QMessageBox()
@@ -90,29 +435,103 @@ class Backend(QObject):
 
     @pyqtSlot(str)
     def write_data(self, data):
+        if self.state in ("disconnected", "failed", "detached") and data == "\r":
+            self.reconnect()
+            return
+        if self.state != "connected":
+            # Keystrokes typed before the shell is up (or after it failed) are dropped
+            return
 
-        if self.channel and self.channel.send_ready():
-            try:
-                self.channel.send(data)
-            except paramiko.SSHException as e:
-                print(f"Error while writing to channel: {e}")
-            except Exception as e:
-                print(f"Channel error {e}")
-                self.notify("Closed", "Connection is closed.")
-
-                pass
-        else:
+        if not self.channel:
             print("Error: Channel is not ready or doesn't exist")
             self.notify("Error", "Channel is not ready or doesn't exist")
+            return
+
+        if self.recorder is not None:
+            self.recorder.input(data)
+        self.latency.input(data)
+        if self.health_token is not None:
+            HealthMonitor.instance().input(self.health_token)
+        if self.paste is not None:
+            if data != "\x03":
+                self.paste.extend(data)
+                return
+            # Ctrl-C stops the paste and goes out straight away
+            self.cancel_paste()
+        elif is_paste(data) or not self.channel.send_ready():
+            # Queue it rather than block the GUI or drop it
+            self.start_paste(data)
+            return
+        try:
+            self.channel.send(data)
+            self.latency.sent()
+        except paramiko.SSHException as e:
+            print(f"Error while writing to channel: {e}")
+        except Exception as e:
+            print(f"Channel error {e}")
+            self.notify("Closed", "Connection is closed.")
+
+    def start_paste(self, data, mode=None):
+        """Send data through a PasteWorker, paced by the paste mode."""
+        if self.paste is not None:
+            self.paste.extend(data)
+            return
+        mode = mode or self.paste_mode
+        if not is_paste(data):
+            # Just waiting for window space, nothing to pace
+            mode = "window"
+        self.paste = PasteWorker(self.channel, data, mode=mode, prompt_pattern=self.prompt_pattern)
+        self.paste.progress.connect(self._on_paste_progress)
+        self.paste.finished_paste.connect(self._on_paste_finished)
+        if self.output_handler is not None:
+            self.output_handler.paste = self.paste
+        self.paste.start()
+
+    @pyqtSlot()
+    def cancel_paste(self):
+        if self.paste is not None:
+            self.paste.cancel()
+
+    def _on_paste_progress(self, sent, total):
+        # Keystrokes held back for a full window aren't worth a progress bar
+        if total > 1:
+            self.paste_progress.emit(sent, total)
+
+    def _on_paste_finished(self, status):
+        worker, self.paste = self.paste, None
+        if self.output_handler is not None:
+            self.output_handler.paste = None
+        if worker is None:
+            return
+        # Hold on to it until its thread has wound down
+        self._last_paste = worker
+        stats = worker.stats()
+        if stats['total_lines'] > 1:
+            print(f"Paste {status}: {stats['lines_sent']}/{stats['total_lines']} lines, "
+                  f"{stats['bytes_sent']} bytes in {stats['elapsed']:.1f}s ({stats['mode']})")
+        self.paste_finished.emit(status)
+        pending = worker.take_pending()
+        if pending and status == "done":
+            # Typed between the worker's last check and now, already recorded
+            self.start_paste(pending)
 
     @pyqtSlot(str)
     def set_pty_size(self, data):
+        try:
+            cols = data.split("::")[0]
+            cols = int(cols.split(":")[1])
+            rows = data.split("::")[1]
+            rows = int(rows.split(":")[1])
+            self._pty_size = (cols, rows)
+            if self.firehose is not None:
+                self.firehose.resize(cols, rows)
+            if self.recorder is not None:
+                self.recorder.resize(cols, rows)
+        except (IndexError, ValueError):
+            print(f"Bad pty size from frontend: {data}")
+            return
         if self.channel and self.channel.send_ready():
             try:
-                cols = data.split("::")[0]
-                cols = int(cols.split(":")[1])
-                rows = data.split("::")[1]
-                rows = int(rows.split(":")[1])
                 self.channel.resize_pty(width=cols, height=rows)
                 print(f"backend pty resize -> cols:{cols} rows:{rows}")
             except paramiko.SSHException as e:
@@ -120,14 +539,62 @@ class Backend(QObject):
         else:
             print("Error: Channel is not ready or doesn't exist")
 
-    def __del__(self):
+    def disconnect(self):
+        """Stop reading and close the channel and client."""
+        self.state = "closed"
+        if self.firehose is not None:
+            self.firehose.stop()
+        self.stop_recording()
+        self._latency_timer.stop()
+        if self.connect_worker is not None:
+            self.connect_worker.cancel()
+        self._close_session()
+
+    def _close_session(self, detach=False):
+        """
+        Tear down the shell, keeping what belongs to the tab (batcher, history,
+        recording) for a reconnect.
+
+        :param detach: leave a brokered session running in the broker.
+        """
+        if self.paste is not None:
+            self.paste.cancel()
+            self.paste.wait(1000)
+        if self.health_token is not None:
+            HealthMonitor.instance().unwatch(self.health_token)
+            self.health_token = None
         try:
-            if self.reader_thread and self.reader_thread.isRunning():
-                self.reader_thread.terminate()
+            if self.reader_handle is not None:
+                ChannelReactor.instance().unregister(self.reader_handle)
+                self.reader_handle = None
         except:
             pass
+        if self.output_handler is not None:
+            self.output_handler.close()
+            self.output_handler = None
         if self.channel:
-            self.channel.close()
+            if detach:
+                self.channel.detach()
+                # Attaching again picks up where the terminal left off
+                self._broker_offset = self.channel.offset
+            else:
+                self.channel.close()
+            self.channel = None
 
         if self.client:
-            self.client.close()
+            self.release_client(self.client)
+            self.client = None
+
+    def release_client(self, client):
+        """Drop our reference on a shared transport, or close a private one."""
+        if self.transport_entry is not None:
+            TransportRegistry.instance().release(self.transport_entry)
+            self.transport_entry = None
+        else:
+            client.close()
+
+    def __del__(self):
+        try:
+            self.disconnect()
+        except:
+            pass
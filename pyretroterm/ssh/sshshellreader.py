@@ -1,35 +1,99 @@
 from PyQt6.QtCore import pyqtSignal, QThread
-import os
 
-class ShellReaderThread(QThread):
-    data_ready = pyqtSignal(str)
+from .stream_decoder import StreamDecoder, DEFAULT_ERRORS
+from .session_logger import SessionLogWriter
+from .prompt_matcher import PromptMatcher
 
-    def __init__(self, channel, buffer, parent_widget):
-        super().__init__()
-        self.channel = channel
+
+class ShellOutputHandler:
+    """
+    Per-session processing applied to every chunk read from a shell channel:
+    decoding, session logging, capturing the initial banner and optionally
+    spotting the shell prompt.
+    """
+
+    def __init__(self, buffer, parent_widget, decode_errors=DEFAULT_ERRORS, prompt_pattern=None, on_prompt=None):
+        """
+        :param prompt_pattern: regex for the shell prompt, None to skip prompt detection.
+        :param on_prompt: called with the matched prompt text, from the reader thread.
+        """
         self.intial_buffer = buffer
         self.parent_widget = parent_widget
+        self.decoder = StreamDecoder(errors=decode_errors)
         if parent_widget.log_filename is not None:
             self.log_filename = parent_widget.log_filename
         else:
             self.log_filename = "../logs/session.log"
 
-        # Ensure log directory exists
-        os.makedirs(os.path.dirname(self.log_filename), exist_ok=True)
+        # All file I/O happens on the shared log writer thread
+        self.session_log = SessionLogWriter.instance().open(self.log_filename)
+        self.log_filename = self.session_log.path
+
+        # Optional SessionRecorder, set while the session is being recorded
+        self.recorder = None
+        # Optional EchoTracker, told when output arrives to time keystroke echoes
+        self.latency = None
+        # Optional PasteWorker, fed the output while a paste is being sent
+        self.paste = None
+
+        self.on_prompt = on_prompt
+        self.prompt_matcher = None
+        if prompt_pattern:
+            self.set_prompt_pattern(prompt_pattern)
+
+    def set_prompt_pattern(self, pattern):
+        self.prompt_matcher = PromptMatcher(pattern, count=None, collect=False) if pattern else None
 
     def log_data(self, data):
-        # Make sure that a log filename was provided
-        if self.log_filename is not None:
-            try:
-                # Attempt to encode and decode the data as UTF-8 to ensure it's valid
-                data = data.encode('utf-8', 'ignore').decode('utf-8', 'ignore')
-                data = data.replace('\r\n', '\n').replace('\r', '\n')
-                with open(self.log_filename, 'a', encoding='utf-8') as log_file: # 'a' option will append data to the end of the file
-                    # log_file.write(data + os.linesep)
-                    log_file.write(data)
-            except UnicodeError:
-                print("Failed to encode data as UTF-8.")
+        self.session_log.write(data)
+
+    def close(self):
+        """Flush and close the session log."""
+        self.session_log.close()
+
+    def process(self, data):
+        """
+        Log a raw chunk read from the channel.
+
+        :param data: bytes received from the channel.
+        :return: the raw bytes to forward to the terminal, which decodes them itself.
+        """
+        latency = self.latency
+        if latency is not None:
+            latency.received(len(data))
+        data_decoded = self.decoder.decode(data)
+        if data_decoded:
+            # Log data that is being received
+            self.log_data(data_decoded)
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.output(data_decoded)
+            paste = self.paste
+            if paste is not None:
+                paste.received(data_decoded)
 
+            # for debugging
+            if self.intial_buffer == "":
+                self.intial_buffer = data_decoded
+                self.parent_widget.initial_buffer = data_decoded
+
+            matcher = self.prompt_matcher
+            if matcher is not None and matcher.feed(data_decoded) and self.on_prompt is not None:
+                self.on_prompt(matcher.last_match)
+        return data
+
+
+class ShellReaderThread(QThread):
+    """Dedicated blocking reader for a single channel (see ChannelReactor for the shared reader)."""
+    data_ready = pyqtSignal(bytes)
+
+    def __init__(self, channel, buffer, parent_widget, decode_errors=DEFAULT_ERRORS):
+        super().__init__()
+        self.channel = channel
+        self.output_handler = ShellOutputHandler(buffer, parent_widget, decode_errors=decode_errors)
+
+    def log_data(self, data):
+        self.output_handler.log_data(data)
 
     def run(self):
         while True:
@@ -38,20 +102,12 @@ class ShellReaderThread(QThread):
                     data = self.channel.recv(1024)
 
                     if data:
-                        data_decoded = data.decode()
-                        # Log data that is being received
-                        self.log_data(data_decoded)
-
-                        # for debugging
-                        if self.intial_buffer == "":
-                            self.intial_buffer = bytes(data).decode('utf-8')
-                            self.parent_widget.initial_buffer = bytes(data).decode('utf-8')
-
-                        self.data_ready.emit(data_decoded)
+                        self.data_ready.emit(self.output_handler.process(data))
                 except Exception as e:
                     print(f"Error while reading from channel: {e}")
                     self.log_data(f"Error while reading from channel: {e}")
             else:
                 print("Channel closed...")
                 self.log_data("Channel closed...")
+                self.output_handler.close()
                 break
@@ -0,0 +1,40 @@
+import codecs
+
+# Error policy used when callers don't pick one. 'replace' keeps the stream
+# flowing with U+FFFD for genuinely invalid bytes; 'strict' raises instead.
+DEFAULT_ERRORS = "replace"
+
+
+class StreamDecoder:
+    """
+    Incremental decoder for SSH output.
+
+    Multibyte sequences split across reads are carried over to the next call
+    instead of raising, so callers can feed raw ``recv()`` chunks directly.
+    """
+
+    def __init__(self, encoding="utf-8", errors=DEFAULT_ERRORS):
+        self.encoding = encoding
+        self.errors = errors
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+
+    def decode(self, data, final=False):
+        """
+        Decode the next chunk of the stream.
+
+        :param data: bytes read from the channel.
+        :param final: True on the last chunk, flushes any incomplete sequence.
+        :return: all text that is complete so far.
+        """
+        return self._decoder.decode(data, final)
+
+    def flush(self):
+        """Return whatever is still buffered, decoded with the error policy."""
+        return self._decoder.decode(b"", True)
+
+    def pending(self):
+        """Number of bytes held back waiting for the rest of a sequence."""
+        return len(self._decoder.getstate()[0])
+
+    def reset(self):
+        self._decoder.reset()
@@ -0,0 +1,152 @@
+import re
+
+from paramiko.common import DEFAULT_WINDOW_SIZE, DEFAULT_MAX_PACKET_SIZE
+
+# Transport tuning for a session, from the sessions YAML. A folder or a
+# session can name a preset and/or override single fields, the session wins:
+#
+#   - folder_name: APAC
+#     transport_profile: long-haul
+#     sessions:
+#     - host: syd-core-1
+#       transport:
+#         compression: true
+#
+# Sizes are bytes, optionally with a K/M/G suffix.
+
+# paramiko's own defaults
+DEFAULTS = {
+    'window_size': DEFAULT_WINDOW_SIZE,
+    'max_packet_size': DEFAULT_MAX_PACKET_SIZE,
+    'compression': False,
+    'rekey_bytes': 2 ** 29,
+    'rekey_packets': 2 ** 29,
+}
+
+# The window caps throughput at window / RTT: 2 MB over 150 ms is ~13 MB/s
+# whatever the link can do, so long links need a bigger one.
+#
+# It is also how far the device can run ahead of a paused tab. FlowControl
+# stops reading a channel once its high watermark (2 MB) is queued for the
+# terminal, but paramiko has already granted the device the whole window and
+# only grants more as recv() is called, so up to window_size more bytes can
+# land in the channel's buffer before the device stalls. Per paused tab that
+# is ~6 MB for 'lan', ~18 MB for 'wan' and ~66 MB for 'long-haul'. The memory
+# is the price of long-haul throughput, keep the big presets for the links
+# that need them rather than a folder of hundreds of LAN devices.
+PRESETS = {
+    'default': {},
+    'lan': {'window_size': 4 * 1024 * 1024},
+    'wan': {'window_size': 16 * 1024 * 1024},
+    'long-haul': {'window_size': 64 * 1024 * 1024, 'rekey_bytes': 2 ** 32},
+    'low-bandwidth': {'compression': True},
+}
+
+SIZE_RE = re.compile(r"^\s*(\d+)\s*([kmg]?)i?b?\s*$", re.IGNORECASE)
+SIZE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+def parse_size(value):
+    """Byte count from an int or a string like '16M'."""
+    if isinstance(value, bool):
+        raise ValueError(f"Not a size: {value!r}")
+    if isinstance(value, int):
+        return value
+    m = SIZE_RE.match(str(value))
+    if not m:
+        raise ValueError(f"Not a size: {value!r}")
+    return int(m.group(1)) * SIZE_UNITS[m.group(2).lower()]
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).strip().lower() in ("1", "true", "yes", "on"):
+        return True
+    if str(value).strip().lower() in ("0", "false", "no", "off", ""):
+        return False
+    raise ValueError(f"Not a boolean: {value!r}")
+
+
+class TransportProfile:
+    """
+    Window size, max packet size, compression and rekey limits for one
+    session's SSH transport and channel.
+    """
+
+    def __init__(self, name="default", **settings):
+        unknown = set(settings) - set(DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown transport settings: {', '.join(sorted(unknown))}")
+        self.name = name
+        values = dict(DEFAULTS)
+        values.update(settings)
+        self.window_size = parse_size(values['window_size'])
+        self.max_packet_size = parse_size(values['max_packet_size'])
+        self.compression = parse_bool(values['compression'])
+        self.rekey_bytes = parse_size(values['rekey_bytes'])
+        self.rekey_packets = parse_size(values['rekey_packets'])
+
+    @classmethod
+    def from_config(cls, *entries):
+        """
+        Resolve the profile for a session from its YAML entries, outermost
+        first (folder, then session). Each may have ``transport_profile`` (a
+        preset name) and ``transport`` (fields to override).
+        """
+        name = "default"
+        settings = {}
+        for entry in entries:
+            if not entry:
+                continue
+            if entry.get('transport_profile'):
+                name = entry['transport_profile']
+                if name not in PRESETS:
+                    raise ValueError(f"Unknown transport profile: {name} (known: {', '.join(PRESETS)})")
+                settings = dict(PRESETS[name])
+            overrides = entry.get('transport') or {}
+            if not isinstance(overrides, dict):
+                raise ValueError(f"'transport' must be a mapping, got {overrides!r}")
+            settings.update(overrides)
+        return cls(name, **settings)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict, None gives the default profile."""
+        if not data:
+            return cls()
+        data = dict(data)
+        return cls(data.pop('name', 'custom'), **data)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'window_size': self.window_size,
+            'max_packet_size': self.max_packet_size,
+            'compression': self.compression,
+            'rekey_bytes': self.rekey_bytes,
+            'rekey_packets': self.rekey_packets,
+        }
+
+    def transport_key(self):
+        """
+        The settings fixed for the life of a transport. Sessions only share a
+        transport when these match, see TransportRegistry.
+        """
+        return (self.compression, self.rekey_bytes, self.rekey_packets)
+
+    def apply(self, transport):
+        """Configure a transport before its key exchange starts."""
+        transport.default_window_size = self.window_size
+        transport.default_max_packet_size = self.max_packet_size
+        transport.use_compression(self.compression)
+        transport.packetizer.REKEY_BYTES = self.rekey_bytes
+        transport.packetizer.REKEY_PACKETS = self.rekey_packets
+
+    def channel_kwargs(self):
+        """Window arguments for Transport.open_session."""
+        return {'window_size': self.window_size, 'max_packet_size': self.max_packet_size}
+
+    def __repr__(self):
+        return (f"TransportProfile({self.name!r}, window={self.window_size}, max_packet={self.max_packet_size}, "
+                f"compression={self.compression})")
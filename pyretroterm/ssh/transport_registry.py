@@ -0,0 +1,172 @@
+import hashlib
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds an authenticated transport is kept around after its last channel closes
+DEFAULT_IDLE_TIMEOUT = 300
+
+
+def transport_key(host, port, username, password=None, key_path=None, options=None):
+    """
+    Registry key for an authenticated transport. Credentials are hashed so the
+    key can be logged without leaking them.
+
+    :param options: transport settings that must match for sessions to share
+                    it, e.g. TransportProfile.transport_key().
+    :return: tuple of (host, port, username, credential hash)
+    """
+    credential = f"{key_path or ''}\x00{password or ''}\x00{options if options is not None else ''}".encode('utf-8')
+    digest = hashlib.sha256(credential).hexdigest()[:16]
+    return (str(host).strip().lower(), int(port), str(username).strip(), digest)
+
+
+class _Entry:
+    """
+    A pooled transport, and the handle its holders give back to release it,
+    so a late release can't touch a transport that replaced it.
+    """
+
+    def __init__(self, key, client):
+        self.key = key
+        self.client = client
+        self.refcount = 0
+        self.idle_since = None
+        self.idle_timer = None
+
+
+class TransportRegistry:
+    """
+    Keeps authenticated paramiko clients keyed by (host, port, user, credential)
+    so additional shells to the same target open a channel on the existing
+    transport instead of repeating TCP, key exchange and authentication.
+
+    Every channel holds a reference, given back by passing the handle
+    ``acquire`` or ``add`` returned to ``release``. When the last one is
+    released the transport stays up for ``idle_timeout`` seconds before it
+    is closed.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._entries = {}
+        self._connect_locks = {}
+        self._lock = threading.Lock()
+
+    def connect_lock(self, key):
+        """
+        Lock held by a connect worker while it authenticates ``key``, so tabs
+        opened together share one login instead of racing to create several.
+        """
+        with self._lock:
+            return self._connect_locks.setdefault(key, threading.Lock())
+
+    def acquire(self, key):
+        """
+        Take a reference on a live transport.
+
+        :return: handle of the pooled transport, whose ``client`` is the
+                 SSHClient, or None if there is no usable transport.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            transport = entry.client.get_transport()
+            if transport is None or not transport.is_active():
+                self._drop(key, entry)
+                return None
+            self._cancel_idle(entry)
+            entry.refcount += 1
+            return entry
+
+    def add(self, key, client):
+        """
+        Register a freshly authenticated client holding one reference.
+
+        :return: handle to release the reference with.
+        """
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None and old.client is not client:
+                # Only reached when the old transport died, never share two
+                self._drop(key, old)
+            entry = self._entries.setdefault(key, _Entry(key, client))
+            self._cancel_idle(entry)
+            entry.refcount += 1
+            return entry
+
+    def release(self, entry):
+        """
+        Drop a reference, starting the idle countdown when it was the last.
+
+        :param entry: handle from ``acquire`` or ``add``. Once its transport
+                      has been discarded this does nothing.
+        """
+        with self._lock:
+            key = entry.key
+            if self._entries.get(key) is not entry:
+                return
+            entry.refcount = max(0, entry.refcount - 1)
+            if entry.refcount == 0:
+                entry.idle_since = time.monotonic()
+                entry.idle_timer = threading.Timer(self.idle_timeout, self._expire, args=(key, entry))
+                entry.idle_timer.daemon = True
+                entry.idle_timer.start()
+
+    def discard(self, entry):
+        """Forget and close the transport behind a handle, unless it is already gone."""
+        with self._lock:
+            if self._entries.get(entry.key) is entry:
+                self._drop(entry.key, entry)
+
+    def stats(self):
+        """
+        :return: list of dicts describing every pooled transport.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'host': key[0],
+                'port': key[1],
+                'username': key[2],
+                'channels': entry.refcount,
+                'idle_s': (now - entry.idle_since) if entry.idle_since is not None else 0.0,
+            } for key, entry in self._entries.items()]
+
+    def close_all(self):
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                self._drop(key, entry)
+
+    def _expire(self, key, entry):
+        with self._lock:
+            if self._entries.get(key) is entry and entry.refcount == 0:
+                logger.info(f"Closing idle transport to {key[0]}:{key[1]} as {key[2]}")
+                self._drop(key, entry)
+
+    def _cancel_idle(self, entry):
+        if entry.idle_timer is not None:
+            entry.idle_timer.cancel()
+            entry.idle_timer = None
+        entry.idle_since = None
+
+    def _drop(self, key, entry):
+        self._cancel_idle(entry)
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        try:
+            entry.client.close()
+        except Exception:
+            pass
@@ -0,0 +1,52 @@
+import struct
+import uuid
+
+# Binary websocket framing for the web terminal. Every frame is a fixed 18
+# byte header followed by the raw payload:
+#
+#     offset  size  field
+#     0       1     version (FRAME_VERSION)
+#     1       1     message type (MSG_*)
+#     2       16    tab id, the tab's UUID in binary form
+#
+# The browser asks for it with framing: "binary" in its connect message.
+# Servers that don't know about it keep sending JSON, which the client
+# still understands.
+FRAME_VERSION = 1
+
+MSG_OUTPUT = 1
+MSG_ERROR = 2
+
+FRAMING_MODES = ("json", "binary")
+
+HEADER = struct.Struct("!BB16s")
+
+
+def tab_id_bytes(tab_id):
+    """
+    :raises ValueError: if tab_id is not a UUID.
+    """
+    return uuid.UUID(str(tab_id)).bytes
+
+
+def encode_frame(msg_type, tab_id, payload):
+    """
+    :param tab_id: tab UUID as a string, or the 16 bytes from tab_id_bytes().
+    :param payload: raw bytes.
+    """
+    if isinstance(tab_id, str):
+        tab_id = tab_id_bytes(tab_id)
+    return HEADER.pack(FRAME_VERSION, msg_type, tab_id) + payload
+
+
+def decode_frame(data):
+    """
+    :return: (msg_type, tab_id, payload) with tab_id as a UUID string.
+    :raises ValueError: on a short frame or unknown version.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError(f"Frame too short: {len(data)} bytes")
+    version, msg_type, raw_id = HEADER.unpack_from(data)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported frame version: {version}")
+    return msg_type, str(uuid.UUID(bytes=raw_id)), bytes(data[HEADER.size:])
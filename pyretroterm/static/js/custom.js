@@ -43,7 +43,11 @@ socket.addEventListener('message', function(event) {
   const message = JSON.parse(event.data);
 
   if(message.type === 'ssh_output') {  // This should match the backend's output message type
-  let decodedData = atob(message.data);
+  const binary = atob(message.data);
+  const decodedData = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    decodedData[i] = binary.charCodeAt(i);
+  }
         term.write(decodedData);
 
   }
@@ -425,11 +425,82 @@ function initializeTerminal(terminalContainerId, tabUUID, dump) {
   observer.observe(terminalContainer);
 }
 
+// Decode base64 SSH output into bytes so xterm.js handles the UTF-8 itself
+function base64ToBytes(b64) {
+  const binary = atob(b64);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes;
+}
+
+// Binary terminal frames: version, message type, 16 byte tab UUID, raw payload.
+// Must match pyretroterm/ssh/ws_frames.py
+const FRAME_VERSION = 1;
+const FRAME_HEADER_SIZE = 18;
+const MSG_OUTPUT = 1;
+const MSG_ERROR = 2;
+
+function uuidToBytes(uuid) {
+  const hex = uuid.replace(/-/g, "");
+  const bytes = new Uint8Array(16);
+  for (let i = 0; i < 16; i++) {
+    bytes[i] = parseInt(hex.substr(i * 2, 2), 16);
+  }
+  return bytes;
+}
+
+// Returns { type, payload } for a frame addressed to this tab, otherwise null
+function decodeFrame(buffer, tabIdBytes) {
+  if (buffer.byteLength < FRAME_HEADER_SIZE) return null;
+  const header = new Uint8Array(buffer, 0, FRAME_HEADER_SIZE);
+  if (header[0] !== FRAME_VERSION) {
+    console.error("Unsupported frame version:", header[0]);
+    return null;
+  }
+  for (let i = 0; i < 16; i++) {
+    if (header[2 + i] !== tabIdBytes[i]) return null;
+  }
+  return { type: header[1], payload: new Uint8Array(buffer, FRAME_HEADER_SIZE) };
+}
+
+// Flow control: acknowledge output once xterm.js has parsed it, so the server
+// can stop reading the SSH channel while this tab is behind. Small acks are
+// gathered up to avoid a message per keystroke echo.
+const ACK_BATCH_BYTES = 32 * 1024;
+const ACK_DELAY_MS = 50;
+const pendingAcks = {};
+
+function ackOutput(tabUUID, nbytes) {
+  const pending = pendingAcks[tabUUID] || (pendingAcks[tabUUID] = { bytes: 0, timer: null });
+  pending.bytes += nbytes;
+  if (pending.bytes >= ACK_BATCH_BYTES) {
+    flushAck(tabUUID);
+  } else if (!pending.timer) {
+    pending.timer = setTimeout(() => flushAck(tabUUID), ACK_DELAY_MS);
+  }
+}
+
+function flushAck(tabUUID) {
+  const pending = pendingAcks[tabUUID];
+  if (!pending) return;
+  clearTimeout(pending.timer);
+  pending.timer = null;
+  const socket = window.webSockets[tabUUID];
+  if (pending.bytes > 0 && socket && socket.readyState === WebSocket.OPEN) {
+    socket.send(JSON.stringify({ type: "ack", bytes: pending.bytes }));
+  }
+  pending.bytes = 0;
+}
+
 function setupWebSocketForTab(tabUUID, host, port, username, password) {
   console.log("Setting up websocket for tab...");
   const socket = new WebSocket(
     `ws://${window.location.hostname}:${window.location.port}/ws/terminal/${tabUUID}`
   );
+  // Binary frames arrive as ArrayBuffers, JSON messages are still strings
+  socket.binaryType = "arraybuffer";
   console.log(
     "socket info:\n" + tabUUID + "\n",
     host + "\n",
@@ -448,6 +519,8 @@ function setupWebSocketForTab(tabUUID, host, port, username, password) {
         port: port,
         username: username,
         password: password,
+        framing: "binary",
+        flow_control: true,
       })
     );
   };
@@ -457,6 +530,7 @@ function setupWebSocketForTab(tabUUID, host, port, username, password) {
 }
 
 function setupWebSocketListeners(socket, tabUUID) {
+  const tabIdBytes = uuidToBytes(tabUUID);
   socket.addEventListener("message", function (event) {
     try {
       let terminal = terminalInstances[tabUUID];
@@ -464,9 +538,32 @@ function setupWebSocketListeners(socket, tabUUID) {
         console.error("Terminal instance not found for UUID:", tabUUID);
         return;
       }
+      if (event.data instanceof ArrayBuffer) {
+        const frame = decodeFrame(event.data, tabIdBytes);
+        if (frame && (frame.type === MSG_OUTPUT || frame.type === MSG_ERROR)) {
+          const nbytes = frame.payload.length;
+          terminal.write(frame.payload, () => ackOutput(tabUUID, nbytes));
+        }
+        return;
+      }
       const message = JSON.parse(event.data);
-      if (message.type === "ssh_output" && message.tabId === tabUUID) {
-        terminal.write(atob(message.data));
+      if (message.type === "framing" && message.tabId === tabUUID) {
+        // Servers without binary support never send this and stay on JSON
+        console.log("Terminal framing for", tabUUID, ":", message.mode);
+      } else if (message.type === "ssh_output" && message.tabId === tabUUID) {
+        if (message.bytes !== undefined) {
+          terminal.write(base64ToBytes(message.data), () => ackOutput(tabUUID, message.bytes));
+        } else {
+          terminal.write(base64ToBytes(message.data));
+        }
+      } else if (message.type === "health" && message.tabId === tabUUID) {
+        // Keepalives stopped (or started again) getting answers
+        const notices = {
+          stale: "\x1b[33m[connection not responding]\x1b[0m",
+          dead: "\x1b[31m[connection lost]\x1b[0m",
+          ok: "\x1b[32m[connection restored]\x1b[0m",
+        };
+        terminal.write("\r\n" + notices[message.state] + "\r\n");
       }
     } catch (e) {
       console.error("Error in WebSocket message event: ", e);
@@ -0,0 +1,27 @@
+// Replay of an asciicast recording. The player object in Python does the
+// timing; the page only resets, resizes and writes what it is given.
+var term = new Terminal({
+    scrollback: 1000,
+    fontSize: 14,
+    fontFamily: 'monospace',
+    theme: {
+        background: '#141414',
+        foreground: '#ffffff'
+    }
+});
+term.open(document.getElementById('terminal'));
+
+new QWebChannel(qt.webChannelTransport, function(channel) {
+    const player = channel.objects.player;
+    player.output.connect(function(data) {
+        term.write(data);
+    });
+    player.reset.connect(function(cols, rows) {
+        term.reset();
+        term.resize(cols, rows);
+    });
+    player.resized.connect(function(cols, rows) {
+        term.resize(cols, rows);
+    });
+    player.set_page_ready();
+});
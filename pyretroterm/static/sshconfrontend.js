@@ -41,11 +41,268 @@ term.onData(e => {
     backend.write_data(e);
 });
 
-// Function to handle incoming data from the backend
+// Function to handle incoming data from the backend (legacy runJavaScript path)
 window.handle_output = function(data) {
     term.write(data);
 };
 
+// Decode a base64 batch pushed over the web channel into raw bytes.
+// xterm.js does its own streaming UTF-8 decode on Uint8Array writes.
+function base64ToBytes(b64) {
+    const binary = atob(b64);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return bytes;
+}
+
+window.handle_output_b64 = function(b64) {
+    const bytes = base64ToBytes(b64);
+    // Tell the backend once xterm.js has parsed it, it stops reading the
+    // channel while too much output is unacknowledged
+    term.write(bytes, function() {
+        if (backend.ack_output) {
+            backend.ack_output(bytes.length);
+        }
+    });
+};
+
+// Full screen redraw sent instead of the stream while output is too fast
+// to render. Not acknowledged, the backend never counted it.
+window.handle_snapshot = function(screen) {
+    term.write(screen);
+};
+
+// Small badge in the corner while the tab is in firehose mode
+window.handle_firehose = function(active, rateMb) {
+    let badge = document.getElementById('firehose-indicator');
+    if (!badge) {
+        badge = document.createElement('div');
+        badge.id = 'firehose-indicator';
+        badge.style.cssText = 'position:fixed;top:4px;right:16px;z-index:10;padding:2px 8px;' +
+            'font:12px monospace;color:#000;background:#ffb000;opacity:0.85;border-radius:3px;display:none;';
+        document.body.appendChild(badge);
+    }
+    if (active) {
+        badge.textContent = 'firehose ' + rateMb.toFixed(1) + ' MB/s - live view paused, log is complete';
+        badge.style.display = 'block';
+    } else {
+        badge.style.display = 'none';
+    }
+};
+
+// Latency overlay: keystroke echo percentiles, split into network and app
+// time, plus keepalive RTT and bytes in/out. An empty string hides it.
+function formatLatency(h) {
+    if (!h || !h.count) {
+        return '-';
+    }
+    return h.p50_ms.toFixed(1) + '/' + h.p99_ms.toFixed(1) + ' ms';
+}
+
+function formatBytes(n) {
+    if (n >= 1024 * 1024) {
+        return (n / (1024 * 1024)).toFixed(1) + ' MB';
+    }
+    return (n / 1024).toFixed(1) + ' KB';
+}
+
+window.handle_latency = function(statsJson) {
+    let overlay = document.getElementById('latency-overlay');
+    if (!overlay) {
+        overlay = document.createElement('div');
+        overlay.id = 'latency-overlay';
+        overlay.style.cssText = 'position:fixed;bottom:4px;right:16px;z-index:10;padding:2px 8px;' +
+            'font:12px monospace;color:#0f0;background:#000;opacity:0.8;border:1px solid #0f0;' +
+            'border-radius:3px;white-space:pre;pointer-events:none;display:none;';
+        document.body.appendChild(overlay);
+    }
+    if (!statsJson) {
+        overlay.style.display = 'none';
+        return;
+    }
+    const stats = JSON.parse(statsJson);
+    const rtt = stats.last_rtt_ms === null ? '-' : stats.last_rtt_ms.toFixed(1) + ' ms';
+    overlay.textContent =
+        'echo p50/p99  ' + formatLatency(stats.echo_total) + ' (' + stats.keystrokes + ' keys)\n' +
+        '  network     ' + formatLatency(stats.echo_network) + '\n' +
+        '  app         ' + formatLatency(stats.echo_app) + '\n' +
+        'keepalive rtt ' + rtt + '\n' +
+        'in ' + formatBytes(stats.bytes_in) + '  out ' + formatBytes(stats.bytes_out);
+    overlay.style.display = 'block';
+};
+
+// Connection health banner: shown while keepalives go unanswered, with the
+// reconnect key. Ctrl+Shift+R reconnects at any time, Enter once the
+// connection is gone.
+window.handle_health = function(state, rttMs) {
+    let banner = document.getElementById('health-banner');
+    if (!banner) {
+        banner = document.createElement('div');
+        banner.id = 'health-banner';
+        banner.style.cssText = 'position:fixed;top:4px;left:50%;transform:translateX(-50%);z-index:11;' +
+            'padding:2px 8px;font:12px monospace;color:#fff;border-radius:3px;display:none;';
+        document.body.appendChild(banner);
+    }
+    if (state === 'stale') {
+        banner.textContent = 'connection not responding - Ctrl+Shift+R to reconnect';
+        banner.style.background = '#b07000';
+        banner.style.display = 'block';
+    } else if (state === 'dead') {
+        banner.textContent = 'connection lost - Enter or Ctrl+Shift+R to reconnect';
+        banner.style.background = '#b00000';
+        banner.style.display = 'block';
+    } else {
+        banner.style.display = 'none';
+    }
+};
+
+// Paste progress bar, shown while a large paste is being sent. Esc cancels.
+let pasteActive = false;
+
+function pasteBar() {
+    let bar = document.getElementById('paste-progress');
+    if (!bar) {
+        bar = document.createElement('div');
+        bar.id = 'paste-progress';
+        bar.style.cssText = 'position:fixed;top:4px;left:16px;z-index:10;padding:2px 8px;' +
+            'font:12px monospace;color:#000;background:#00c0ff;opacity:0.85;border-radius:3px;display:none;';
+        document.body.appendChild(bar);
+    }
+    return bar;
+}
+
+window.handle_paste_progress = function(sent, total) {
+    const bar = pasteBar();
+    pasteActive = true;
+    const percent = total ? Math.floor(sent * 100 / total) : 100;
+    bar.textContent = 'pasting ' + sent + '/' + total + ' lines (' + percent + '%) - Esc to cancel';
+    bar.style.display = 'block';
+};
+
+window.handle_paste_finished = function(status) {
+    const bar = pasteBar();
+    pasteActive = false;
+    if (status === 'done') {
+        bar.style.display = 'none';
+        return;
+    }
+    bar.textContent = 'paste ' + status;
+    setTimeout(() => {
+        if (!pasteActive) {
+            bar.style.display = 'none';
+        }
+    }, 3000);
+};
+
+// History pane: output older than xterm.js' own scrollback, paged in from
+// the backend's scrollback store when scrolling up past the top of the buffer
+const HISTORY_PAGE_LINES = 500;
+let historyPane = null;
+let historyContent = null;
+let historyStart = null;
+let historyFirst = 0;
+let historyLoading = false;
+
+function createHistoryPane() {
+    historyPane = document.createElement('div');
+    historyPane.id = 'history-pane';
+    historyPane.style.cssText = 'position:fixed;top:0;left:0;right:0;height:45%;z-index:9;display:none;' +
+        'overflow-y:auto;background:rgba(20,20,20,0.97);color:#ccc;border-bottom:2px solid #555;' +
+        'font:13px monospace;white-space:pre;padding:0 8px;';
+    const header = document.createElement('div');
+    header.textContent = 'History - scroll up for older output, Esc to close';
+    header.style.cssText = 'position:sticky;top:0;background:#333;color:#fff;padding:2px 4px;cursor:pointer;';
+    header.addEventListener('click', closeHistory);
+    historyContent = document.createElement('div');
+    historyPane.appendChild(header);
+    historyPane.appendChild(historyContent);
+    historyPane.addEventListener('scroll', () => {
+        if (historyPane.scrollTop === 0) {
+            loadHistoryPage();
+        }
+    });
+    document.body.appendChild(historyPane);
+}
+
+function loadHistoryPage() {
+    if (historyLoading || !window.backend || !backend.history_page) {
+        return;
+    }
+    if (historyStart !== null && historyStart <= historyFirst) {
+        return;
+    }
+    historyLoading = true;
+    // The first page ends where xterm.js' buffer starts
+    const before = historyStart === null ? -term.buffer.active.length : historyStart;
+    backend.history_page(before, HISTORY_PAGE_LINES, function(result) {
+        const page = JSON.parse(result);
+        historyLoading = false;
+        historyFirst = page.first;
+        if (page.lines.length === 0) {
+            if (historyStart === null) {
+                historyContent.textContent = 'No older output.';
+            }
+            historyStart = page.first;
+            return;
+        }
+        const block = document.createElement('div');
+        block.textContent = page.lines.join('\n');
+        const oldHeight = historyPane.scrollHeight;
+        historyContent.insertBefore(block, historyContent.firstChild);
+        // Keep the lines the user was looking at in place
+        historyPane.scrollTop += historyPane.scrollHeight - oldHeight;
+        historyStart = page.start;
+    });
+}
+
+function openHistory() {
+    if (!historyPane) {
+        createHistoryPane();
+    }
+    if (historyPane.style.display === 'block') {
+        return;
+    }
+    historyPane.style.display = 'block';
+    loadHistoryPage();
+}
+
+function closeHistory() {
+    if (!historyPane) {
+        return;
+    }
+    historyPane.style.display = 'none';
+    // Reopening starts again from the current top of the buffer
+    historyContent.textContent = '';
+    historyStart = null;
+    term.focus();
+}
+
+// Wheel up with the viewport already at the top of xterm's buffer
+document.getElementById('terminal').addEventListener('wheel', (e) => {
+    if (e.deltaY < 0 && term.buffer.active.viewportY === 0) {
+        openHistory();
+    }
+}, true);
+
+document.addEventListener('keydown', (e) => {
+    if (e.key === 'Escape' && historyPane && historyPane.style.display === 'block') {
+        e.preventDefault();
+        e.stopPropagation();
+        closeHistory();
+    } else if (e.ctrlKey && e.shiftKey && (e.key === 'R' || e.key === 'r') && window.backend && backend.reconnect) {
+        e.preventDefault();
+        e.stopPropagation();
+        window.handle_health('ok', -1);
+        backend.reconnect();
+    } else if (e.key === 'Escape' && pasteActive && window.backend && backend.cancel_paste) {
+        e.preventDefault();
+        e.stopPropagation();
+        backend.cancel_paste();
+    }
+}, true);
+
 // Initialize terminal themes
 const terminal_themes = {
     "Cyberpunk": {
@@ -121,6 +378,26 @@ window.changeTheme = function(themeName) {
 // Establish a connection with the Qt backend
 new QWebChannel(qt.webChannelTransport, function(channel) {
     window.backend = channel.objects.backend;
+    // In 'javascript' mode the widget calls the handlers itself
+    if (backend.output_mode === 'webchannel') {
+        backend.output_b64.connect(window.handle_output_b64);
+        if (backend.screen_snapshot) {
+            backend.screen_snapshot.connect(window.handle_snapshot);
+            backend.firehose_changed.connect(window.handle_firehose);
+        }
+        if (backend.latency_stats) {
+            backend.latency_stats.connect(window.handle_latency);
+        }
+        if (backend.health_changed) {
+            backend.health_changed.connect(window.handle_health);
+        }
+        if (backend.paste_progress) {
+            backend.paste_progress.connect(window.handle_paste_progress);
+            backend.paste_finished.connect(window.handle_paste_finished);
+        }
+        // Release anything the backend held while the page was loading
+        backend.set_frontend_ready();
+    }
 });
 
 // Window load event handler
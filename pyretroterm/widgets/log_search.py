@@ -0,0 +1,132 @@
+"""
+pyRetroTerm - Log Search
+Full-text search across session logs, backed by the LogIndexer.
+"""
+import os
+import time
+from datetime import datetime
+
+from PyQt6.QtGui import QTextCursor, QTextCharFormat, QColor, QFont
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QComboBox, QPushButton, QLabel,
+    QTableWidget, QTableWidgetItem, QHeaderView, QPlainTextEdit, QTextEdit, QAbstractItemView, QCheckBox
+)
+
+from pyretroterm.ssh.log_index import LogIndexer
+
+SEARCH_LIMIT = 500
+
+
+class LogViewerDialog(QDialog):
+    """Shows the part of a log around a search hit, with the hit line selected."""
+
+    def __init__(self, path, offset, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(os.path.basename(path))
+        self.resize(1000, 600)
+        layout = QVBoxLayout(self)
+
+        self.text = QPlainTextEdit(self)
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        font = QFont("monospace")
+        font.setStyleHint(QFont.StyleHint.Monospace)
+        self.text.setFont(font)
+        layout.addWidget(self.text)
+        layout.addWidget(QLabel(f"{path} @ byte {offset}"))
+
+        content, position = LogIndexer.read_context(path, offset)
+        if not content:
+            self.text.setPlainText("This log is no longer available.")
+            return
+        self.text.setPlainText(content)
+
+        # Select and highlight the hit line
+        cursor = self.text.textCursor()
+        cursor.setPosition(position)
+        cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor)
+        self.text.setTextCursor(cursor)
+        fmt = QTextCharFormat()
+        fmt.setBackground(QColor("#806000"))
+        highlight = QTextEdit.ExtraSelection()
+        highlight.format = fmt
+        highlight.cursor = cursor
+        self.text.setExtraSelections([highlight])
+        self.text.centerCursor()
+
+
+class LogSearchDialog(QDialog):
+    def __init__(self, parent=None, indexer=None):
+        super().__init__(parent)
+        self.indexer = indexer or LogIndexer.instance()
+        self.setWindowTitle("Search Session Logs")
+        self.resize(1000, 600)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.query = QLineEdit(self)
+        self.query.setPlaceholderText("Words to find, e.g. OSPF neighbor down")
+        self.query.returnPressed.connect(self.run_search)
+        controls.addWidget(self.query, 1)
+
+        self.host = QComboBox(self)
+        self.host.addItem("All hosts", None)
+        for host in self.indexer.hosts():
+            self.host.addItem(host, host)
+        controls.addWidget(self.host)
+
+        self.raw = QCheckBox("FTS syntax", self)
+        self.raw.setToolTip("Use SQLite FTS5 query syntax (AND/OR/NOT, prefix*, \"phrases\")")
+        controls.addWidget(self.raw)
+
+        search_button = QPushButton("Search", self)
+        search_button.clicked.connect(self.run_search)
+        controls.addWidget(search_button)
+        layout.addLayout(controls)
+
+        self.results = QTableWidget(0, 3, self)
+        self.results.setHorizontalHeaderLabels(["Time", "Host", "Line"])
+        self.results.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        self.results.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.results.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.results.verticalHeader().setVisible(False)
+        self.results.cellDoubleClicked.connect(self.open_hit)
+        layout.addWidget(self.results)
+
+        self.status = QLabel("Double-click a hit to open the log there.", self)
+        layout.addWidget(self.status)
+        self.hits = []
+
+    def run_search(self):
+        text = self.query.text().strip()
+        if not text:
+            return
+        # Pick up whatever was written since the last poll
+        self.indexer.poke()
+        started = time.perf_counter()
+        try:
+            self.hits = self.indexer.search(text, host=self.host.currentData(), limit=SEARCH_LIMIT,
+                                            raw=self.raw.isChecked())
+        except ValueError as e:
+            self.status.setText(str(e))
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+
+        self.results.setRowCount(len(self.hits))
+        for row, hit in enumerate(self.hits):
+            stamp = datetime.fromtimestamp(hit['ts']).strftime("%Y-%m-%d %H:%M:%S")
+            self.results.setItem(row, 0, QTableWidgetItem(stamp))
+            self.results.setItem(row, 1, QTableWidgetItem(hit['host']))
+            self.results.setItem(row, 2, QTableWidgetItem(hit['text']))
+        self.results.resizeColumnToContents(0)
+        self.results.resizeColumnToContents(1)
+        more = " (showing the newest)" if len(self.hits) == SEARCH_LIMIT else ""
+        self.status.setText(f"{len(self.hits)} hits in {elapsed:.1f} ms{more}")
+
+    def open_hit(self, row, column):
+        hit = self.hits[row]
+        viewer = LogViewerDialog(hit['path'], hit['offset'], self)
+        viewer.show()
@@ -10,6 +10,9 @@ from PyQt6.QtWebEngineCore import QWebEngineProfile
 from PyQt6.QtWebChannel import QWebChannel
 from pyretroterm.ssh.sshschemahandler import WebEngineUrlSchemeHandler
 from pyretroterm.ssh.sshshell import Backend
+from pyretroterm.ssh.scrollback import DEFAULT_MAX_BYTES as DEFAULT_SCROLLBACK_BYTES
+from pyretroterm.ssh.paste import DEFAULT_PASTE_MODE
+from pyretroterm.ssh.algorithms import AlgorithmCache
 
 
 class Ui_Terminal(QWidget):
@@ -44,6 +47,24 @@ class Ui_Terminal(QWidget):
         self.password = connect_info.get('password')
         self.pkey_path = connect_info.get('pkey_path')
         self.log_filename = connect_info.get('log_filename')
+        self.output_transport = connect_info.get('output_transport', 'webchannel')
+        self.reuse_transport = connect_info.get('reuse_transport', True)
+        self.prompt_pattern = connect_info.get('prompt_pattern')
+        self.firehose = connect_info.get('firehose', True)
+        self.scrollback_bytes = connect_info.get('scrollback_bytes', DEFAULT_SCROLLBACK_BYTES)
+        self.record = connect_info.get('record', False)
+        self.paste_mode = connect_info.get('paste_mode', DEFAULT_PASTE_MODE)
+        # TransportProfile.to_dict() form, resolved from the sessions YAML
+        self.transport_profile = connect_info.get('transport')
+        # proxy_jump setting from the sessions YAML, see ssh/jump.py
+        self.proxy_jump = connect_info.get('proxy_jump')
+        # Hold the session in the connection broker when one is running, see
+        # ssh/broker.py; broker_session attaches to one it already holds
+        self.broker = connect_info.get('broker', False)
+        self.broker_session = connect_info.get('broker_session')
+        self.broker_meta = connect_info.get('broker_meta')
+        # Restored from the broker without credentials, it can only attach
+        self.can_login = connect_info.get('can_login', True)
         # self.theme = connect_info.get('theme')
         # if self.theme == "light_dark":
         #     xterm_theme = "light"
@@ -70,11 +91,16 @@ class Ui_Terminal(QWidget):
         QWebEngineProfile.defaultProfile().installUrlSchemeHandler(b"file", self.handler)
         self.channel = QWebChannel()
         try:
-            # For key-based auth
-            if self.pkey_path:
-                self.backend = Backend(host=self.host, port=self.port, username=self.username, key_path=self.pkey_path, parent_widget=self)
-            else:
-                self.backend = Backend(host=self.host, port=self.port, username=self.username, password=self.password, parent_widget=self)
+            # With key-based auth the password is the key's passphrase
+            self.backend = Backend(host=self.host, port=self.port, username=self.username,
+                                   key_path=self.pkey_path or None, password=self.password, parent_widget=self,
+                                   output_transport=self.output_transport, reuse_transport=self.reuse_transport,
+                                   prompt_pattern=self.prompt_pattern, firehose=self.firehose,
+                                   scrollback_bytes=self.scrollback_bytes, record=self.record,
+                                   paste_mode=self.paste_mode, transport_profile=self.transport_profile,
+                                   proxy_jump=self.proxy_jump, broker=self.broker,
+                                   broker_session=self.broker_session, broker_meta=self.broker_meta,
+                                   can_login=self.can_login)
 
             self.channel.registerObject("backend", self.backend)
         except:
@@ -86,8 +112,26 @@ class Ui_Terminal(QWidget):
         self.page = self.view.page()
         self.view.resizeEvent = self.handle_resize_event
         self.view.loadFinished.connect(self.handle_load_finished)
-        self.backend.send_output.connect(
-            lambda data: self.view.page().runJavaScript(f"window.handle_output({json.dumps(data)})"))
+        if self.output_transport == "javascript":
+            # Legacy path, the page only subscribes to the backend's signals
+            # itself when backend.output_mode is 'webchannel'.
+            self.backend.send_output.connect(
+                lambda data: self.view.page().runJavaScript(f"window.handle_output({json.dumps(data)})"))
+            self.backend.firehose_changed.connect(
+                lambda active, rate: self.view.page().runJavaScript(
+                    f"window.handle_firehose && window.handle_firehose({json.dumps(active)}, {rate})"))
+            self.backend.latency_stats.connect(
+                lambda stats: self.view.page().runJavaScript(
+                    f"window.handle_latency && window.handle_latency({json.dumps(stats)})"))
+            self.backend.health_changed.connect(
+                lambda state, rtt: self.view.page().runJavaScript(
+                    f"window.handle_health && window.handle_health({json.dumps(state)}, {rtt})"))
+            self.backend.paste_progress.connect(
+                lambda sent, total: self.view.page().runJavaScript(
+                    f"window.handle_paste_progress && window.handle_paste_progress({sent}, {total})"))
+            self.backend.paste_finished.connect(
+                lambda status: self.view.page().runJavaScript(
+                    f"window.handle_paste_finished && window.handle_paste_finished({json.dumps(status)})"))
 
         base_dir = os.path.dirname(os.path.abspath(__file__))
         if self.mode == "standalone":
@@ -149,7 +193,10 @@ class Ui_Terminal(QWidget):
         Handle the terminal readiness check result.
         """
         if is_ready:
-            self.write_initial_buffer()
+            # The web channel transport holds output until the page subscribes,
+            # so only the legacy path needs the banner replayed
+            if self.output_transport == "javascript":
+                self.write_initial_buffer()
         else:
             # Retry after a short delay
             QTimer.singleShot(100, self.check_terminal_ready)
@@ -214,6 +261,49 @@ class Ui_Terminal(QWidget):
 
 
 
+    def get_output_stats(self):
+        """
+        Returns the output batching counters for this terminal.
+
+        :return: dict of counters, empty if the backend never came up.
+        """
+        if hasattr(self, 'backend') and self.backend is not None:
+            stats = self.backend.output_batcher.stats()
+            if self.backend.flow is not None:
+                stats['flow'] = self.backend.flow.stats()
+            if self.backend.firehose is not None:
+                stats['firehose'] = self.backend.firehose.stats()
+            if self.backend.scrollback is not None:
+                stats['scrollback'] = self.backend.scrollback.stats()
+            stats['latency'] = self.backend.latency.stats()
+            stats['health'] = self.backend.health()
+            stats['transport'] = self.backend.transport_profile.to_dict()
+            algorithms = AlgorithmCache.instance().get(self.backend.host, self.backend.port)
+            if algorithms is not None:
+                stats['algorithms'] = algorithms
+            if self.backend.proxy_jump is not None:
+                stats['proxy_jump'] = str(self.backend.proxy_jump)
+            if self.backend.broker_session is not None:
+                stats['broker'] = {'session': self.backend.broker_session, 'state': self.backend.state}
+            return stats
+        return {}
+
+    def detach(self):
+        """
+        Leave a brokered session running in the connection broker, e.g. on
+        exit, for the next start to attach to.
+
+        :return: True if the session was left behind, False if there was none.
+        """
+        if hasattr(self, 'backend') and self.backend is not None:
+            return self.backend.detach()
+        return False
+
+    def attach(self):
+        """Attach again to the session this terminal detached from."""
+        if hasattr(self, 'backend') and self.backend is not None:
+            self.backend.attach()
+
     def notify(self, message, info):
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Icon.Information)
@@ -0,0 +1,203 @@
+"""
+pyRetroTerm - Session Replay
+Plays back asciicast recordings made by the session recorder, at 1x to 100x
+with seeking through the recording's keyframe index.
+"""
+import os
+import time
+
+from PyQt6.QtCore import QObject, QTimer, QUrl, Qt, pyqtSignal, pyqtSlot
+from PyQt6.QtWebChannel import QWebChannel
+from PyQt6.QtWebEngineWidgets import QWebEngineView
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QSlider, QComboBox, QLabel
+
+from pyretroterm.ssh.recorder import CastReader
+
+SPEEDS = (1, 2, 5, 10, 25, 50, 100)
+TICK_MS = 16
+
+
+def format_time(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class ReplayPlayer(QObject):
+    """
+    Drives playback of one recording. Output due since the last tick is sent
+    to the page as a single write, so 100x costs no more calls than 1x.
+    """
+    output = pyqtSignal(str)
+    reset = pyqtSignal(int, int)
+    resized = pyqtSignal(int, int)
+    position_changed = pyqtSignal(float)
+    finished = pyqtSignal()
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.reader = CastReader(path)
+        self.duration = self.reader.duration
+        self.position = 0.0
+        self.speed = 1
+        self.playing = False
+        self.page_ready = False
+        self._events = None
+        self._pending = None
+        self._last_tick = 0.0
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(TICK_MS)
+        self._timer.timeout.connect(self._tick)
+
+    @pyqtSlot()
+    def set_page_ready(self):
+        """Called by the page once it is subscribed to our signals."""
+        self.page_ready = True
+        self.seek(0.0)
+        self.play()
+
+    def play(self):
+        if self.position >= self.duration:
+            self.seek(0.0)
+        self.playing = True
+        self._last_tick = time.monotonic()
+        self._timer.start()
+
+    def pause(self):
+        self.playing = False
+        self._timer.stop()
+
+    def set_speed(self, speed):
+        self.speed = speed
+
+    def seek(self, target):
+        """
+        Jump to ``target`` seconds: rebuild the screen from the output tail of
+        the keyframe before it, then replay up to one keyframe interval of
+        events, all in one write.
+        """
+        target = max(0.0, min(target, self.duration))
+        keyframe = self.reader.keyframe_at(target)
+        cols, rows = keyframe['size']
+        self.reset.emit(cols, rows)
+        self._events = self.reader.events(keyframe['tail_offset'])
+        self._pending = None
+        self.position = target
+        self._emit_until(target)
+        self.position_changed.emit(self.position)
+
+    def _emit_until(self, until):
+        """Write out every event up to ``until`` as one batch."""
+        chunks = []
+        while True:
+            event = self._pending if self._pending is not None else next(self._events, None)
+            if event is None:
+                self._pending = None
+                break
+            t, code, data = event
+            if t > until:
+                self._pending = event
+                break
+            self._pending = None
+            if code == "o":
+                chunks.append(data)
+            elif code == "r":
+                try:
+                    cols, rows = (int(value) for value in data.split("x"))
+                except ValueError:
+                    continue
+                if chunks:
+                    self.output.emit("".join(chunks))
+                    chunks = []
+                self.resized.emit(cols, rows)
+        if chunks:
+            self.output.emit("".join(chunks))
+        return self._pending is None
+
+    @pyqtSlot()
+    def _tick(self):
+        now = time.monotonic()
+        self.position = min(self.duration, self.position + (now - self._last_tick) * self.speed)
+        self._last_tick = now
+        done = self._emit_until(self.position)
+        self.position_changed.emit(self.position)
+        if done or self.position >= self.duration:
+            self.pause()
+            self.finished.emit()
+
+    def stop(self):
+        self._timer.stop()
+        self._events = None
+
+
+class ReplayWidget(QWidget):
+    """Replay tab: an xterm.js view with play/pause, speed and a seek bar."""
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.player = ReplayPlayer(path, parent=self)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.channel = QWebChannel()
+        self.channel.registerObject("player", self.player)
+        self.view = QWebEngineView()
+        self.view.page().setWebChannel(self.channel)
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.view.load(QUrl.fromLocalFile(os.path.abspath(os.path.join(base_dir, '../static/replay.html'))))
+        layout.addWidget(self.view, 1)
+
+        controls = QHBoxLayout()
+        self.play_button = QPushButton("Pause", self)
+        self.play_button.clicked.connect(self.toggle_play)
+        controls.addWidget(self.play_button)
+
+        self.speed = QComboBox(self)
+        for speed in SPEEDS:
+            self.speed.addItem(f"{speed}x", speed)
+        self.speed.currentIndexChanged.connect(lambda: self.player.set_speed(self.speed.currentData()))
+        controls.addWidget(self.speed)
+
+        # Slider in tenths of a second
+        self.slider = QSlider(Qt.Orientation.Horizontal, self)
+        self.slider.setRange(0, max(1, int(self.player.duration * 10)))
+        self.slider.sliderReleased.connect(lambda: self.player.seek(self.slider.value() / 10))
+        self.slider.sliderMoved.connect(lambda value: self.update_time(value / 10))
+        controls.addWidget(self.slider, 1)
+
+        self.time_label = QLabel(self)
+        controls.addWidget(self.time_label)
+        controls.addWidget(QLabel(os.path.basename(self.path), self))
+        layout.addLayout(controls)
+
+        self.player.position_changed.connect(self.on_position)
+        self.player.finished.connect(lambda: self.play_button.setText("Play"))
+        self.update_time(0.0)
+
+    def toggle_play(self):
+        if self.player.playing:
+            self.player.pause()
+            self.play_button.setText("Play")
+        else:
+            self.player.play()
+            self.play_button.setText("Pause")
+
+    def on_position(self, position):
+        if not self.slider.isSliderDown():
+            self.slider.setValue(int(position * 10))
+            self.update_time(position)
+
+    def update_time(self, position):
+        self.time_label.setText(f"{format_time(position)} / {format_time(self.player.duration)}")
+
+    def cleanup(self):
+        self.player.stop()
+        self.channel.deregisterObject(self.player)
+        self.view.setPage(None)
+        self.view.deleteLater()
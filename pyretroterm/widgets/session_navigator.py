@@ -17,6 +17,8 @@ from typing import Optional
 from pyretroterm.themes2 import LayeredHUDFrame
 from pyretroterm.widgets.new_session_dialog import NewSessionDialog
 from pyretroterm.helpers.credslib import SecureCredentials
+from pyretroterm.ssh.transport_profile import TransportProfile
+from pyretroterm.ssh.jump import JumpHost
 
 logger = logging.getLogger('termtel.session_navigator')
 
@@ -262,7 +264,11 @@ class SessionNavigator(QWidget):
             for folder in sessions_data:
                 folder_item = QTreeWidgetItem(self.session_tree)
                 folder_item.setText(0, folder['folder_name'])
-                folder_item.setData(0, Qt.ItemDataRole.UserRole, {'type': 'folder'})
+                # Folder-wide settings such as transport_profile, see ssh/transport_profile.py
+                folder_item.setData(0, Qt.ItemDataRole.UserRole, {
+                    'type': 'folder',
+                    'data': {key: value for key, value in folder.items() if key != 'sessions'}
+                })
 
                 for session in folder.get('sessions', []):
                     session_item = QTreeWidgetItem(folder_item)
@@ -334,6 +340,19 @@ class SessionNavigator(QWidget):
                 if dialog.exec() == dialog.DialogCode.Accepted:
                     updated_connection = dialog.get_connection_data()
                     updated_connection['display_name'] = session_data.get('display_name', updated_connection.get('host','not set' ))
+                    folder_data = {}
+                    if item.parent() is not None:
+                        folder_data = (item.parent().data(0, Qt.ItemDataRole.UserRole) or {}).get('data', {})
+                    try:
+                        profile = TransportProfile.from_config(folder_data, session_data)
+                    except ValueError as e:
+                        QMessageBox.warning(self, "Transport Profile", f"Ignoring transport settings: {e}")
+                        profile = TransportProfile()
+                    updated_connection['transport'] = profile.to_dict()
+                    try:
+                        updated_connection['proxy_jump'] = JumpHost.from_config(folder_data, session_data)
+                    except ValueError as e:
+                        QMessageBox.warning(self, "Jump Host", f"Connecting directly: {e}")
                     self.connect_requested.emit(updated_connection)
 
     def handle_quick_connect(self, connection_data):
@@ -269,6 +269,12 @@ def setup_menus(window):
     manage_sessions_action = tools_menu.addAction('Manage Sessions')
     manage_sessions_action.triggered.connect(lambda: show_session_manager(window))
 
+    search_logs_action = tools_menu.addAction('Search Logs...')
+    search_logs_action.triggered.connect(lambda: show_log_search(window))
+
+    replay_action = tools_menu.addAction('Replay Recording...')
+    replay_action.triggered.connect(lambda: handle_open_recording(window))
+
     # Add separator before distractions menu
     tools_menu.addSeparator()
 
@@ -346,6 +352,33 @@ def show_session_manager(window):
 
 
 
+def show_log_search(window):
+    """Show the session log search dialog"""
+    try:
+        from pyretroterm.widgets.log_search import LogSearchDialog
+
+        window.log_search_dialog = LogSearchDialog(window)
+        window.log_search_dialog.show()
+    except Exception as e:
+        logger.error(f"Error showing log search: {e}")
+
+
+def handle_open_recording(window):
+    """Pick an asciicast recording and open it in a replay tab"""
+    try:
+        file_name, _ = QFileDialog.getOpenFileName(
+            window,
+            "Open Recording",
+            "./recordings",
+            "Asciicast Recordings (*.cast);;All Files (*)"
+        )
+        if file_name:
+            window.terminal_tabs.create_replay_tab(file_name)
+    except Exception as e:
+        logger.error(f"Error opening recording: {e}")
+        QMessageBox.warning(window, "Replay", f"Could not open recording:\n{e}")
+
+
 def show_netbox_importer(window):
     """Show the Netbox to Session importer"""
     try:
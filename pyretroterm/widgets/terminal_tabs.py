@@ -1,4 +1,6 @@
 # widgets/terminal_tabs.py
+import json
+import os
 import socket
 import traceback
 from importlib.resources import files
@@ -6,7 +8,7 @@ from importlib.resources import files
 from PyQt6.QtGui import QColor
 from PyQt6.QtWebEngineCore import QWebEngineProfile
 from PyQt6.QtWidgets import (QTabWidget, QWidget, QVBoxLayout,
-                             QMenu, QMessageBox, QSplitter)
+                             QMenu, QMessageBox, QSplitter, QFileDialog)
 from PyQt6.QtCore import QUrl, pyqtSignal, Qt, QTimer
 import uuid
 import logging
@@ -17,9 +19,15 @@ from pyretroterm.themes3 import ThemeMapper, generate_terminal_themes
 from pyretroterm.widgets.notepad_widget import NotepadWidget
 from pyretroterm.widgets.qtssh_widget import Ui_Terminal
 from pyretroterm.widgets.terminal_app_wrapper import TextEditorWrapper, GenericTabContainer
+from pyretroterm.ssh.transport_registry import TransportRegistry
+from pyretroterm.ssh.broker import broker_available
+from pyretroterm.ssh.broker_client import list_sessions
 
 logger = logging.getLogger(__name__)
 
+# Connection data the broker keeps with a session, to reopen its tab. The
+# broker hands it to anyone who lists sessions, so never credentials.
+BROKER_META_FIELDS = ('host', 'port', 'username', 'display_name')
 
 
 class GameWrapper:
@@ -45,6 +53,7 @@ class TerminalTabWidget(QTabWidget):
         super().__init__(parent)
         self.server_port = server_port
         self.sessions: Dict[str, QWidget] = {}
+        self.connection_data: Dict[str, Dict] = {}  # Terminal tabs only, used to duplicate them
         self.parent = parent
         self.current_term_theme = "Cyberpunk"  # Default
         if hasattr(self.parent, 'theme'):
@@ -151,18 +160,8 @@ class TerminalTabWidget(QTabWidget):
         session_id = connection_data.get('uuid', str(uuid.uuid4()))
 
         try:
-            # Test socket connection first
-            host = connection_data['host']
-            port = connection_data.get('port', '22')
-
-            success, error_message = self.test_socket_connection(host, port)
-            if not success:
-                QMessageBox.critical(
-                    self,
-                    "Connection Failed",
-                    f"Failed to connect to {host}:{port}\nError: {error_message}"
-                )
-                return None
+            # Reachability, auth and shell setup run on the connect pool, the
+            # tab shows up straight away and reports progress in its title.
 
             # Create tab container
             tab_container = QWidget()
@@ -176,7 +175,14 @@ class TerminalTabWidget(QTabWidget):
                 "username": connection_data.get('username'),
                 "password": connection_data.get('password'),
                 "log_filename": f"./logs/session_{connection_data['host']}.log",
-                "theme": self.get_mapped_terminal_theme(self.current_term_theme)
+                "theme": self.get_mapped_terminal_theme(self.current_term_theme),
+                "transport": connection_data.get('transport'),
+                "proxy_jump": connection_data.get('proxy_jump'),
+                # Sessions go to the connection broker whenever one is running
+                "broker": connection_data.get('broker', broker_available()),
+                "broker_session": connection_data.get('broker_session'),
+                "broker_meta": {key: connection_data[key] for key in BROKER_META_FIELDS if key in connection_data},
+                "can_login": not connection_data.get('restored', False)
             }
 
             terminal = Ui_Terminal(hostinfo, parent=tab_container)
@@ -188,17 +194,97 @@ class TerminalTabWidget(QTabWidget):
 
             # Add to tab widget
             display_name = connection_data.get('display_name') or connection_data['host']
-            index = self.addTab(tab_container, display_name)
+            index = self.addTab(tab_container, f"{display_name} [connecting]")
             self.setCurrentIndex(index)
+            self.track_connect_progress(terminal, tab_container, display_name)
 
             # Store session
             self.sessions[session_id] = tab_container
+            self.connection_data[session_id] = dict(connection_data)
             return session_id
 
         except Exception as e:
             logger.error(f"Failed to create terminal: {e}")
             raise
 
+    def duplicate_tab(self, index: int) -> Optional[str]:
+        """
+        Open another terminal to the same target as the tab at index. The new
+        shell is opened on the existing authenticated transport.
+        """
+        widget = self.widget(index)
+        session_id = next((sid for sid, w in self.sessions.items() if w == widget), None)
+        if session_id not in self.connection_data:
+            return None
+        connection_data = dict(self.connection_data[session_id])
+        if connection_data.get('restored'):
+            QMessageBox.information(self, "Duplicate Tab",
+                                    "This tab was restored from the connection broker without its credentials.\n"
+                                    "Open the session from the session list to get another terminal.")
+            return None
+        connection_data.pop('uuid', None)
+        connection_data.pop('broker_session', None)
+        return self.create_terminal(connection_data)
+
+    def reattach_broker_sessions(self) -> int:
+        """
+        Open a tab for every session the connection broker holds that no
+        window is attached to, e.g. the ones this GUI left when it last exited.
+
+        :return: number of tabs opened.
+        """
+        shown = set()
+        for container in self.sessions.values():
+            terminal = container.findChild(Ui_Terminal)
+            backend = getattr(terminal, 'backend', None) if terminal else None
+            if backend is not None and backend.broker_session is not None:
+                shown.add(backend.broker_session)
+        opened = 0
+        for info in list_sessions():
+            if info['attached'] or info['id'] in shown:
+                continue
+            connection_data = dict(info.get('meta') or {})
+            connection_data.setdefault('host', info['host'])
+            connection_data.setdefault('port', info['port'])
+            connection_data.setdefault('username', info['username'])
+            connection_data['broker_session'] = info['id']
+            # The broker keeps no credentials, so this tab can't log in again
+            connection_data['restored'] = True
+            try:
+                self.create_terminal(connection_data)
+                opened += 1
+            except Exception as e:
+                logger.error(f"Failed to reattach broker session {info['id']}: {e}")
+        if opened:
+            logger.info(f"Reattached {opened} sessions held by the connection broker")
+        return opened
+
+    def detach_all(self) -> int:
+        """Leave every brokered session running in the broker, for the next start to attach to."""
+        detached = 0
+        for container in self.sessions.values():
+            terminal = container.findChild(Ui_Terminal)
+            if terminal is not None and terminal.detach():
+                detached += 1
+        return detached
+
+    def track_connect_progress(self, terminal, tab_container, display_name: str):
+        """Reflect the terminal's connect pipeline stage in its tab title."""
+        backend = getattr(terminal, 'backend', None)
+        if backend is None:
+            self.set_tab_title(tab_container, f"{display_name} [failed]")
+            return
+        backend.connect_progress.connect(
+            lambda stage, detail: self.set_tab_title(tab_container, f"{display_name} [{stage}]"))
+        backend.connected.connect(lambda: self.set_tab_title(tab_container, display_name))
+        backend.connect_failed.connect(
+            lambda title, message: self.set_tab_title(tab_container, f"{display_name} [failed]"))
+
+    def set_tab_title(self, tab_container, title: str):
+        index = self.indexOf(tab_container)
+        if index >= 0:
+            self.setTabText(index, title)
+
     def apply_theme_to_terminal(self, terminal, theme_name):
         """Apply theme to a specific terminal instance."""
         if hasattr(terminal, 'view') and theme_name in self.terminal_themes:
@@ -248,6 +334,7 @@ class TerminalTabWidget(QTabWidget):
         """Remove session from tracking."""
         if session_id in self.sessions:
             self.sessions.pop(session_id)
+            self.connection_data.pop(session_id, None)
             self.terminal_closed.emit(session_id)
             if not self.sessions:
                 self.all_terminals_closed.emit()
@@ -270,6 +357,38 @@ class TerminalTabWidget(QTabWidget):
 
             menu.addSeparator()
 
+            # Output statistics for terminal tabs
+            terminal = self.widget(index).findChild(Ui_Terminal) if self.widget(index) else None
+            if terminal:
+                duplicate_action = menu.addAction("Duplicate Tab")
+                duplicate_action.triggered.connect(lambda: self.duplicate_tab(index))
+                backend = getattr(terminal, 'backend', None)
+                if backend is not None and backend.state == "detached":
+                    attach_action = menu.addAction("Attach")
+                    attach_action.triggered.connect(backend.attach)
+                elif backend is not None:
+                    reconnect_action = menu.addAction("Reconnect")
+                    reconnect_action.triggered.connect(backend.reconnect)
+                    if backend.brokered:
+                        detach_action = menu.addAction("Detach (keep in broker)")
+                        detach_action.triggered.connect(terminal.detach)
+                if backend is not None and backend.recorder is not None:
+                    record_action = menu.addAction("Stop Recording")
+                    record_action.triggered.connect(lambda: self.stop_recording(terminal))
+                elif backend is not None:
+                    record_action = menu.addAction("Start Recording")
+                    record_action.triggered.connect(lambda: self.start_recording(terminal))
+                stats_action = menu.addAction("Output Stats")
+                stats_action.triggered.connect(lambda: self.show_output_stats(terminal))
+                if backend is not None:
+                    overlay_action = menu.addAction("Latency Overlay")
+                    overlay_action.setCheckable(True)
+                    overlay_action.setChecked(backend.latency_overlay)
+                    overlay_action.triggered.connect(lambda checked: backend.set_latency_overlay(checked))
+                    export_action = menu.addAction("Export Latency Stats...")
+                    export_action.triggered.connect(lambda: self.export_latency_stats(terminal))
+                menu.addSeparator()
+
             # Close action
             close_action = menu.addAction("Close")
             close_action.triggered.connect(lambda: self.close_tab(index))
@@ -286,6 +405,96 @@ class TerminalTabWidget(QTabWidget):
 
             menu.exec(self.tabBar().mapToGlobal(position))
 
+    def start_recording(self, terminal):
+        """Record a terminal tab as asciicast, see pyretroterm/ssh/recorder.py."""
+        path = terminal.backend.start_recording()
+        QMessageBox.information(self, "Recording", f"Recording this session to:\n{path}")
+
+    def stop_recording(self, terminal):
+        path = terminal.backend.recorder.path
+        terminal.backend.stop_recording()
+        reply = QMessageBox.question(self, "Recording", f"Recording saved to:\n{path}\n\nReplay it now?")
+        if reply == QMessageBox.StandardButton.Yes:
+            # Give the log writer a moment to flush the last events
+            QTimer.singleShot(1500, lambda: self.create_replay_tab(path))
+
+    def show_output_stats(self, terminal):
+        """Show the output batching counters for a terminal tab."""
+        stats = terminal.get_output_stats()
+        if not stats:
+            QMessageBox.information(self, "Output Stats", "No output statistics available for this tab.")
+            return
+        text = (
+            f"Chunks received: {stats['chunks_in']}\n"
+            f"JavaScript calls: {stats['js_calls']} ({stats['reduction']:.1f}x fewer)\n"
+            f"Bytes received: {stats['bytes_in']}\n"
+            f"Sustained: {stats['sustained_mb_s']:.2f} MB/s\n"
+            f"Current: {stats['current_mb_s']:.2f} MB/s  Peak: {stats['peak_mb_s']:.2f} MB/s"
+        )
+        if 'flow' in stats:
+            flow = stats['flow']
+            text += (f"\nUnacknowledged: {flow['pending']} bytes"
+                     f"{' (reading paused)' if flow['paused'] else ''}\n"
+                     f"Backpressure pauses: {flow['pauses']}")
+        if 'firehose' in stats:
+            firehose = stats['firehose']
+            text += (f"\nFirehose mode: {'on' if firehose['active'] else 'off'}"
+                     f" (entered {firehose['activations']} times)\n"
+                     f"Skipped rendering: {firehose['bytes_skipped']} bytes, {firehose['snapshots']} snapshots")
+        if 'scrollback' in stats:
+            scrollback = stats['scrollback']
+            text += (f"\nHistory: lines {scrollback['first_line']}-{scrollback['line_count']}, "
+                     f"{scrollback['bytes'] / (1024 * 1024):.1f} of {scrollback['max_bytes'] / (1024 * 1024):.0f} MB")
+        if 'latency' in stats:
+            latency = stats['latency']
+            echo = latency['echo_total']
+            if echo['count']:
+                network, app = latency['echo_network'], latency['echo_app']
+                text += (f"\nEcho p50/p99: {echo['p50_ms']:.1f}/{echo['p99_ms']:.1f} ms "
+                         f"over {echo['count']} keystrokes\n"
+                         f"  network {network.get('p50_ms', 0):.1f}/{network.get('p99_ms', 0):.1f} ms, "
+                         f"app {app.get('p50_ms', 0):.1f}/{app.get('p99_ms', 0):.1f} ms")
+            if latency['last_rtt_ms'] is not None:
+                text += f"\nKeepalive RTT: {latency['last_rtt_ms']:.1f} ms"
+        if 'transport' in stats:
+            transport = stats['transport']
+            text += (f"\nTransport profile: {transport['name']} (window {transport['window_size'] // 1024} KB, "
+                     f"max packet {transport['max_packet_size'] // 1024} KB, "
+                     f"compression {'on' if transport['compression'] else 'off'})")
+        if 'proxy_jump' in stats:
+            text += f"\nVia jump host: {stats['proxy_jump']}"
+        if 'broker' in stats:
+            text += f"\nBroker session: {stats['broker']['session'][:8]} ({stats['broker']['state']})"
+        if 'algorithms' in stats:
+            algorithms = stats['algorithms']
+            text += (f"\nAlgorithms ({algorithms['tier']}): {algorithms['kex']}, {algorithms['cipher']}, "
+                     f"{algorithms['mac']}, {algorithms['host_key']}")
+            phases = ", ".join(f"{phase} {ms:.0f}" for phase, ms in algorithms['timings_ms'].items())
+            text += f"\nLast connect (ms): {phases}"
+        if 'health' in stats:
+            health = stats['health']
+            text += f"\nConnection: {health['state']}"
+            if health.get('srtt_ms') is not None:
+                text += (f" (smoothed RTT {health['srtt_ms']:.1f} ms, {health['probes']} keepalives, "
+                         f"stale {health['stale_count']} times)")
+        QMessageBox.information(self, "Output Stats", text)
+
+    def export_latency_stats(self, terminal):
+        """Save a tab's latency histograms and counters as JSON."""
+        backend = terminal.backend
+        default = f"latency_{backend.host}.json"
+        path, _ = QFileDialog.getSaveFileName(self, "Export Latency Stats", default, "JSON Files (*.json)")
+        if not path:
+            return
+        data = backend.latency.export()
+        data['host'] = backend.host
+        data['output'] = terminal.get_output_stats()
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+        except OSError as e:
+            QMessageBox.warning(self, "Export Latency Stats", f"Could not write {path}: {e}")
+
     def change_terminal_theme(self, theme_name: str):
         """Change theme for current terminal and save preference."""
         self.current_term_theme = theme_name
@@ -312,8 +521,15 @@ class TerminalTabWidget(QTabWidget):
     def cleanup_all(self):
         """Clean up all terminals on application exit."""
         try:
+            # Brokered sessions stay up for the next start to attach to
+            detached = self.detach_all()
+            if detached:
+                logger.info(f"Left {detached} sessions with the connection broker")
             self.close_all_tabs()
             self.sessions.clear()
+            self.connection_data.clear()
+            # Don't leave idle shared transports waiting on their timers
+            TransportRegistry.instance().close_all()
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
 
@@ -379,6 +595,27 @@ class TerminalTabWidget(QTabWidget):
             raise
 
 
+    def create_replay_tab(self, path: str) -> str:
+        """Open an asciicast recording in a replay tab"""
+        try:
+            tab_id = str(uuid.uuid4())
+
+            from pyretroterm.widgets.replay_widget import ReplayWidget
+            replay = ReplayWidget(path)
+
+            # The replay widget cleans up after itself
+            container = GenericTabContainer(replay, replay, self)
+
+            index = self.addTab(container, f"Replay: {os.path.basename(path)}")
+            self.setCurrentIndex(index)
+
+            self.sessions[tab_id] = container
+            return tab_id
+
+        except Exception as e:
+            logger.error(f"Failed to open replay: {e}")
+            raise
+
     def close_tab(self, index: int):
         """Handle tab close request."""
         try:
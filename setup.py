@@ -46,6 +46,8 @@ setup(
     entry_points={
         'console_scripts': [
             'pyretroterm-con=pyretroterm.pyretroterm:main',
+            'pyretroterm-fleet=pyretroterm.ssh.fleet:main',
+            'pyretroterm-broker=pyretroterm.ssh.broker:main',
         ],
         'gui_scripts': [
             'pyretroterm=pyretroterm.pyretroterm:main',
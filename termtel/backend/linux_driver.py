@@ -6,6 +6,8 @@ from netmiko import ConnectHandler
 from netmiko.linux.linux_ssh import LinuxSSH
 import logging
 import os
+
+from pyretroterm.ssh.prompt_matcher import PromptMatcher, SUDO_PASSWORD_PROMPT
 logger = logging.getLogger(__name__)
 
 
@@ -43,6 +45,9 @@ class LinuxDriver:
             # Add any additional SSH options from optional_args
             if 'ssh_config_file' in self.optional_args:
                 device_params['ssh_config_file'] = self.optional_args['ssh_config_file']
+            # Already connected socket, e.g. a channel through a jump host
+            if 'sock' in self.optional_args:
+                device_params['sock'] = self.optional_args['sock']
 
             # Establish connection using Netmiko
             logger.debug(f"Attempting connection to {self.hostname}")
@@ -88,7 +93,7 @@ class LinuxDriver:
             output = self.device.send_command_timing("sudo hostname", cmd_verify=False)
             logger.debug(f"Initial sudo response: {output}")
 
-            if "[sudo]" in output or "password" in output.lower():
+            if PromptMatcher(SUDO_PASSWORD_PROMPT).feed(output):
                 logger.info("Sudo password prompt detected, sending password")
                 output_pwresp = self.device.send_command_timing(f"{self.password}\n")
                 logger.debug(f"Password response: {output_pwresp}")
@@ -7,10 +7,28 @@ import json
 import logging
 import paramiko
 import os
+import threading
 from termtel.backend.linux_driver import LinuxDriver
+from pyretroterm.ssh.stream_decoder import StreamDecoder, DEFAULT_ERRORS
+from pyretroterm.ssh.flow_control import FlowControl
+from pyretroterm.ssh.recorder import SessionRecorder, recording_path
+from pyretroterm.ssh.health import HealthMonitor, HEALTH_OK
+from pyretroterm.ssh.transport_profile import TransportProfile
+from pyretroterm.ssh.connect_pipeline import open_shell_channel
+from pyretroterm.ssh.algorithms import connect_client
+from pyretroterm.ssh.client_factory import ClientFactory
+from pyretroterm.ssh.jump import JumpHost, open_tunnel
 
 logger = logging.getLogger(__name__)
 
+# SSHSession output: bytes per channel read, and the minimum gap between two
+# "data" messages to the frontend (one per display frame) while output is
+# streaming. Flushes smaller than OUTPUT_INTERACTIVE_BYTES count as
+# interactive and don't hold back the next one, so typing echo isn't delayed.
+OUTPUT_READ_SIZE = 65536
+OUTPUT_FRAME_INTERVAL = 1 / 60
+OUTPUT_INTERACTIVE_BYTES = 1024
+
 
 class TelemetryCollector(QThread):
     telemetry_ready = pyqtSignal(dict)
@@ -198,7 +216,9 @@ class BaseSession(QObject):
             "action": action,
             "payload": payload
         }
-        print(message)
+        if action != "data":
+            # Terminal output would flood stdout
+            print(message)
         self.message_ready.emit(json.dumps(message))
 
 
@@ -212,77 +232,71 @@ from typing import Optional, Dict, Any
 class SSHSession(BaseSession):
     """Handles SSH terminal sessions with support for legacy cipher suites"""
 
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, decode_errors: str = DEFAULT_ERRORS):
         super().__init__(session_id)
         self.client = None
         self.channel = None
         self.session_id = session_id
         self._active = False
-
-        # Configure Paramiko's preferred algorithms
-        paramiko.Transport._preferred_kex = (
-            "diffie-hellman-group14-sha1",
-            "diffie-hellman-group-exchange-sha1",
-            "diffie-hellman-group-exchange-sha256",
-            "diffie-hellman-group1-sha1",
-            "ecdh-sha2-nistp256",
-            "ecdh-sha2-nistp384",
-            "ecdh-sha2-nistp521",
-            "curve25519-sha256",
-            "curve25519-sha256@libssh.org",
-            "diffie-hellman-group16-sha512",
-            "diffie-hellman-group18-sha512"
-        )
-
-        paramiko.Transport._preferred_ciphers = (
-            "aes128-cbc",
-            "aes128-ctr",
-            "aes192-ctr",
-            "aes256-ctr",
-            "aes256-cbc",
-            "3des-cbc",
-            "aes192-cbc",
-            "aes256-gcm@openssh.com",
-            "aes128-gcm@openssh.com",
-            "chacha20-poly1305@openssh.com",
-            "aes256-gcm",
-            "aes128-gcm"
-        )
-
-        paramiko.Transport._preferred_keys = (
-            "ssh-rsa",
-            "ssh-dss",
-            "ecdsa-sha2-nistp256",
-            "ecdsa-sha2-nistp384",
-            "ecdsa-sha2-nistp521",
-            "ssh-ed25519",
-            "rsa-sha2-256",
-            "rsa-sha2-512"
-        )
+        self.decode_errors = decode_errors
+        self.decoder = StreamDecoder(errors=decode_errors)
+        self.flow = None
+        self.recorder = None
+        self.health_token = None
+        self.health_state = HEALTH_OK
 
     async def connect(self, host: str, username: str,
                       password: Optional[str] = None,
-                      key_path: Optional[str] = None) -> None:
-        """Establish SSH connection with legacy cipher support"""
+                      key_path: Optional[str] = None,
+                      flow_control: bool = False,
+                      record: Any = False,
+                      transport_profile: Optional[Dict[str, Any]] = None,
+                      proxy_jump: Any = None) -> None:
+        """
+        Establish SSH connection, falling back to legacy algorithms for
+        hosts that need them.
+
+        With flow_control the frontend acknowledges every "data" message
+        ("ack" action) and reading pauses while too much is outstanding.
+        With record the session is recorded as asciicast v2, to the given
+        path or a timestamped file under ./recordings.
+        transport_profile (TransportProfile.to_dict() form) sets the window,
+        packet size, compression and rekey limits.
+        proxy_jump ("[user@]host[:port]" or a mapping) connects through a
+        jump host, sharing its login with every other session behind it.
+        """
+        profile = TransportProfile.from_dict(transport_profile)
+        self.flow = FlowControl() if flow_control else None
+        if record:
+            self.recorder = SessionRecorder(record if isinstance(record, str) else recording_path(host),
+                                            title=f"{username}@{host}")
         try:
-            self.client = paramiko.SSHClient()
-            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-            # Connect with modified defaults and disabled key searching
+            factory = ClientFactory.instance()
+            self.client = factory.create()
+            # Any key type, parsed once per process
+            pkey = await asyncio.to_thread(factory.private_key, key_path, password) if key_path else None
+            jump = JumpHost.parse(proxy_jump, username, password, key_path)
+
+            # Modern algorithms first, legacy ones for hosts that need them
+            # (remembered per host), no key searching
             await asyncio.to_thread(
-                self.client.connect,
-                hostname=host,
+                connect_client,
+                self.client,
+                host,
+                profile=profile,
+                open_sock=(lambda: open_tunnel(jump, host, 22)) if jump is not None else None,
                 username=username,
                 password=password,
-                key_filename=key_path if key_path else None,
+                pkey=pkey,
                 look_for_keys=False,
                 allow_agent=False,
                 timeout=30
             )
 
             # Request a PTY terminal
-            self.channel = self.client.invoke_shell(term='xterm')
-            self.channel.set_combine_stderr(True)
+            self.channel = open_shell_channel(self.client, 'xterm', profile)
+            # Keepalives, RTT and stale detection, reported as "health" messages
+            self.health_token = HealthMonitor.instance().watch(self.client.get_transport(), self._on_health)
 
             # Set active flag for read loop
             self._active = True
@@ -298,16 +312,30 @@ class SSHSession(BaseSession):
             self.send_message("error", {"message": str(e)})
             raise
 
+    def _on_health(self, state: str, rtt_ms: float) -> None:
+        """HealthMonitor callback, runs on the monitor's threads"""
+        if state == self.health_state:
+            return
+        self.health_state = state
+        self.send_message("health", {"state": state, "rtt_ms": rtt_ms})
+
     async def handle_data(self, payload: Dict[str, Any]) -> None:
         """Handle incoming terminal data"""
         if self.channel and self.channel.active:
             try:
                 text = payload.get("text", "")
+                if self.recorder is not None:
+                    self.recorder.input(text)
                 self.channel.send(text)
             except Exception as e:
                 logger.error(f"Failed to send data: {e}")
                 self.send_message("error", {"message": str(e)})
 
+    async def handle_ack(self, payload: Dict[str, Any]) -> None:
+        """Frontend has written a "data" message to the terminal"""
+        if self.flow is not None:
+            self.flow.ack(payload.get("bytes", 0))
+
     async def handle_resize(self, payload: Dict[str, Any]) -> None:
         """Handle terminal resize events"""
         print(f"handle_resize: {payload}")
@@ -316,28 +344,122 @@ class SSHSession(BaseSession):
                 cols = payload.get('cols', 80)
                 rows = payload.get('rows', 24)
                 self.channel.resize_pty(width=cols - 4, height=rows)
+                if self.recorder is not None:
+                    self.recorder.resize(cols - 4, rows)
             except Exception as e:
                 logger.error(f"Failed to resize PTY: {e}")
 
     async def _read_output(self) -> None:
-        """Read and forward SSH output"""
-        while self._active and self.channel:
+        """
+        Read and forward SSH output.
+
+        A dedicated thread blocks on the channel, drains whatever is buffered
+        and hands each batch to the event loop with call_soon_threadsafe.
+        Batches are coalesced into at most one "data" message per frame.
+        """
+        loop = asyncio.get_running_loop()
+        self.decoder.reset()
+        self._pending_output = []
+        self._flush_handle = None
+        self._last_flush = 0.0
+        self._last_flush_size = 0
+        self._pump_done = loop.create_future()
+        pump = threading.Thread(target=self._pump_channel, args=(loop, self.channel),
+                                name=f"ssh-pump-{self.session_id}", daemon=True)
+        pump.start()
+
+        await self._pump_done
+
+        # If the channel went away while we were still active, clean up
+        if self._active:
+            await self.disconnect()
+
+    def _pump_channel(self, loop, channel) -> None:
+        """Reader thread: one blocking recv, then drain everything buffered."""
+        flow = self.flow
+        while True:
+            if flow is not None:
+                # Renderer is behind, leave output in paramiko so the SSH window closes
+                while not flow.wait_resumed(1.0):
+                    if channel.closed:
+                        break
             try:
-                data = await asyncio.to_thread(self.channel.recv, 1024)
-                if not data:  # Connection closed
-                    break
-                self.send_message("data", {"text": data.decode()})
+                data = channel.recv(OUTPUT_READ_SIZE)
+                if data:
+                    chunks = [data]
+                    while channel.recv_ready():
+                        chunks.append(channel.recv(OUTPUT_READ_SIZE))
+                    data = b"".join(chunks)
             except Exception as e:
                 logger.error(f"Read error: {e}")
-                break
-
-        # If we break out of the loop and were still active, there was an error
-        if self._active:
-            await self.disconnect()
+                data = b""
+            try:
+                loop.call_soon_threadsafe(self._on_channel_data, data)
+            except RuntimeError:
+                # Loop already closed
+                return
+            if not data:  # Connection closed
+                return
+
+    def _on_channel_data(self, data: bytes) -> None:
+        """Runs on the event loop for every batch from the reader thread."""
+        if not data:
+            self._flush_output()
+            tail = self.decoder.flush()
+            if tail:
+                self._record_output(tail)
+                self.send_message("data", {"text": tail})
+            if not self._pump_done.done():
+                self._pump_done.set_result(None)
+            return
+
+        self._pending_output.append(data)
+        if self.flow is not None:
+            self.flow.sent(len(data))
+        if self._flush_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+        wait = OUTPUT_FRAME_INTERVAL - (loop.time() - self._last_flush)
+        if wait <= 0 or self._last_flush_size < OUTPUT_INTERACTIVE_BYTES:
+            # Idle or interactive until now, send straight away so echo stays snappy
+            self._flush_handle = loop.call_soon(self._flush_output)
+        else:
+            self._flush_handle = loop.call_later(wait, self._flush_output)
+
+    def _flush_output(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending_output:
+            return
+        data = b"".join(self._pending_output)
+        self._pending_output = []
+        self._last_flush = asyncio.get_running_loop().time()
+        self._last_flush_size = len(data)
+        text = self.decoder.decode(data)
+        if text:
+            self._record_output(text)
+            self.send_message("data", {"text": text, "bytes": len(data)})
+        elif self.flow is not None:
+            # Only part of a character so far, nothing for the frontend to ack
+            self.flow.ack(len(data))
+
+    def _record_output(self, text: str) -> None:
+        if self.recorder is not None:
+            self.recorder.output(text)
 
     async def disconnect(self) -> None:
         """Disconnect SSH session"""
         self._active = False
+        if self.health_token is not None:
+            HealthMonitor.instance().unwatch(self.health_token)
+            self.health_token = None
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self.flow is not None:
+            # Let a paused reader thread see the channel close
+            self.flow.reset()
         if self.channel:
             self.channel.close()
         if self.client:
@@ -356,9 +478,10 @@ class TelemetrySession(BaseSession):
         self._active = False
         self.refresh_rate = 30  # seconds
         self.collector = None  # Track collector instance
+        self.tunnel = None
 
-    async def connect(self, host, username, password=None, driver_type="linux"):
-        """Establish Napalm connection to device"""
+    async def connect(self, host, username, password=None, driver_type="linux", proxy_jump=None):
+        """Establish Napalm connection to device, through a jump host if proxy_jump is set"""
         try:
             # Configure logging for Netmiko to reduce noise
             logging.getLogger('netmiko').setLevel(logging.WARNING)
@@ -422,6 +545,12 @@ class TelemetrySession(BaseSession):
                     'command_timeout': 90
                 })
 
+            # Netmiko connects over the given socket, a channel through the jump host
+            jump = JumpHost.parse(proxy_jump, username, password)
+            if jump is not None:
+                self.tunnel = await asyncio.to_thread(open_tunnel, jump, host, optional_args['port'])
+                optional_args['sock'] = self.tunnel
+
             self.device = driver(
                 hostname=host,
                 username=username,
@@ -450,6 +579,14 @@ class TelemetrySession(BaseSession):
                 except Exception:
                     pass
                 self.device = None
+            self._close_tunnel()
+
+    def _close_tunnel(self):
+        """Usually closed with the device's connection already, this makes sure"""
+        if self.tunnel is not None:
+            self.tunnel.close()
+            self.tunnel = None
+
     async def collect_all_telemetry(self):
         """Collect and send all telemetry data in sequence"""
         try:
@@ -495,6 +632,7 @@ class TelemetrySession(BaseSession):
             except Exception as e:
                 logger.error(f"Error disconnecting: {e}")
             self.device = None
+        self._close_tunnel()
         self.send_message("disconnected", {"status": "success"})
 
     def _handle_telemetry_data(self, data):
@@ -1128,7 +1128,7 @@ cleanup() {
 
         this.term.clear();
         this.term.write('Connecting...\r\n');
-        this.sendToBackend('connect', connectionInfo);
+        this.sendToBackend('connect', { ...connectionInfo, flow_control: true });
     }
 
 handleMessage(message) {
@@ -1138,7 +1138,13 @@ handleMessage(message) {
     switch (message.action) {
 
         case 'data':
-            this.term.write(message.payload.text);
+            if (message.payload.bytes !== undefined) {
+                // Flow control: the backend pauses reading until output is acknowledged
+                const bytes = message.payload.bytes;
+                this.term.write(message.payload.text, () => this.sendToBackend('ack', { bytes: bytes }));
+            } else {
+                this.term.write(message.payload.text);
+            }
 //            window.sessions.terminal.term.fitAddon.fit();
 //              console.dir(window.sessions.terminal)
             break;
@@ -1169,6 +1175,16 @@ handleMessage(message) {
         case 'disconnected':
             this.term.write('\r\nConnection closed.\r\n');
             break;
+        case 'health':
+            // Keepalives stopped (or started again) getting answers
+            if (message.payload.state === 'stale') {
+                this.term.write('\r\n\x1b[33m[connection not responding]\x1b[0m\r\n');
+            } else if (message.payload.state === 'dead') {
+                this.term.write('\r\n\x1b[31m[connection lost]\x1b[0m\r\n');
+            } else {
+                this.term.write('\r\n\x1b[32m[connection restored]\x1b[0m\r\n');
+            }
+            break;
         case 'error':
             this.term.write(`\r\nError: ${message.payload.message}\r\n`);
             break;
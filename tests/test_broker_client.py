@@ -0,0 +1,22 @@
+import socket
+
+from pyretroterm.ssh import broker_client
+from pyretroterm.ssh.broker import FRAME_JSON, read_frame
+from pyretroterm.ssh.broker_client import BrokerChannel
+
+
+def test_keepalive_gives_up_on_a_wedged_broker(monkeypatch):
+    monkeypatch.setattr(broker_client, "DEAD_AFTER", 0.2)
+    ours, broker = socket.socketpair()
+    channel = BrokerChannel(ours, ours.makefile("rb"), "0123456789abcdef")
+    channel.start()
+    try:
+        assert channel.keepalive() is None
+        assert not channel.get_transport().is_active()
+        # The request went out, the broker just never answered it
+        kind, message = read_frame(broker.makefile("rb"))
+        assert kind == FRAME_JSON and message['op'] == "keepalive"
+        assert channel._keepalives == {}
+    finally:
+        channel.close()
+        broker.close()
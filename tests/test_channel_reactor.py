@@ -0,0 +1,51 @@
+from pyretroterm.ssh.channel_reactor import ChannelReactor, ReactorHandle
+from pyretroterm.ssh.flow_control import FlowControl
+
+
+class FakeChannel:
+    def __init__(self, nbytes):
+        self.buffered = nbytes
+        self.closed = False
+        self.eof_received = False
+
+    def recv_ready(self):
+        return self.buffered > 0
+
+    def recv(self, nbytes):
+        nbytes = min(nbytes, self.buffered)
+        self.buffered -= nbytes
+        return b"x" * nbytes
+
+
+class PassThrough:
+    def process(self, data):
+        return data
+
+    def log_data(self, text):
+        pass
+
+
+def make_reactor():
+    reactor = ChannelReactor()
+    reactor._wakeup_recv.close()
+    reactor._wakeup_send.close()
+    return reactor
+
+
+def test_drain_is_capped_per_turn():
+    reactor = make_reactor()
+    channel = FakeChannel(10 * ChannelReactor.READ_SIZE)
+    data, closed, paused = reactor._drain(ReactorHandle(channel, PassThrough()))
+    assert len(data) == ChannelReactor.MAX_READ_PER_TURN
+    assert channel.buffered == 10 * ChannelReactor.READ_SIZE - ChannelReactor.MAX_READ_PER_TURN
+    assert not closed and not paused
+
+
+def test_drain_stops_when_flow_pauses():
+    reactor = make_reactor()
+    flow = FlowControl(high=100 * 1024, low=10 * 1024)
+    channel = FakeChannel(10 * ChannelReactor.READ_SIZE)
+    data, closed, paused = reactor._drain(ReactorHandle(channel, PassThrough(), flow))
+    assert paused and flow.paused
+    assert len(data) == 2 * ChannelReactor.READ_SIZE
+    assert flow.pending == len(data)
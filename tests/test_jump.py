@@ -0,0 +1,81 @@
+import pytest
+
+from pyretroterm.ssh.jump import JumpHost, open_tunnel
+from pyretroterm.ssh.transport_registry import TransportRegistry
+
+
+class FakeChannel:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+    def open_channel(self, kind, dest_addr, src_addr, timeout=None):
+        return FakeChannel()
+
+
+class FakeClient:
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+        self.transport.active = False
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = TransportRegistry(idle_timeout=0.01)
+    monkeypatch.setattr(TransportRegistry, "_instance", registry)
+    yield registry
+    registry.close_all()
+
+
+def test_parse():
+    jump = JumpHost.parse("netops@bastion2.example.net:2222", "admin", "secret")
+    assert (jump.host, jump.port, jump.username, jump.password) == ("bastion2.example.net", 2222, "netops", None)
+    assert JumpHost.parse("bastion", "admin", "secret").password == "secret"
+    assert JumpHost.parse("none") is None
+
+
+def test_tunnels_share_the_bastion(registry):
+    jump = JumpHost("bastion", username="netops", password="secret")
+    pooled = registry.add(jump.registry_key(), FakeClient())
+    first = open_tunnel(jump, "sw1", 22)
+    second = open_tunnel(jump, "sw2", 22)
+    assert registry.stats()[0]['channels'] == 3
+    first.close()
+    first.close()
+    second.close()
+    assert registry.stats()[0]['channels'] == 1
+    registry.release(pooled)
+
+
+def test_tunnel_closed_after_bastion_replaced(registry):
+    jump = JumpHost("bastion", username="netops", password="secret")
+    old = registry.add(jump.registry_key(), FakeClient())
+    tunnel = open_tunnel(jump, "sw1", 22)
+    registry.release(old)
+
+    # The bastion is logged in to again while the tunnel is still open
+    registry.discard(old)
+    client = FakeClient()
+    replacement = registry.add(jump.registry_key(), client)
+
+    tunnel.close()
+    assert registry.stats()[0]['channels'] == 1
+    assert not client.closed
+    registry.release(replacement)
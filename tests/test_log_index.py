@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from pyretroterm.ssh.log_index import LOG_NAME_RE
+from pyretroterm.ssh.session_logger import SessionLogWriter
+
+
+@pytest.mark.parametrize("name, host, segment", [
+    ("session_10.0.0.1.log", "10.0.0.1", None),
+    ("session_10.0.0.1~2.log", "10.0.0.1", None),
+    ("session_dc2-core-2.log", "dc2-core-2", None),
+    ("session_dc2-core-2~3.log", "dc2-core-2", None),
+    ("session_dc2-core-2.20261017-120000.log", "dc2-core-2", ".20261017-120000"),
+    ("session_10.0.0.1~2.20261017-120000-2.log", "10.0.0.1", ".20261017-120000-2"),
+])
+def test_log_name(name, host, segment):
+    match = LOG_NAME_RE.match(name)
+    assert match.group('host') == host
+    assert match.group('segment') == segment
+
+
+def test_sibling_log_keeps_its_host(tmp_path):
+    writer = SessionLogWriter()
+    path = str(tmp_path / "session_dc2-core-2.log")
+    first = writer.open(path)
+    second = writer.open(path)
+    assert first.path == path
+    assert LOG_NAME_RE.match(os.path.basename(second.path)).group('host') == "dc2-core-2"
@@ -0,0 +1,11 @@
+from pyretroterm.ssh.paste import PasteWorker
+
+
+class FakeChannel:
+    closed = False
+
+
+def test_echo_counts_bytes():
+    worker = PasteWorker(FakeChannel(), "")
+    worker.received("Überwachung ✓")
+    assert worker.bytes_echoed == len("Überwachung ✓".encode("utf-8"))
@@ -0,0 +1,34 @@
+from pyretroterm.ssh.prompt_matcher import PromptMatcher, prompt_regex
+
+
+def test_prompt_split_across_reads():
+    matcher = PromptMatcher(prompt_regex("router1#"))
+    assert matcher.feed("show clock\r\n12:00:00 UTC\r\nrout") == 0
+    assert matcher.feed("er1#") == 1
+    assert matcher.matched
+    assert matcher.last_match == "router1#"
+
+
+def test_count_prompts_over_many_reads():
+    matcher = PromptMatcher(prompt_regex("#"), count=3)
+    for chunk in ("router1#", "show ver\r\n", "IOS\r\nrouter1#", "\r\nrouter1", "#"):
+        matcher.feed(chunk)
+    assert matcher.matches == 3
+    assert "IOS" in matcher.output()
+
+
+def test_line_start_only_after_a_newline():
+    matcher = PromptMatcher(r"^\$ ", count=None)
+    assert matcher.feed("$ ") == 1
+    # Echoed input continues the prompt's line
+    assert matcher.feed("$ echo") == 0
+    assert matcher.feed("\r\n") == 0
+    assert matcher.feed("$ ") == 1
+
+
+def test_line_start_after_window_truncation():
+    matcher = PromptMatcher(r"^\$ ", count=None, window=4)
+    assert matcher.feed("xx$ yy") == 0
+    # The kept tail now starts at "$ ", which is still mid-line
+    assert matcher.feed("z") == 0
+    assert matcher.feed("\n$ ") == 1
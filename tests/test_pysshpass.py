@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from pyretroterm.ssh import pysshpass
+from pyretroterm.ssh.pysshpass import close_logging, setup_logging
+
+
+@pytest.fixture(autouse=True)
+def log_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pysshpass, "_log_dir", lambda: tmp_path)
+    return tmp_path
+
+
+def test_targets_on_one_host_log_apart(log_dir):
+    first = setup_logging("fleet-test-host", 22, console=False)
+    second = setup_logging("fleet-test-host", 2222, console=False)
+    assert first is not second
+    assert sorted(path.name for path in log_dir.iterdir()) == ["fleet-test-host.log", "fleet-test-host_2222.log"]
+    close_logging("fleet-test-host", 22)
+    assert first.handlers == []
+    assert len(second.handlers) == 1
+    close_logging("fleet-test-host", 2222)
+    assert second.handlers == []
+
+
+def test_concurrent_runs_share_one_set_of_handlers():
+    barrier = threading.Barrier(8)
+    loggers = []
+
+    def run():
+        barrier.wait()
+        loggers.append(setup_logging("fleet-test-shared", 22, console=False))
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    logger = loggers[0]
+    assert len(logger.handlers) == 1
+    for _ in range(7):
+        close_logging("fleet-test-shared", 22)
+        assert len(logger.handlers) == 1
+    close_logging("fleet-test-shared", 22)
+    assert logger.handlers == []
@@ -0,0 +1,47 @@
+import json
+import os
+
+import pytest
+
+from pyretroterm.ssh.recorder import CastReader, SessionRecorder
+from pyretroterm.ssh.session_logger import SessionLogWriter
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    writer = SessionLogWriter(flush_interval=0.05)
+    writer.start()
+    monkeypatch.setattr(SessionLogWriter, "_instance", writer)
+    yield writer
+    writer.stop()
+
+
+def test_keyframe_offsets_are_bytes(tmp_path, writer):
+    recorder = SessionRecorder(str(tmp_path / "router1.cast"), keyframe_interval=0)
+    recorder.output("show version\r\n")
+    recorder.output("Überwachung — ÷ ✓\r\n")
+    recorder.resize(132, 40)
+    recorder.output("router1#")
+    recorder.close()
+    writer.stop()
+
+    reader = CastReader(recorder.path)
+    assert len(reader.keyframes) == 4
+    with open(recorder.path, "rb") as f:
+        for keyframe in reader.keyframes:
+            f.seek(keyframe['offset'])
+            assert json.loads(f.readline())[0] == keyframe['t']
+    last = reader.keyframes[-1]
+    assert list(reader.events(last['offset'])) == [(last['t'], "o", "router1#")]
+
+
+def test_log_size_counts_bytes(tmp_path, writer):
+    log = writer.open(str(tmp_path / "session_router1.log"))
+    log.write("Überwachung\r\n")
+    log.write("✓ done\r\n")
+    log.close()
+    writer.stop()
+
+    with open(log.path, "rb") as f:
+        assert f.read() == "Überwachung\n✓ done\n".encode("utf-8")
+    assert log._size == os.path.getsize(log.path)
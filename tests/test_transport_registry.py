@@ -0,0 +1,70 @@
+from pyretroterm.ssh.transport_registry import TransportRegistry, transport_key
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+
+class FakeClient:
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+        self.transport.active = False
+
+
+KEY = transport_key("router1", 22, "admin", password="secret")
+
+
+def test_shared_transport_is_reused():
+    registry = TransportRegistry(idle_timeout=0.01)
+    client = FakeClient()
+    first = registry.add(KEY, client)
+    second = registry.acquire(KEY)
+    assert second is first
+    assert second.client is client
+    registry.release(first)
+    assert not client.closed
+    registry.release(second)
+    registry.close_all()
+    assert client.closed
+
+
+def test_acquire_drops_dead_transport():
+    registry = TransportRegistry()
+    client = FakeClient()
+    registry.add(KEY, client)
+    client.transport.active = False
+    assert registry.acquire(KEY) is None
+    assert registry.stats() == []
+
+
+def test_stale_release_leaves_replacement_alone():
+    registry = TransportRegistry(idle_timeout=0.01)
+    old_client = FakeClient()
+    first = registry.add(KEY, old_client)
+    second = registry.acquire(KEY)
+
+    # One holder gives up on the transport and a new one takes its key
+    registry.discard(second)
+    assert old_client.closed
+    new_client = FakeClient()
+    replacement = registry.add(KEY, new_client)
+
+    # The other holder of the old transport lets go late
+    registry.release(first)
+    registry.discard(first)
+
+    assert registry.acquire(KEY) is replacement
+    assert not new_client.closed
+    assert registry.stats()[0]['channels'] == 2
+    registry.close_all()